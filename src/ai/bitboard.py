@@ -0,0 +1,518 @@
+from ai.entelect import *
+
+# Bitboard simulation engine
+#
+# Every entity class of a player is a single int with bit (y * PLAYING_FIELD_WIDTH + x) set for each cell it
+# covers, so moving a whole class is a shift and a collision test is an and. The rules follow State.update
+# without tracers or tracer bullets, which only exist to instrument the object engine for search.
+#
+# The object engine leaves some entities in its playing field without them being in any list (or the other way
+# around) when a collision interrupts a move half way, this engine does not reproduce those artifacts:
+# - a ship moving into an entity is destroyed together with it, no part of the ship stays behind
+# - an alien destroyed by an explosion before its own move is not added back
+# - an alien pushed past the top or bottom row stays where it is
+# - a missile or bullet leaving the playing field is destroyed, the object engine keeps it in its list because
+#   Entity.handle_out_of_bounds does not call the behavior (see the TODO in MissileBehavior)
+
+FIELD_SIZE = PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT
+FIELD_MASK = (1 << FIELD_SIZE) - 1
+ROW_MASK = (1 << PLAYING_FIELD_WIDTH) - 1
+TOP_ROW_MASK = ROW_MASK
+BOTTOM_ROW_MASK = ROW_MASK << (PLAYING_FIELD_WIDTH * (PLAYING_FIELD_HEIGHT - 1))
+COLUMN_MASKS = [sum(1 << (PLAYING_FIELD_WIDTH * y + x) for y in xrange(0, PLAYING_FIELD_HEIGHT))
+                for x in xrange(0, PLAYING_FIELD_WIDTH)]
+WIDE_MASK = 0b111
+
+# entity classes, in the order the playing field is searched for the occupant of a cell
+ALIENS = 'aliens'
+MISSILES = 'missiles'
+BULLETS = 'bullets'
+SHIELDS = 'shields'
+SHIPS = 'ship'
+MISSILE_CONTROLLERS = 'missile_controller'
+ALIEN_FACTORIES = 'alien_factory'
+KINDS = [ALIENS, MISSILES, BULLETS, SHIELDS, SHIPS, MISSILE_CONTROLLERS, ALIEN_FACTORIES]
+WIDE_KINDS = [SHIPS, MISSILE_CONTROLLERS, ALIEN_FACTORIES]
+
+KIND_TO_ENTITY_TYPE = {
+    ALIENS: ALIEN,
+    MISSILES: MISSILE,
+    BULLETS: BULLET,
+    SHIELDS: SHIELD,
+    SHIPS: SHIP,
+    MISSILE_CONTROLLERS: MISSILE_CONTROLLER,
+    ALIEN_FACTORIES: ALIEN_FACTORY
+}
+
+
+def cell_bit(x, y):
+    return 1 << (PLAYING_FIELD_WIDTH * y + x)
+
+
+def bit_position(bit):
+    index = bit.bit_length() - 1
+    return index % PLAYING_FIELD_WIDTH, index / PLAYING_FIELD_WIDTH
+
+
+# yields the single bit boards of a board, lowest bit first
+def iterate_bits(board):
+    while board:
+        bit = board & -board
+        yield bit
+        board ^= bit
+
+
+# yields the single bit boards of a board, highest bit first
+def iterate_bits_reversed(board):
+    while board:
+        bit = 1 << (board.bit_length() - 1)
+        yield bit
+        board ^= bit
+
+
+def explosion_mask(index):
+    x = index % PLAYING_FIELD_WIDTH
+    y = index / PLAYING_FIELD_WIDTH
+    mask = 0
+    for explode_x in xrange(max(x - 1, 0), min(x + 2, PLAYING_FIELD_WIDTH)):
+        for explode_y in xrange(max(y - 1, 0), min(y + 2, PLAYING_FIELD_HEIGHT)):
+            if explode_x != x or explode_y != y:
+                mask |= cell_bit(explode_x, explode_y)
+    return mask
+
+# cells destroyed around an alien that flies into a shield, indexed by the cell of the shield
+EXPLOSION_MASKS = [explosion_mask(index) for index in xrange(0, FIELD_SIZE)]
+
+
+class BitboardPlayer:
+    def __init__(self):
+        self.player_number = None
+        self.kills = 0
+        self.lives = 0
+        self.respawn_timer = 0
+        self.missile_limit = 1
+        self.wave_size = INITIAL_ALIEN_WAVE_SIZE
+        self.aliens_delta_x = -1
+        self.aliens_move = 0
+
+        self.aliens = 0
+        self.missiles = 0
+        self.bullets = 0
+        self.shields = 0
+        self.ship = 0
+        self.missile_controller = 0
+        self.alien_factory = 0
+
+    @staticmethod
+    def from_player(player, state):
+        bitboard_player = BitboardPlayer()
+        bitboard_player.player_number = player.player_number
+        bitboard_player.kills = player.kills
+        bitboard_player.lives = player.lives
+        bitboard_player.respawn_timer = player.respawn_timer
+        bitboard_player.missile_limit = player.missile_limit
+        bitboard_player.wave_size = player.wave_size
+        bitboard_player.aliens_delta_x = player.aliens_delta_x
+
+        for kind, entities in [(ALIENS, player.aliens), (MISSILES, player.missiles), (BULLETS, player.bullets),
+                               (SHIELDS, player.shields)]:
+            board = 0
+            for entity in entities:
+                # destroyed shields stay in the shield list of the object engine
+                if state.get_entity(entity.x, entity.y) is entity:
+                    board |= cell_bit(entity.x, entity.y)
+            setattr(bitboard_player, kind, board)
+        for kind, entity in [(SHIPS, player.ship), (MISSILE_CONTROLLERS, player.missile_controller),
+                             (ALIEN_FACTORIES, player.alien_factory)]:
+            if entity:
+                setattr(bitboard_player, kind, WIDE_MASK << (PLAYING_FIELD_WIDTH * entity.y + entity.x))
+        return bitboard_player
+
+    def clone(self):
+        player = BitboardPlayer()
+        player.__dict__.update(self.__dict__)
+        return player
+
+    def occupied(self):
+        return self.aliens | self.missiles | self.bullets | self.shields | self.ship | self.missile_controller | \
+               self.alien_factory
+
+    # returns (top, right, bottom, left) of the aliens, -1 for each if there are none
+    def alien_bbox(self):
+        aliens = self.aliens
+        if not aliens:
+            return -1, -1, -1, -1
+        top = ((aliens & -aliens).bit_length() - 1) / PLAYING_FIELD_WIDTH
+        bottom = (aliens.bit_length() - 1) / PLAYING_FIELD_WIDTH
+        columns = 0
+        while aliens:
+            columns |= aliens & ROW_MASK
+            aliens >>= PLAYING_FIELD_WIDTH
+        left = (columns & -columns).bit_length() - 1
+        right = columns.bit_length() - 1
+        return top, right, bottom, left
+
+
+class BitboardState:
+    def __init__(self):
+        self.round_number = 0
+        self.round_limit = 200
+        self.players = {YOU: BitboardPlayer(), ENEMY: BitboardPlayer()}
+
+    # converts the output of State.from_game_state, or any state of the object engine
+    @staticmethod
+    def from_state(state):
+        bitboard_state = BitboardState()
+        bitboard_state.round_number = state.round_number
+        bitboard_state.round_limit = state.round_limit
+        for player_number in [YOU, ENEMY]:
+            bitboard_state.players[player_number] = BitboardPlayer.from_player(state.players[player_number], state)
+        return bitboard_state
+
+    @staticmethod
+    def from_game_state(game_state):
+        from ai.domain import State
+        return BitboardState.from_state(State.from_game_state(game_state))
+
+    def clone(self):
+        state = BitboardState()
+        state.round_number = self.round_number
+        state.round_limit = self.round_limit
+        state.players = {YOU: self.players[YOU].clone(), ENEMY: self.players[ENEMY].clone()}
+        return state
+
+    def your_lives(self):
+        return self.players[YOU].lives
+
+    def your_kills(self):
+        return self.players[YOU].kills
+
+    def your_ship(self):
+        return self.players[YOU].ship
+
+    def occupied(self):
+        return self.players[YOU].occupied() | self.players[ENEMY].occupied()
+
+    # returns (player, kind) of the entity covering the cell of bit
+    def get_occupant(self, bit):
+        for player_number in [YOU, ENEMY]:
+            player = self.players[player_number]
+            for kind in KINDS:
+                if getattr(player, kind) & bit:
+                    return player, kind
+        return None, None
+
+    # destroys the entity covering the cell of bit, returns (player, kind) of what was destroyed
+    def destroy(self, bit):
+        player, kind = self.get_occupant(bit)
+        if not player:
+            return None, None
+        board = getattr(player, kind)
+        if kind in WIDE_KINDS:
+            setattr(player, kind, 0)
+            if kind == SHIPS:
+                player.lives -= 1
+                player.respawn_timer = 3
+            elif kind == MISSILE_CONTROLLERS:
+                player.missile_limit = 1
+        else:
+            setattr(player, kind, board & ~bit)
+        return player, kind
+
+    def destroy_all(self, mask):
+        mask &= self.occupied()
+        while mask:
+            bit = mask & -mask
+            self.destroy(bit)
+            mask &= ~bit & self.occupied()
+
+    # adds a single cell entity, resolving a collision like EntityBehavior.handle_collision does
+    def add(self, player, kind, bit):
+        if not bit & self.occupied():
+            setattr(player, kind, getattr(player, kind) | bit)
+            return True
+        other, other_kind = self.destroy(bit)
+        if kind == MISSILES and other_kind == ALIENS and other is not player:
+            player.kills += 1
+        elif kind == ALIENS:
+            if other_kind == MISSILES and other is not player:
+                other.kills += 1
+            elif other_kind == SHIELDS:
+                self.destroy_all(EXPLOSION_MASKS[bit.bit_length() - 1])
+        return False
+
+    # adds a ship or building covering three cells starting at the cell of bit
+    def add_wide(self, player, kind, bit):
+        mask = bit * WIDE_MASK
+        collision = mask & self.occupied()
+        if not collision:
+            setattr(player, kind, mask)
+            return True
+        self.destroy(collision & -collision)
+        if kind == SHIPS:
+            player.lives -= 1
+            player.respawn_timer = 3
+        return False
+
+    def update_alien_commander(self, player_number):
+        player = self.players[player_number]
+        top, right, bottom, left = player.alien_bbox()
+        if player_number == YOU:
+            tolerance_breach = bottom == 8
+        else:
+            tolerance_breach = top == 14
+
+        if not player.aliens or tolerance_breach:
+            y = 10 if player_number == YOU else 12
+            for i in xrange(0, player.wave_size):
+                x = i * 3 if player.aliens_delta_x > 0 else 16 - (i * 3)
+                if 0 <= x < PLAYING_FIELD_WIDTH:
+                    self.add(player, ALIENS, cell_bit(x, y))
+            top, right, bottom, left = player.alien_bbox()
+
+        delta_x = player.aliens_delta_x
+        delta_y = 0
+        delta_y_player = 1 if player_number == ENEMY else -1
+        if player.aliens_delta_x == -1 and left == 0:
+            delta_x = 0
+            delta_y = delta_y_player
+            player.aliens_delta_x = 1
+        if player.aliens_delta_x == 1 and right == PLAYING_FIELD_WIDTH - 1:
+            delta_x = 0
+            delta_y = delta_y_player
+            player.aliens_delta_x = -1
+        player.aliens_move = delta_x + delta_y * PLAYING_FIELD_WIDTH
+
+    def update_missiles(self, player_number):
+        player = self.players[player_number]
+        if player_number == YOU:
+            bits = iterate_bits(player.missiles)
+        else:
+            bits = iterate_bits_reversed(player.missiles)
+        for bit in list(bits):
+            self.move_projectile(player, MISSILES, bit)
+
+    def update_bullets(self, player_number):
+        player = self.players[player_number]
+        if player_number == YOU:
+            bits = iterate_bits(player.bullets)
+        else:
+            bits = iterate_bits_reversed(player.bullets)
+        for bit in list(bits):
+            self.move_projectile(player, BULLETS, bit)
+
+    # moves a missile or bullet one row towards the opponent
+    def move_projectile(self, player, kind, bit):
+        board = getattr(player, kind)
+        if not board & bit:
+            return
+        board &= ~bit
+        setattr(player, kind, board)
+        if player.player_number == YOU:
+            if bit & TOP_ROW_MASK:
+                return
+            target = bit >> PLAYING_FIELD_WIDTH
+        else:
+            if bit & BOTTOM_ROW_MASK:
+                return
+            target = bit << PLAYING_FIELD_WIDTH
+        self.add(player, kind, target)
+
+    def update_aliens(self, player_number):
+        player = self.players[player_number]
+        move = player.aliens_move
+        aliens = player.aliens
+        if not aliens or not move:
+            return
+
+        # aliens that would leave the playing field hold their position
+        if move < -1:
+            stuck = aliens & TOP_ROW_MASK
+        elif move > 1:
+            stuck = aliens & BOTTOM_ROW_MASK
+        else:
+            stuck = 0
+        moving = aliens & ~stuck
+        if move > 0:
+            moved = moving << move
+        else:
+            moved = moving >> -move
+
+        player.aliens = stuck
+        collisions = moved & self.occupied()
+        player.aliens |= moved & ~collisions
+        for bit in iterate_bits(collisions):
+            self.add(player, ALIENS, bit)
+
+    def perform_action(self, action):
+        player = self.players[YOU]
+        ship = player.ship
+        if not ship:
+            return
+        x, y = bit_position(ship & -ship)
+        if action == MOVE_LEFT or action == MOVE_RIGHT:
+            target_x = x - 1 if action == MOVE_LEFT else x + 1
+            if 0 <= target_x and target_x + 2 < PLAYING_FIELD_WIDTH:
+                player.ship = 0
+                self.add_wide(player, SHIPS, cell_bit(target_x, y))
+        elif action == SHOOT:
+            self.add(player, MISSILES, cell_bit(x + 1, y - 1))
+        elif action == BUILD_ALIEN_FACTORY:
+            self.add_wide(player, ALIEN_FACTORIES, cell_bit(x, y + 1))
+        elif action == BUILD_MISSILE_CONTROLLER:
+            if self.add_wide(player, MISSILE_CONTROLLERS, cell_bit(x, y + 1)):
+                player.missile_limit = 2
+
+    def respawn_ship(self, player_number):
+        player = self.players[player_number]
+        if player.respawn_timer > 0:
+            player.respawn_timer -= 1
+            if player.respawn_timer <= 0:
+                y = PLAYING_FIELD_HEIGHT - 2 if player_number == YOU else 1
+                self.add_wide(player, SHIPS, cell_bit(PLAYING_FIELD_WIDTH / 2 - 1, y))
+
+    # same odds as State.set_alien_shoot_odds as a list of (bit, odds), ties for the alien closest to the ship go
+    # to the lowest bit instead of the first alien in the list
+    def get_alien_shoot_odds(self):
+        player = self.players[ENEMY]
+        aliens = player.aliens
+        if not aliens:
+            return []
+        if not aliens & (aliens - 1):
+            return [(aliens, 1.0)]
+
+        top, right, bottom, left = player.alien_bbox()
+        front_line = aliens & (ROW_MASK << (PLAYING_FIELD_WIDTH * bottom))
+        delta_x = player.aliens_move if abs(player.aliens_move) == 1 else 0
+        target_x = PLAYING_FIELD_WIDTH / 2
+        ship = self.players[YOU].ship
+        if ship:
+            target_x = bit_position(ship & -ship)[0]
+        closest_alien = 0
+        closest_distance = 100
+        for bit in iterate_bits(front_line):
+            distance = abs(bit_position(bit)[0] + delta_x - target_x)
+            if distance < closest_distance:
+                closest_alien = bit
+                closest_distance = distance
+
+        trigger_happy = front_line
+        if bottom >= 2:
+            all_aliens = aliens | self.players[YOU].aliens
+            second_line = aliens & (ROW_MASK << (PLAYING_FIELD_WIDTH * (bottom - 2)))
+            trigger_happy |= second_line & ~(all_aliens >> (2 * PLAYING_FIELD_WIDTH))
+        trigger_happy &= ~closest_alien
+        odds = [(closest_alien, 0.333)]
+        count = bin(trigger_happy).count('1')
+        for bit in iterate_bits(trigger_happy):
+            odds.append((bit, 0.666 / count))
+        return odds
+
+    def select_shooting_alien(self, rnd):
+        value = rnd.random()
+        for bit, odds in self.get_alien_shoot_odds():
+            value -= odds
+            if value < 0:
+                return bit
+        return 0
+
+    # advances one round with the same rules and ordering as State.update without tracers, given a random
+    # generator an enemy alien picked with the shoot odds fires a bullet every sixth round
+    def update(self, action, rnd=None):
+        self.round_number += 1
+        if self.round_number == TIME_WAVE_SIZE_INCREASE:
+            self.players[YOU].wave_size += 1
+            self.players[ENEMY].wave_size += 1
+
+        self.update_alien_commander(YOU)
+        self.update_alien_commander(ENEMY)
+        shooting_alien = 0
+        if rnd and self.round_number % 6 == 0:
+            shooting_alien = self.select_shooting_alien(rnd)
+
+        self.update_missiles(YOU)
+        self.update_missiles(ENEMY)
+
+        self.update_bullets(YOU)
+        self.update_bullets(ENEMY)
+
+        self.update_aliens(YOU)
+        self.update_aliens(ENEMY)
+        if shooting_alien:
+            self.shoot(shooting_alien)
+
+        self.perform_action(action)
+
+        self.respawn_ship(YOU)
+        self.respawn_ship(ENEMY)
+
+    # the alien at bit before the aliens moved fires a bullet from its new position
+    def shoot(self, bit):
+        player = self.players[ENEMY]
+        move = player.aliens_move
+        if move > 1 and bit & BOTTOM_ROW_MASK or move < -1 and bit & TOP_ROW_MASK:
+            move = 0
+        if move > 0:
+            bit <<= move
+        elif move < 0:
+            bit >>= -move
+        if player.aliens & bit and not bit & BOTTOM_ROW_MASK:
+            self.add(player, BULLETS, bit << PLAYING_FIELD_WIDTH)
+
+    # evade actions without looking ahead for entities moving into the path of the ship
+    def get_move_actions(self):
+        player = self.players[YOU]
+        ship = player.ship
+        if not ship:
+            return [NOTHING]
+        x, y = bit_position(ship & -ship)
+        actions = [NOTHING]
+        if bin(player.missiles).count('1') < player.missile_limit:
+            actions.append(SHOOT)
+        if x > 0:
+            actions.append(MOVE_LEFT)
+        if x + 3 < PLAYING_FIELD_WIDTH:
+            actions.append(MOVE_RIGHT)
+        return actions
+
+    def get_available_evade_actions(self):
+        player = self.players[YOU]
+        ship = player.ship
+        if not ship:
+            return [NOTHING]
+
+        next_state = self.clone()
+        next_state.update(NOTHING)
+        occupied = next_state.occupied()
+
+        x, y = bit_position(ship & -ship)
+        actions = [NOTHING]
+        if bin(player.missiles).count('1') < player.missile_limit:
+            actions.append(SHOOT)
+        if x > 0 and not occupied & cell_bit(x - 1, y):
+            actions.append(MOVE_LEFT)
+        if x + 3 < PLAYING_FIELD_WIDTH and not occupied & cell_bit(x + 3, y):
+            actions.append(MOVE_RIGHT)
+        return actions
+
+    def get_symbol(self, bit):
+        player, kind = self.get_occupant(bit)
+        if not player:
+            return EMPTY_SYMBOL
+        if kind == SHIPS:
+            return SHIP_PLAYER1_SYMBOL if player.player_number == YOU else SHIP_PLAYER2_SYMBOL
+        if kind == MISSILES:
+            return MISSILE_PLAYER1_SYMBOL if player.player_number == YOU else MISSILE_PLAYER2_SYMBOL
+        return TEXT_TO_SYMBOL[KIND_TO_ENTITY_TYPE[kind]]
+
+    # same layout as State.__repr__
+    def __repr__(self):
+        you = self.players[YOU]
+        text = '+%03d/%d+++++++:)%d+\n' % (self.round_number, self.round_limit, you.lives)
+        for y in xrange(0, PLAYING_FIELD_HEIGHT):
+            text += '+'
+            for x in xrange(0, PLAYING_FIELD_WIDTH):
+                text += self.get_symbol(cell_bit(x, y))
+            text += '+\n'
+        text += '+!%d/%d+++++++++x%03d+\n' % (bin(you.missiles).count('1'), you.missile_limit, you.kills)
+        return text
@@ -5,12 +5,33 @@ import logging
 import random
 
 class Bot:
-    def __init__(self):
+    # seed seeds the random moves of the bot, bots without one play differently every match
+    def __init__(self, seed=None):
         self.name = self.__class__.__name__
+        self.random = random.Random(seed)
         self.logger = logging.getLogger('bot.%s' % self.name)
+        self.deadline = None
+        self.max_depth = None
+        self.parallel_search = None
+        self.telemetry = None
+        # an ai.strategy.BehaviorProfile the behavior trees are instrumented with, when set
+        self.behavior_profile = None
+        self.search_depth = None
+        self.tracer_plans = TracerPlans()
 
-    def get_action(self, game_state):
-        state = State.from_game_state(game_state)
+    # searches deepen until the deadline, a time.time() value, when one is given, over the workers of an
+    # ai.parallel.ParallelSearch when one is given too, and are added to an ai.telemetry.Telemetry when given
+    def get_action(self, game_state, deadline=None, max_depth=None, parallel_search=None, telemetry=None):
+        return self.get_state_action(State.from_game_state(game_state), deadline, max_depth, parallel_search,
+                                     telemetry)
+
+    # get_action for a state that is already read, e.g. with State.from_file
+    def get_state_action(self, state, deadline=None, max_depth=None, parallel_search=None, telemetry=None):
+        self.deadline = deadline
+        self.max_depth = max_depth
+        self.parallel_search = parallel_search
+        self.telemetry = telemetry
+        self.search_depth = None
         return self.get_action_from_state(state)
 
     @abstractmethod
@@ -20,13 +41,18 @@ class Bot:
 
 class BotRandom(Bot):
     def get_action_from_state(self, state):
-        return random.choice(state.get_available_actions())
+        return self.random.choice(state.get_available_actions())
 
 
 class BotHaywired(Bot):
     def get_action_from_state(self, state):
         blackboard = Blackboard()
         blackboard.set('state', state)
+        blackboard.set('deadline', self.deadline)
+        blackboard.set('max_depth', self.max_depth)
+        blackboard.set('parallel_search', self.parallel_search)
+        blackboard.set('tracer_plans', self.tracer_plans)
+        blackboard.set('telemetry', self.telemetry)
 
         def build(build_action):
             build_behavior = Sequence(
@@ -82,10 +108,16 @@ class BotHaywired(Bot):
             )
         )
 
+        if self.behavior_profile:
+            self.behavior_profile.instrument(behavior)
+
         flow = []
         behavior.run(blackboard, flow)
         action = blackboard.get('action')
-        self.logger.debug('Flow: %s' % ' '.join(str(f) for f in flow))
+        self.search_depth = blackboard.get('search_depth')
+        # joining the flow is not free, only do it when it is logged
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Flow: %s', ' '.join(str(f) for f in flow))
 
         if not action:
             action = NOTHING
@@ -93,8 +125,8 @@ class BotHaywired(Bot):
 
 class BotVex(BotHaywired):
     def get_action_from_state(self, state):
-        if random.random() < 0.2:
-            return random.choice(state.get_available_actions())
+        if self.random.random() < 0.2:
+            return self.random.choice(state.get_available_actions())
 
         return BotHaywired.get_action_from_state(self, state)
 
@@ -0,0 +1,132 @@
+from ai.entelect import NOTHING, write_move
+from multiprocessing.connection import Client
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Thin client for the bot server in ai.server, run once a round by the harness in place of ai.main
+#
+# It sends the bot name, the state directory and its start time to the server of the bot directory and writes the
+# action the server replies with. When no server is running the round is played in process by ai.main as before and
+# a server is started for the next rounds, unless one is still starting up.
+
+# seconds to wait for the action, the harness allows 2 seconds a round
+BOT_CLIENT_TIMEOUT = 1.9
+# seconds a started server may take to listen, clients start no other server meanwhile
+BOT_SERVER_START_TIMEOUT = 20
+
+
+# a named pipe on windows and a unix socket elsewhere, one for every bot directory so both harness players can run
+# their own server
+def server_address(directory=None):
+    name = 'entelect-%s' % hashlib.md5(os.path.realpath(directory or os.getcwd())).hexdigest()[:12]
+    if sys.platform == 'win32':
+        return r'\\.\pipe\%s' % name
+    return os.path.join(tempfile.gettempdir(), name + '.sock')
+
+
+# a file of the server at the address, named pipes live outside the file system so their files are in the temp
+# directory
+def server_file(address, extension):
+    if address.startswith('\\\\'):
+        return os.path.join(tempfile.gettempdir(), address.rsplit('\\', 1)[1] + extension)
+    return address + extension
+
+
+# the file that holds the pid of a server until it listens
+def server_marker(address):
+    return server_file(address, '.starting')
+
+
+# the file that holds the secret a server and its clients authenticate with, only the user can read it
+def server_key_file(address):
+    return server_file(address, '.key')
+
+
+# a new secret for the server at the address, every server writes its own when it starts
+def create_server_key(address):
+    key_file = server_key_file(address)
+    if os.path.exists(key_file):
+        os.remove(key_file)
+    key = os.urandom(32)
+    descriptor = os.open(key_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0), 0600)
+    try:
+        os.write(descriptor, key)
+    finally:
+        os.close(descriptor)
+    return key
+
+
+# the secret of the server at the address, None when no server wrote one
+def read_server_key(address):
+    try:
+        with open(server_key_file(address), 'rb') as key_file:
+            return key_file.read()
+    except IOError:
+        return None
+
+
+# creates the marker of a new server, False while the server of a younger marker is still starting, a marker older
+# than BOT_SERVER_START_TIMEOUT is left by a server that died before it listened
+def claim_server_marker(marker):
+    for i in xrange(0, 2):
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0644))
+            return True
+        except OSError:
+            try:
+                if time.time() - os.path.getmtime(marker) < BOT_SERVER_START_TIMEOUT:
+                    return False
+                os.remove(marker)
+            except OSError:
+                pass
+    return False
+
+
+def start_server():
+    marker = server_marker(server_address())
+    if not claim_server_marker(marker):
+        return
+    with open(os.devnull, 'w') as devnull:
+        if sys.platform == 'win32':
+            # DETACHED_PROCESS, the server outlives the round
+            process = subprocess.Popen([sys.executable, '-m', 'ai.server'], stdout=devnull, stderr=devnull,
+                                       creationflags=0x00000008)
+        else:
+            process = subprocess.Popen([sys.executable, '-m', 'ai.server'], stdout=devnull, stderr=devnull,
+                                       close_fds=True)
+    with open(marker, 'w') as marker_file:
+        marker_file.write(str(process.pid))
+
+
+def main(argv):
+    start = time.time()
+    address = server_address()
+    try:
+        connection = Client(address, authkey=read_server_key(address))
+    except Exception:
+        from ai.main import Main
+        Main(argv).run()
+        start_server()
+        return
+
+    try:
+        connection.send((argv[0], os.path.join(argv[1], 'state.json'), start))
+        action = NOTHING
+        if connection.poll(max(0, start + BOT_CLIENT_TIMEOUT - time.time())):
+            try:
+                action = connection.recv()
+            except EOFError:
+                print 'Bot server failed to play the round'
+        else:
+            print 'Bot server did not reply in time'
+    finally:
+        connection.close()
+    write_move(action)
+    print 'Action: %s in %.3f seconds' % (action, time.time() - start)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,7 +1,83 @@
 from abc import abstractmethod
 from ai.entelect import *
+from array import array
 import copy
+import json
 import random
+import re
+
+# share entity lists between a state and its clones until one of them changes them, see State.own
+COPY_ON_WRITE = True
+
+# parts of a state shared between a state and its clones, see State.own, the board is the playing field with the
+# players' ships, bullets, missiles and aliens, the tracers and the tracer hits
+BOARD = 'board'
+TRACER_BULLETS = 'tracer_bullets'
+
+# how a state shares a part, a clone borrows the parts of its source and copies them as __deepcopy__ would, the
+# source lends them and copies them as they are
+BORROWED = 'borrowed'
+LENT = 'lent'
+
+# State.clone and State.update calls of this process, ai.telemetry reads them
+state_clones = 0
+state_updates = 0
+
+# playing field backend used by new states, see PLAYING_FIELDS
+PLAYING_FIELD = 'objects'
+
+EMPTY_CODE = ENTITY_CODES[EMPTY]
+ALIEN_CODE = ENTITY_CODES[ALIEN]
+SHIELD_CODE = ENTITY_CODES[SHIELD]
+TRACER_CODE = ENTITY_CODES[TRACER]
+
+# map cells State.from_json reads, walls, ships and buildings are left out as State.from_game_state does
+MAP_CELL_TYPES = [SHIELD, BULLET, ALIEN, MISSILE]
+MAP_CELL_PATTERN = re.compile(r'"X":\s*(\d+),\s*"Y":\s*(\d+),\s*"Width":\s*\d+,\s*"Height":\s*\d+,\s*'
+                              r'"Type":\s*"(%s)",\s*"PlayerNumber":\s*(\d+)' % '|'.join(MAP_CELL_TYPES))
+
+def clone_entities(entities):
+    ids = entities.ids[:] if isinstance(entities, EntityList) else None
+    return EntityList([entity.__deepcopy__(None) for entity in entities], ids)
+
+# copies the entities with copy_entity, or as clone_entities does when it is None, and maps the id() of every entity
+# to its copy in copies when given
+def copy_entities(entities, copy_entity=None, copies=None):
+    if copy_entity is None:
+        copied = clone_entities(entities)
+    else:
+        ids = entities.ids[:] if isinstance(entities, EntityList) else None
+        copied = EntityList([copy_entity(entity) for entity in entities], ids)
+    if copies is not None:
+        for entity, entity_copy in zip(entities, copied):
+            copies[id(entity)] = entity_copy
+    return copied
+
+# list of entities keeping their ids alongside in the same order, so finding an entity compares ids in C instead of
+# calling Entity.__eq__ on every entity before it, slices and concatenations are plain lists
+class EntityList(list):
+    __slots__ = ['ids']
+
+    def __init__(self, entities=(), ids=None):
+        list.__init__(self, entities)
+        if ids is None:
+            ids = [entity.id for entity in self]
+        self.ids = ids
+
+    def append(self, entity):
+        list.append(self, entity)
+        self.ids.append(entity.id)
+
+    def remove(self, entity):
+        index = self.ids.index(entity.id)
+        del self.ids[index]
+        list.__delitem__(self, index)
+
+    def __contains__(self, entity):
+        return entity.id in self.ids
+
+    def __deepcopy__(self, memo):
+        return EntityList([copy.deepcopy(entity, memo) for entity in self], self.ids[:])
 
 class Box:
     __slots__ = ['top', 'right', 'bottom', 'left']
@@ -26,12 +102,20 @@ class Player:
         self.alien_factory = None
         self.missile_controller = None
 
+        # the bbox of the last update_bbox, the aliens a row and a column and the extent of the aliens follow the
+        # aliens as they are added, moved and destroyed
         self.alien_bbox = None
+        self.alien_rows = [0] * PLAYING_FIELD_HEIGHT
+        self.alien_columns = [0] * PLAYING_FIELD_WIDTH
+        self.alien_top = -1
+        self.alien_right = -1
+        self.alien_bottom = -1
+        self.alien_left = -1
 
         self.shields = []
-        self.missiles = []
-        self.bullets = []
-        self.aliens = []
+        self.missiles = EntityList()
+        self.bullets = EntityList()
+        self.aliens = EntityList()
         self.exploding_aliens = []
 
     @staticmethod
@@ -78,34 +162,101 @@ class Player:
         player.missiles = copy.deepcopy(self.missiles)
         player.aliens = copy.deepcopy(self.aliens)
         player.exploding_aliens = copy.deepcopy(self.exploding_aliens)
+        player.copy_alien_positions(self)
+        player.update_bbox()
+        return player
+
+    # copy-on-write counterpart of __deepcopy__, the clone shares the ship, bullets, missiles, aliens and alien
+    # positions of this player until own_entities, shields and exploding aliens are shared for good because they are
+    # only ever replaced and never changed in place
+    def clone(self):
+        player = copy.copy(self)
         player.update_bbox()
         return player
 
+    # gives this player copies of the entities it shares, copy_entity and copies as for copy_entities
+    def own_entities(self, copy_entity=None, copies=None):
+        ship = self.ship
+        if ship:
+            self.ship = ship.__deepcopy__(None) if copy_entity is None else copy_entity(ship)
+            if copies is not None:
+                copies[id(ship)] = self.ship
+        self.bullets = copy_entities(self.bullets, copy_entity, copies)
+        self.missiles = copy_entities(self.missiles, copy_entity, copies)
+        self.aliens = copy_entities(self.aliens, copy_entity, copies)
+        self.alien_rows = self.alien_rows[:]
+        self.alien_columns = self.alien_columns[:]
+
+    def copy_alien_positions(self, source):
+        self.alien_rows = source.alien_rows[:]
+        self.alien_columns = source.alien_columns[:]
+        self.alien_top = source.alien_top
+        self.alien_right = source.alien_right
+        self.alien_bottom = source.alien_bottom
+        self.alien_left = source.alien_left
+
+    def add_alien_position(self, x, y):
+        self.alien_rows[y] += 1
+        self.alien_columns[x] += 1
+        if self.alien_top == -1:
+            self.alien_top = self.alien_bottom = y
+            self.alien_left = self.alien_right = x
+            return
+        if y < self.alien_top:
+            self.alien_top = y
+        elif y > self.alien_bottom:
+            self.alien_bottom = y
+        if x < self.alien_left:
+            self.alien_left = x
+        elif x > self.alien_right:
+            self.alien_right = x
+
+    # an emptied row or column on the edge of the extent shrinks it to the next occupied one
+    def remove_alien_position(self, x, y):
+        rows = self.alien_rows
+        columns = self.alien_columns
+        rows[y] -= 1
+        columns[x] -= 1
+        if rows[y] == 0:
+            if self.alien_top == self.alien_bottom:
+                self.alien_top = self.alien_right = self.alien_bottom = self.alien_left = -1
+                return
+            if y == self.alien_top:
+                while not rows[self.alien_top]:
+                    self.alien_top += 1
+            elif y == self.alien_bottom:
+                while not rows[self.alien_bottom]:
+                    self.alien_bottom -= 1
+        if columns[x] == 0:
+            if x == self.alien_left:
+                while not columns[self.alien_left]:
+                    self.alien_left += 1
+            elif x == self.alien_right:
+                while not columns[self.alien_right]:
+                    self.alien_right -= 1
+
+    def move_alien_position(self, x, y, new_x, new_y):
+        self.add_alien_position(new_x, new_y)
+        self.remove_alien_position(x, y)
+
     def calculate_alien_bbox(self):
         bbox = Box()
-        for alien in self.aliens:
-            x = alien.x
-            y = alien.y
-            if bbox.top == -1 or y < bbox.top:
-                bbox.top = y
-            if bbox.bottom == -1 or y > bbox.bottom:
-                bbox.bottom = y
-            if bbox.left == -1 or x < bbox.left:
-                bbox.left = x
-            if bbox.right == -1 or x > bbox.right:
-                bbox.right = x
-
-        for alien in self.aliens:
-            if alien.y == bbox.bottom:
-                alien.at_front_line = True
-            else:
-                alien.at_front_line = False
-
+        bbox.top = self.alien_top
+        bbox.right = self.alien_right
+        bbox.bottom = self.alien_bottom
+        bbox.left = self.alien_left
         return bbox
 
+    # the bbox is only taken when asked for, it holds still while the aliens move until it is updated again
     def update_bbox(self):
         self.alien_bbox = self.calculate_alien_bbox()
 
+    # the front line is the row of the bbox nearest to the other player
+    def at_front_line(self, alien):
+        if self.player_number == ENEMY:
+            return alien.y == self.alien_bbox.bottom
+        return alien.y == self.alien_bbox.top
+
     def update_missiles(self, state):
         for missile in sorted(self.missiles, key=lambda m: m.y if self.player_number == 1 else -m.y):
             missile.update(state)
@@ -126,19 +277,50 @@ class Player:
                 Ship(PLAYING_FIELD_WIDTH / 2 - 1, y, self.player_number).add(state)
 
 class State:
-    def __init__(self):
-        self.playing_field = [None] * (PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT)
+    def __init__(self, source=None):
         self.width = PLAYING_FIELD_WIDTH
         self.height = PLAYING_FIELD_HEIGHT
 
+        # parts this state shares with other states, BORROWED or LENT by part, see own
+        self.shared = {}
+        # shields and buildings pre-rendered onto an empty field, shared between clones
+        self.static_field = None
+        # the futures of this state when nobody acts, keyed by update flags, see Timeline
+        self.timelines = {}
+
+        # a copy-on-write clone of source, the playing field is laid out when first read, see __getattr__
+        if source is not None:
+            self.player_number_real = source.player_number_real
+            self.round_number = source.round_number
+            self.round_limit = source.round_limit
+            self.available_actions = source.available_actions
+            self.available_evade_actions = source.available_evade_actions
+            self.static_field = source.static_field
+            self.players = {YOU: source.players[YOU].clone(), ENEMY: source.players[ENEMY].clone()}
+            self.tracers = source.tracers
+            self.tracer_bullets = source.tracer_bullets
+            self.tracer_bullet_columns = source.tracer_bullet_columns
+            self.tracer_hits = source.tracer_hits
+            self.tracer_shield_hits = source.tracer_shield_hits
+            self.tracer_alien_factory_hits = source.tracer_alien_factory_hits
+            self.shared = {BOARD: BORROWED, TRACER_BULLETS: BORROWED}
+            source.shared.setdefault(BOARD, LENT)
+            source.shared.setdefault(TRACER_BULLETS, LENT)
+            return
+
+        self.playing_field = new_playing_field()
+
         self.player_number_real = None
         self.round_number = None
         self.round_limit = None
 
         self.players = {1: None, 2: None}
 
-        self.tracers = []
-        self.tracer_bullets = []
+        self.tracers = EntityList()
+        self.tracer_bullets = EntityList()
+        # the tracer bullets of every column with one in the order of tracer_bullets, tracer bullets never change
+        # column
+        self.tracer_bullet_columns = {}
         self.tracer_hits = []
         self.tracer_shield_hits = []
         self.tracer_alien_factory_hits = []
@@ -147,8 +329,10 @@ class State:
         self.available_evade_actions = None
 
 
+    # map_cells are (x, y, type, player number) tuples of the map entities in the order they are added, they are
+    # read from the game state map when not given
     @staticmethod
-    def from_game_state(game_state):
+    def from_game_state(game_state, map_cells=None):
         state = State()
         state.player_number_real = game_state['Players'][0]['PlayerNumberReal']
         offset_x = 1
@@ -159,6 +343,13 @@ class State:
         Player.from_game_state(game_state, state, 1, offset_x, offset_y)
         Player.from_game_state(game_state, state, 2, offset_x, offset_y)
 
+        if map_cells is not None:
+            for x, y, cell_type, player_number in map_cells:
+                MAP_CELL_ENTITIES[cell_type](x, y, player_number).add(state)
+            state.update_bbox(1)
+            state.update_bbox(2)
+            return state
+
         game_map = game_state['Map']
 
         field_end_x = 18
@@ -186,6 +377,38 @@ class State:
 
         return state
 
+    # same state as State.from_game_state(json.loads(document)) without decoding the map, the map rows are scanned
+    # for the cells of map entities and only the rest of the document is decoded, documents laid out differently
+    # than the harness writes them are decoded in full
+    @staticmethod
+    def from_json(document):
+        rows_start = document.find('"Rows"')
+        players_start = document.find('"Players"', rows_start)
+        rows_end = document.rfind(']', rows_start, players_start) + 1
+        if rows_start < 0 or players_start < 0 or rows_end <= 0:
+            return State.from_game_state(json.loads(document))
+
+        rows = document[rows_start:rows_end]
+        cells = MAP_CELL_PATTERN.findall(rows)
+        if len(cells) != sum(rows.count('"%s"' % cell_type) for cell_type in MAP_CELL_TYPES):
+            return State.from_game_state(json.loads(document))
+
+        # rows are added bottom up and right to left
+        map_cells = []
+        for x, y, cell_type, player_number in cells:
+            x = int(x)
+            y = int(y)
+            if 1 <= x < 18 and 1 <= y < 25:
+                map_cells.append((x - 1, y - 1, cell_type, int(player_number)))
+        map_cells.sort(key=lambda cell: (-cell[1], -cell[0]))
+        return State.from_game_state(json.loads(document[:rows_start] + '"Rows": []' + document[rows_end:]),
+                                     map_cells)
+
+    @staticmethod
+    def from_file(path='output/state.json'):
+        with open(path, 'r') as state_file:
+            return State.from_json(state_file.read())
+
     @staticmethod
     def in_bounds(x, y, width=1):
         return 0 <= y < PLAYING_FIELD_HEIGHT and 0 <= x < PLAYING_FIELD_WIDTH and x + width - 1 < PLAYING_FIELD_WIDTH
@@ -231,70 +454,115 @@ class State:
         return self.players[ENEMY].alien_factory
 
     def is_tracer_bullet_x(self, x):
-        for tracer_bullet in self.tracer_bullets:
-            if tracer_bullet.x == x:
-                return True
+        if x in self.tracer_bullet_columns:
+            return True
         return None
 
+    # the first tracer bullet at x, y, a column holds no more tracer bullets than fit on the playing field
     def get_tracer_bullet(self, x, y):
-        for tracer_bullet in self.tracer_bullets:
-            if tracer_bullet.x == x and tracer_bullet.y == y:
-                return tracer_bullet
+        column = self.tracer_bullet_columns.get(x)
+        if column:
+            for tracer_bullet in column:
+                if tracer_bullet.y == y:
+                    return tracer_bullet
         return None
 
+    def add_tracer_bullet(self, tracer_bullet):
+        if self.shared:
+            self.own_tracer_bullets()
+        self.tracer_bullets.append(tracer_bullet)
+        column = self.tracer_bullet_columns.get(tracer_bullet.x)
+        if column:
+            column.append(tracer_bullet)
+        else:
+            self.tracer_bullet_columns[tracer_bullet.x] = [tracer_bullet]
+
+    def remove_tracer_bullet(self, tracer_bullet):
+        if self.shared:
+            self.own_tracer_bullets()
+        if tracer_bullet in self.tracer_bullets:
+            self.tracer_bullets.remove(tracer_bullet)
+            column = self.tracer_bullet_columns[tracer_bullet.x]
+            column.remove(tracer_bullet)
+            if not column:
+                del self.tracer_bullet_columns[tracer_bullet.x]
+
+    def index_tracer_bullets(self):
+        self.tracer_bullet_columns = {}
+        for tracer_bullet in self.tracer_bullets:
+            self.tracer_bullet_columns.setdefault(tracer_bullet.x, []).append(tracer_bullet)
+
     def get_entity(self, x, y):
-        if self.in_bounds_hv(x, y):
-            return self.playing_field[PLAYING_FIELD_WIDTH * y + x]
-        return None
+        return self.playing_field.get_entity(x, y)
+
+    def get_entity_code(self, x, y):
+        return self.playing_field.get_entity_code(x, y)
 
     def add_entity(self, entity):
-        return self.traverse_map('add', entity, entity.x, entity.y)
+        if self.shared:
+            self.own_board()
+        return self.playing_field.traverse_map(self, 'add', entity, entity.x, entity.y)
 
     def add_entity_unsafe(self, entity):
-        if entity:
-            for x in xrange(entity.x, entity.x + entity.entity_behavior.width):
-                self.playing_field[PLAYING_FIELD_WIDTH * entity.y + x] = entity
+        if self.shared:
+            self.own_board()
+        self.playing_field.add_entity_unsafe(entity)
 
     def remove_entity(self, entity):
-        self.traverse_map('remove', entity, entity.x, entity.y)
+        if self.shared:
+            self.own_board()
+        self.playing_field.traverse_map(self, 'remove', entity, entity.x, entity.y)
 
     def move_entity(self, entity, x, y):
-        self.traverse_map('remove', entity, entity.x, entity.y)
-        if self.traverse_map('add', entity, x, y):
-            entity.x = x
-            entity.y = y
+        if self.shared:
+            self.own_board()
+        self.playing_field.move_entity(self, entity, x, y)
 
     def traverse_map(self, action, entity, target_x, target_y):
-        in_bounds = self.in_bounds(target_x, target_y, entity.entity_behavior.width)
-        if not in_bounds and not action == 'remove':
-            entity.handle_out_of_bounds(self, target_y >= self.height)
-            return False
-        for x in xrange(target_x, target_x + entity.entity_behavior.width):
-            y = target_y
-            if action == 'add':
-                existing_entity = self.get_entity(x, y)
-                if existing_entity:
-                    entity.handle_collision(self, existing_entity)
-                    if existing_entity.entity_behavior.entity_type != TRACER:
-                        return False
-                tracer_bullet = self.get_tracer_bullet(x, y)
-                if tracer_bullet:
-                    entity.handle_collision(self, tracer_bullet)
-                self.playing_field[PLAYING_FIELD_WIDTH * y + x] = entity
-            elif action == 'remove':
-                if self.in_bounds_hv(x, y):
-                    self.playing_field[PLAYING_FIELD_WIDTH * y + x] = None
-        return True
+        if self.shared:
+            self.own_board()
+        return self.playing_field.traverse_map(self, action, entity, target_x, target_y)
 
     def check_open(self, target_x, target_y, width):
-        if not self.in_bounds(target_x, target_y, width):
-            return False
-        for x in xrange(target_x, target_x + width):
-            y = target_y
-            if self.get_entity(x, y):
+        return self.playing_field.check_open(target_x, target_y, width)
+
+    # the future of this state when nobody acts, the timeline is shared by every caller with the same flags until
+    # this state is updated
+    def timeline(self, add_tracers=False, tracer_starting_round=0, add_bullet_tracers=False):
+        key = (add_tracers, tracer_starting_round, add_bullet_tracers)
+        timeline = self.timelines.get(key)
+        if not timeline:
+            timeline = Timeline(self, add_tracers, tracer_starting_round, add_bullet_tracers)
+            self.timelines[key] = timeline
+        return timeline
+
+    # whether nothing can reach, clear or cover the cell in the next round when nobody acts, aliens move, shoot and
+    # explode within two cells, bullets, missiles and tracers only move one cell along their column and a respawning
+    # ship appears anywhere on its row
+    def is_cell_settled(self, x, y):
+        top = max(y - 2, 0)
+        bottom = min(y + 3, PLAYING_FIELD_HEIGHT)
+        for player in self.players.itervalues():
+            if player.respawn_timer == 1 or any(player.alien_rows[top:bottom]):
+                return False
+            ship = player.ship
+            if ship and ship.y == y and ship.x <= x < ship.x + ship.entity_behavior.width:
+                return False
+            for entity in player.bullets + player.missiles:
+                if entity.x == x and abs(entity.y - y) <= 1:
+                    return False
+        for tracer in self.tracers:
+            if tracer.x == x and abs(tracer.y - y) <= 1:
                 return False
         return True
 
+    # whether the cell is empty in the state after NOTHING, a settled cell holds what a clone of this state starts
+    # with, the shields and buildings, so only an unsettled cell needs the next state
+    def is_empty_next_round(self, x, y):
+        if self.is_cell_settled(x, y):
+            return not self.get_static_field()[1].get_entity(x, y)
+        return not self.timeline().get(1).get_entity(x, y)
+
     def get_available_actions(self):
         if self.available_actions:
             return self.available_actions
@@ -303,18 +571,15 @@ class State:
         if not ship:
             return [NOTHING]
 
-        next_state = self.clone()
-        next_state.update(NOTHING)
-
         actions = []
         assert self.your_missile_limit() <= 2
         if len(self.your_missiles()) < self.your_missile_limit():
             actions.append(SHOOT)
         if self.in_bounds(ship.x - 1, ship.y, ship.entity_behavior.width):
-            if not next_state.get_entity(ship.x - 1, ship.y):
+            if self.is_empty_next_round(ship.x - 1, ship.y):
                 actions.append(MOVE_LEFT)
         if self.in_bounds(ship.x + 1, ship.y, ship.entity_behavior.width):
-            if not next_state.get_entity(ship.x + ship.entity_behavior.width, ship.y):
+            if self.is_empty_next_round(ship.x + ship.entity_behavior.width, ship.y):
                 actions.append(MOVE_RIGHT)
         if self.your_lives() > 0:
             if not self.your_alien_factory():
@@ -336,17 +601,14 @@ class State:
         if not ship:
             return [NOTHING]
 
-        next_state = self.clone()
-        next_state.update(NOTHING)
-
         actions = [NOTHING]
         if len(self.your_missiles()) < self.your_missile_limit():
             actions.append(SHOOT)
         if self.in_bounds(ship.x - 1, ship.y, ship.entity_behavior.width):
-            if not next_state.get_entity(ship.x - 1, ship.y):
+            if self.is_empty_next_round(ship.x - 1, ship.y):
                 actions.append(MOVE_LEFT)
         if self.in_bounds(ship.x + 1, ship.y, ship.entity_behavior.width):
-            if not next_state.get_entity(ship.x + ship.entity_behavior.width, ship.y):
+            if self.is_empty_next_round(ship.x + ship.entity_behavior.width, ship.y):
                 actions.append(MOVE_RIGHT)
 
         self.available_evade_actions = actions
@@ -399,8 +661,16 @@ class State:
                         alien.shoot_odds = 0
 
     def update(self, action, add_tracers=False, tracer_starting_round=0, add_bullet_tracers=False):
+        global state_updates
+        state_updates += 1
+        if self.shared:
+            self.own_board()
+            if self.tracer_bullets:
+                self.own_tracer_bullets()
         self.available_actions = None
         self.available_evade_actions = None
+        if self.timelines:
+            self.timelines = {}
 
         self.round_number += 1
         if self.round_number == 40:
@@ -432,8 +702,7 @@ class State:
         if add_tracers and self.your_ship():
             for x in xrange(1, PLAYING_FIELD_WIDTH - 2):
                 y = PLAYING_FIELD_HEIGHT - 3
-                entity = self.get_entity(x, y)
-                if entity and entity.entity_behavior.entity_type == SHIELD:
+                if self.get_entity_code(x, y) == SHIELD_CODE:
                     continue
                 if abs(self.your_ship().x + 1 - x) < self.round_number - tracer_starting_round:
                     Tracer(x, y, 1, self.round_number, x).add(self)
@@ -446,15 +715,17 @@ class State:
         for player_number, player in self.players.iteritems():
             player.respawn_ship(self)
 
-    def select_shooting_alien(self):
-        shoot_at_player = random.randint(0, 2) < 1 # 66% random, 33% at player
+    # rnd is a random.Random, e.g. the one of a match, so shots can be replayed
+    def select_shooting_alien(self, rnd):
+        shoot_at_player = rnd.randint(0, 2) < 1 # 66% random, 33% at player
         if shoot_at_player:
             return self.shoot_at_player(), 0.333
         else:
-            return self.shoot_at_random()
+            return self.shoot_at_random(rnd)
 
     def shoot_at_player(self):
-        front_line = filter(lambda a: a.at_front_line, self.players[ENEMY].aliens)
+        enemy = self.players[ENEMY]
+        front_line = filter(enemy.at_front_line, enemy.aliens)
         closest_alien = None
         closest_distance = 100
         target_x = PLAYING_FIELD_WIDTH / 2
@@ -470,11 +741,11 @@ class State:
             closest_distance = distance
         return closest_alien
 
-    def shoot_at_random(self):
+    def shoot_at_random(self, rnd):
         exclude_alien = self.shoot_at_player()
         trigger_happy = self.trigger_happy_aliens()
         trigger_happy.remove(exclude_alien)
-        return random.choice(trigger_happy), 0.666 / len(trigger_happy)
+        return rnd.choice(trigger_happy), 0.666 / len(trigger_happy)
 
     def trigger_happy_aliens(self):
         enemy_aliens = self.players[ENEMY].aliens
@@ -482,17 +753,18 @@ class State:
             return None
         second_line_y = self.players[ENEMY].alien_bbox.bottom - 2
         aliens = []
-        front_line = filter(lambda a: a.at_front_line, enemy_aliens)
+        front_line = filter(self.players[ENEMY].at_front_line, enemy_aliens)
         for alien in front_line:
             aliens.append(alien)
         second_line = filter(lambda a: a.y == second_line_y, enemy_aliens)
         for alien in second_line:
-            entity_in_front = self.get_entity(alien.x, alien.y + 2)
-            if entity_in_front is None or entity_in_front.entity_behavior.entity_type != ALIEN:
+            if self.get_entity_code(alien.x, alien.y + 2) != ALIEN_CODE:
                 aliens.append(alien)
         return aliens
 
     def set_alien_shoot_odds(self):
+        if self.shared:
+            self.own_board()
         aliens = self.players[ENEMY].aliens
         for alien in aliens:
             alien.shoot_odds = 0
@@ -518,11 +790,12 @@ class State:
         state.available_evade_actions = self.available_evade_actions
         state.tracers = copy.deepcopy(self.tracers)
         state.tracer_bullets = copy.deepcopy(self.tracer_bullets)
+        state.index_tracer_bullets()
         state.tracer_hits = copy.deepcopy(self.tracer_hits)
         state.tracer_shield_hits = copy.deepcopy(self.tracer_shield_hits)
         state.tracer_alien_factory_hits = copy.deepcopy(self.tracer_alien_factory_hits)
 
-        state.playing_field = [None] * (PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT)
+        state.playing_field = new_playing_field()
 
         for entity in state.tracers:
             state.add_entity_unsafe(entity)
@@ -539,8 +812,103 @@ class State:
         return state
 
     def clone(self):
+        global state_clones
+        state_clones += 1
+        if COPY_ON_WRITE:
+            return State(self)
         return copy.deepcopy(self)
 
+    # the playing field of a copy-on-write clone, laid out from its entities the first time it is read
+    def __getattr__(self, name):
+        if name == 'playing_field':
+            self.playing_field = self.build_playing_field()
+            return self.playing_field
+        raise AttributeError(name)
+
+    # the playing field __deepcopy__ would lay out for the entities of this state
+    def build_playing_field(self):
+        # start from the shared shields and buildings, then lay the moving entities on top in the same
+        # order __deepcopy__ adds them, never covering a static entity that __deepcopy__ would add later
+        static_field = self.get_static_field()
+        playing_field = static_field[1].copy()
+        ranks = static_field[2]
+        for entity in self.tracers:
+            playing_field.place_entity(entity, 0, ranks)
+        for player_number, rank in ((YOU, 0), (ENEMY, 5)):
+            player = self.players[player_number]
+            if player.ship:
+                playing_field.place_entity(player.ship, rank + 1, ranks)
+            for entity in player.bullets + player.missiles + player.aliens:
+                playing_field.place_entity(entity, rank + 5, ranks)
+        return playing_field
+
+    # copies the parts this state shares with other states, so the state can change without changing them, shared
+    # entities are never changed, so take entities from a state to change them only after the state owns them
+    def own(self):
+        self.own_board()
+        self.own_tracer_bullets()
+
+    def own_board(self):
+        sharing = self.shared.pop(BOARD, None)
+        if sharing is None:
+            return
+        copy_entity = copy.copy if sharing == LENT else None
+        playing_field = self.__dict__.get('playing_field')
+        copies = {} if sharing == LENT or playing_field is not None else None
+        for player in self.players.itervalues():
+            player.own_entities(copy_entity, copies)
+        self.tracers = copy_entities(self.tracers, copy_entity, copies)
+        if sharing == LENT:
+            # tracer hits stay the tracers they are
+            self.tracer_hits = [copies.get(id(entity), entity) for entity in self.tracer_hits]
+            self.tracer_shield_hits = [copies.get(id(entity), entity) for entity in self.tracer_shield_hits]
+            self.tracer_alien_factory_hits = [copies.get(id(entity), entity)
+                                              for entity in self.tracer_alien_factory_hits]
+        else:
+            self.tracer_hits = clone_entities(self.tracer_hits)
+            self.tracer_shield_hits = clone_entities(self.tracer_shield_hits)
+            self.tracer_alien_factory_hits = clone_entities(self.tracer_alien_factory_hits)
+        # the playing field of a state is never shared, only its entities
+        if playing_field is not None:
+            playing_field.replace_entities(copies)
+
+    def own_tracer_bullets(self):
+        sharing = self.shared.pop(TRACER_BULLETS, None)
+        if sharing is None:
+            return
+        self.tracer_bullets = copy_entities(self.tracer_bullets, copy.copy if sharing == LENT else None)
+        self.index_tracer_bullets()
+
+    # returns (owners, field, ranks) with the shields and buildings of both players on an empty field, ranks
+    # holds the order in which __deepcopy__ would have added each cell
+    def get_static_field(self):
+        owners = []
+        for player_number in [YOU, ENEMY]:
+            player = self.players[player_number]
+            owners.extend([player.shields, player.missile_controller, player.alien_factory])
+
+        if self.static_field:
+            for owner, cached_owner in zip(owners, self.static_field[0]):
+                if owner is not cached_owner:
+                    break
+            else:
+                return self.static_field
+
+        field = new_playing_field()
+        ranks = [0] * (PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT)
+        for player_number, rank in ((YOU, 0), (ENEMY, 5)):
+            player = self.players[player_number]
+            entities = [(player.missile_controller, rank + 2), (player.alien_factory, rank + 3)]
+            entities.extend((shield, rank + 4) for shield in player.shields)
+            for entity, entity_rank in entities:
+                if entity:
+                    field.add_entity_unsafe(entity)
+                    offset = PLAYING_FIELD_WIDTH * entity.y
+                    for x in xrange(entity.x, entity.x + entity.entity_behavior.width):
+                        ranks[offset + x] = entity_rank
+        self.static_field = (owners, field, ranks)
+        return self.static_field
+
     def __eq__(self, other):
         return self.__repr__() == other.__repr__()
 
@@ -561,9 +929,190 @@ class State:
         text += '+!%d/%d+++++++++x%03d+\n' % (len(self.players[YOU].missiles), self.players[YOU].missile_limit, self.players[YOU].kills)
         return text
 
+
+# the states that follow a state round after round when both players do nothing, extended as far as the furthest
+# round asked for, frame 0 is the state itself and every frame is a clone of the one before it updated with NOTHING
+# frames are shared, only read them, clone a frame before updating it
+class Timeline:
+    def __init__(self, state, add_tracers=False, tracer_starting_round=0, add_bullet_tracers=False):
+        self.frames = [state]
+        self.add_tracers = add_tracers
+        self.tracer_starting_round = tracer_starting_round
+        self.add_bullet_tracers = add_bullet_tracers
+
+    # the state rounds after the first frame
+    def get(self, rounds):
+        frames = self.frames
+        while len(frames) <= rounds:
+            next_state = frames[-1].clone()
+            next_state.update(NOTHING, self.add_tracers, self.tracer_starting_round, self.add_bullet_tracers)
+            frames.append(next_state)
+        return frames[rounds]
+
+    def __len__(self):
+        return len(self.frames)
+
+
+# playing field holding a reference to the entity covering each cell
+class PlayingField:
+    def __init__(self, cells=None):
+        if cells is None:
+            cells = [None] * (PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT)
+        self.cells = cells
+
+    def copy(self):
+        return PlayingField(self.cells[:])
+
+    def get_entity(self, x, y):
+        if 0 <= y < PLAYING_FIELD_HEIGHT and 0 <= x < PLAYING_FIELD_WIDTH:
+            return self.cells[PLAYING_FIELD_WIDTH * y + x]
+        return None
+
+    def get_entity_code(self, x, y):
+        entity = self.get_entity(x, y)
+        if entity:
+            return entity.entity_behavior.code
+        return EMPTY_CODE
+
+    def set_cell(self, index, entity):
+        self.cells[index] = entity
+
+    def clear_cell(self, index):
+        self.cells[index] = None
+
+    # points the cells of the entities in copies at their copies, copies maps the id() of an entity to its copy
+    def replace_entities(self, copies):
+        cells = self.cells
+        for index, entity in enumerate(cells):
+            if entity is not None:
+                entity_copy = copies.get(id(entity))
+                if entity_copy is not None:
+                    cells[index] = entity_copy
+
+    def add_entity_unsafe(self, entity):
+        if entity:
+            offset = PLAYING_FIELD_WIDTH * entity.y
+            for x in xrange(entity.x, entity.x + entity.entity_behavior.width):
+                self.set_cell(offset + x, entity)
+
+    # adds the entity to the cells the static field ranks do not reserve for a later entity
+    def place_entity(self, entity, rank, ranks):
+        offset = PLAYING_FIELD_WIDTH * entity.y
+        for x in xrange(entity.x, entity.x + entity.entity_behavior.width):
+            if ranks[offset + x] <= rank:
+                self.set_cell(offset + x, entity)
+
+    def move_entity(self, state, entity, x, y):
+        self.traverse_map(state, 'remove', entity, entity.x, entity.y)
+        if self.traverse_map(state, 'add', entity, x, y):
+            entity.x = x
+            entity.y = y
+
+    def traverse_map(self, state, action, entity, target_x, target_y):
+        in_bounds = State.in_bounds(target_x, target_y, entity.entity_behavior.width)
+        if not in_bounds and not action == 'remove':
+            entity.handle_out_of_bounds(state, target_y >= state.height)
+            return False
+        cells = self.cells
+        offset = PLAYING_FIELD_WIDTH * target_y
+        for x in xrange(target_x, target_x + entity.entity_behavior.width):
+            y = target_y
+            if action == 'add':
+                existing_entity = cells[offset + x]
+                if existing_entity:
+                    entity.handle_collision(state, existing_entity)
+                    if existing_entity.entity_behavior.code != TRACER_CODE:
+                        return False
+                tracer_bullet = state.get_tracer_bullet(x, y)
+                if tracer_bullet:
+                    entity.handle_collision(state, tracer_bullet)
+                cells[offset + x] = entity
+            elif action == 'remove':
+                if State.in_bounds_hv(x, y):
+                    cells[offset + x] = None
+        return True
+
+    def check_open(self, target_x, target_y, width):
+        if not State.in_bounds(target_x, target_y, width):
+            return False
+        for x in xrange(target_x, target_x + width):
+            if self.get_entity(x, target_y):
+                return False
+        return True
+
+
+# playing field keeping the entity code of each cell in a byte array next to the entity references, so
+# occupancy and type tests never touch the entities and copying the codes is a single memcpy
+class CodedPlayingField(PlayingField):
+    def __init__(self, cells=None, codes=None):
+        PlayingField.__init__(self, cells)
+        if codes is None:
+            codes = array('b', [EMPTY_CODE]) * (PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT)
+        self.codes = codes
+
+    def copy(self):
+        return CodedPlayingField(self.cells[:], self.codes[:])
+
+    def get_entity_code(self, x, y):
+        if 0 <= y < PLAYING_FIELD_HEIGHT and 0 <= x < PLAYING_FIELD_WIDTH:
+            return self.codes[PLAYING_FIELD_WIDTH * y + x]
+        return EMPTY_CODE
+
+    def set_cell(self, index, entity):
+        self.cells[index] = entity
+        self.codes[index] = entity.entity_behavior.code
+
+    def clear_cell(self, index):
+        self.cells[index] = None
+        self.codes[index] = EMPTY_CODE
+
+    def traverse_map(self, state, action, entity, target_x, target_y):
+        width = entity.entity_behavior.width
+        if action == 'remove':
+            if 0 <= target_y < PLAYING_FIELD_HEIGHT:
+                offset = PLAYING_FIELD_WIDTH * target_y
+                for x in xrange(max(target_x, 0), min(target_x + width, PLAYING_FIELD_WIDTH)):
+                    self.cells[offset + x] = None
+                    self.codes[offset + x] = EMPTY_CODE
+            return True
+
+        if not State.in_bounds(target_x, target_y, width):
+            entity.handle_out_of_bounds(state, target_y >= state.height)
+            return False
+        cells = self.cells
+        codes = self.codes
+        code = entity.entity_behavior.code
+        offset = PLAYING_FIELD_WIDTH * target_y
+        for index in xrange(offset + target_x, offset + target_x + width):
+            existing_code = codes[index]
+            if existing_code:
+                entity.handle_collision(state, cells[index])
+                if existing_code != TRACER_CODE:
+                    return False
+            if state.tracer_bullets:
+                tracer_bullet = state.get_tracer_bullet(index - offset, target_y)
+                if tracer_bullet:
+                    entity.handle_collision(state, tracer_bullet)
+            cells[index] = entity
+            codes[index] = code
+        return True
+
+    def check_open(self, target_x, target_y, width):
+        if not State.in_bounds(target_x, target_y, width):
+            return False
+        offset = PLAYING_FIELD_WIDTH * target_y
+        return not any(self.codes[offset + target_x:offset + target_x + width])
+
+PLAYING_FIELDS = {'objects': PlayingField, 'codes': CodedPlayingField}
+
+def new_playing_field():
+    return PLAYING_FIELDS[PLAYING_FIELD]()
+
+
 class EntityBehavior:
     def __init__(self, entity_type, symbol, width):
         self.entity_type = entity_type
+        self.code = ENTITY_CODES[entity_type]
         self.symbol = symbol
         self.width = width
 
@@ -601,7 +1150,8 @@ class ShieldBehavior(EntityBehavior):
 
     def add(self, state, entity):
         if EntityBehavior.add(self, state, entity):
-            state.players[entity.player_number].shields.append(entity)
+            player = state.players[entity.player_number]
+            player.shields = player.shields + [entity]
 SHIELD_BEHAVIOR = ShieldBehavior()
 
 class AlienBehavior(EntityBehavior):
@@ -609,7 +1159,12 @@ class AlienBehavior(EntityBehavior):
         EntityBehavior.__init__(self, ALIEN, ALIEN_SYMBOL, 1)
 
     def update(self, state, alien):
-        state.move_entity(alien, alien.x + alien.delta_x, alien.y + alien.delta_y)
+        x = alien.x
+        y = alien.y
+        state.move_entity(alien, x + alien.delta_x, y + alien.delta_y)
+        # aliens destroyed earlier in the round still move on the map but are no longer counted
+        if alien.in_play and (alien.x != x or alien.y != y):
+            state.players[alien.player_number].move_alien_position(x, y, alien.x, alien.y)
 
         if alien.shoot_odds > 0:
             if alien.y > PLAYING_FIELD_HEIGHT - 5:
@@ -619,12 +1174,18 @@ class AlienBehavior(EntityBehavior):
 
     def add(self, state, entity):
         if EntityBehavior.add(self, state, entity):
-            state.players[entity.player_number].aliens.append(entity)
+            player = state.players[entity.player_number]
+            player.aliens.append(entity)
+            player.add_alien_position(entity.x, entity.y)
+            entity.in_play = True
 
     def destroy(self, state, entity):
         EntityBehavior.destroy(self, state, entity)
-        if entity in state.players[entity.player_number].aliens:
-            state.players[entity.player_number].aliens.remove(entity)
+        player = state.players[entity.player_number]
+        if entity.in_play and entity in player.aliens:
+            player.aliens.remove(entity)
+            player.remove_alien_position(entity.x, entity.y)
+            entity.in_play = False
 
     def handle_out_of_bounds(self, state, entity, bottom):
         EntityBehavior.handle_out_of_bounds(self, entity, bottom)
@@ -647,7 +1208,8 @@ class AlienBehavior(EntityBehavior):
         state.update_bbox(entity.player_number)
 
     def explode(self, state, entity):
-        state.players[entity.player_number].exploding_aliens.append(entity)
+        player = state.players[entity.player_number]
+        player.exploding_aliens = player.exploding_aliens + [entity]
         for x in xrange(entity.x - 1 + entity.delta_x, entity.x + 2 + entity.delta_x):
             for y in xrange(entity.y - 1 + entity.delta_y, entity.y + 2 + entity.delta_y):
                 if entity.x + entity.delta_x == x and entity.y + entity.delta_y == y:
@@ -684,29 +1246,32 @@ class TracerBulletBehavior(EntityBehavior):
     def __init__(self):
         EntityBehavior.__init__(self, TRACER_BULLET, TRACER_BULLET_SYMBOL, 1)
 
+    # tracer bullets leaving the playing field never come back and hit nothing, so they are dropped
     def update(self, state, entity):
         entity.y += entity.delta_y
+        if not 0 <= entity.y < PLAYING_FIELD_HEIGHT:
+            self.destroy(state, entity)
+            return
         other = state.get_entity(entity.x, entity.y)
         if other:
             entity.handle_collision(state, other)
 
     def handle_out_of_bounds(self, state, entity, bottom):
         EntityBehavior.handle_out_of_bounds(self, state, entity, bottom)
-        state.destroy(state, entity)
+        self.destroy(state, entity)
 
     def handle_collision(self, state, entity, other):
         other.tracer_bullet_hit = entity
 
     def add(self, state, entity):
-        state.tracer_bullets.append(entity)
+        state.add_tracer_bullet(entity)
         other = state.get_entity(entity.x, entity.y)
         if other:
             entity.handle_collision(state, other)
 
+    # tracer bullets are not on the playing field
     def destroy(self, state, entity):
-        EntityBehavior.destroy(self, state, entity)
-        if entity in state.tracer_bullets:
-            state.tracer_bullets.remove(entity)
+        state.remove_tracer_bullet(entity)
 TRACER_BULLET_BEHAVIOR = TracerBulletBehavior()
 
 
@@ -892,7 +1457,8 @@ class Alien(Entity):
         Entity.__init__(self, x, y, player_number, ALIEN_BEHAVIOR)
         self.delta_y = -1 if player_number == 1 else 1
         self.delta_x = -1
-        self.at_front_line = False
+        # in the aliens of its player
+        self.in_play = False
         self.shoot_odds = 0
 
     def update(self, state):
@@ -906,7 +1472,7 @@ class Alien(Entity):
         clone.id = self.id
         clone.delta_y = self.delta_y
         clone.delta_x = self.delta_x
-        clone.at_front_line = self.at_front_line
+        clone.in_play = self.in_play
         clone.shoot_odds = self.shoot_odds
         return clone
 
@@ -959,6 +1525,7 @@ class Tracer(Entity):
         clone.id = self.id
         clone.energy = self.energy
         clone.target = self.target
+        clone.tracer_bullet_hit = self.tracer_bullet_hit
         return clone
 
     def __repr__(self):
@@ -1012,4 +1579,6 @@ class AlienFactory(Entity):
     def __deepcopy__(self, memo):
         clone = AlienFactory(self.x, self.y, self.player_number)
         clone.id = self.id
-        return clone
\ No newline at end of file
+        return clone
+
+MAP_CELL_ENTITIES = {SHIELD: Shield, BULLET: Bullet, ALIEN: Alien, MISSILE: Missile}
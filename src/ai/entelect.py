@@ -36,6 +36,21 @@ MISSILE_CONTROLLER = 'MissileController'
 TRACER = 'Tracer'
 TRACER_BULLET = 'TracerBullet'
 
+# compact entity type codes for byte encoded playing fields
+ENTITY_CODES = {
+    EMPTY: 0,
+    WALL: 1,
+    ALIEN: 2,
+    SHIP: 3,
+    SHIELD: 4,
+    MISSILE: 5,
+    BULLET: 6,
+    ALIEN_FACTORY: 7,
+    MISSILE_CONTROLLER: 8,
+    TRACER: 9,
+    TRACER_BULLET: 10
+}
+
 WALL_SYMBOL = '#'
 ALIEN_SYMBOL = 'x'
 SHIP_PLAYER1_SYMBOL = 'A'
@@ -1,4 +1,6 @@
 from ai.bot import *
+from ai.parallel import ParallelSearch
+from ai.telemetry import Telemetry
 import cProfile
 import pstats
 import logging
@@ -20,6 +22,9 @@ class Main:
                 self.state_file = os.path.join(argv[1], 'state.json')
                 print self.state_file
         self.profiler = None
+        self.parallel_search = None
+        self.telemetry = None
+        self.behavior_profile = None
 
         with open('bot.yml', 'r') as config_file:
             self.config = yaml.load(config_file.read())
@@ -36,25 +41,73 @@ class Main:
         ps.print_stats()
         return s.getvalue()
 
-    def run(self):
-        start = time.time()
+    # configures logging and forks the search workers, once for every bot server process and once for every round
+    # Main.run plays in process
+    def setup(self):
         logging.config.fileConfig('logging.conf')
         module_logger.debug('Using configuration: %s', self.config)
+        self.parallel_search = None
+        if self.config.get('search_processes'):
+            self.parallel_search = ParallelSearch(self.config['search_processes'])
+        self.telemetry = None
+        if self.config.get('telemetry'):
+            self.telemetry = Telemetry(self.config['telemetry'])
+        # the profile of the behavior trees adds up over every turn the bot plays
+        self.behavior_profile = None
+        if self.config.get('behavior_profile'):
+            self.behavior_profile = BehaviorProfile()
+            if os.path.exists(self.config['behavior_profile']):
+                self.behavior_profile.load(self.config['behavior_profile'])
+
+    def teardown(self):
+        if self.parallel_search:
+            self.parallel_search.close()
+        self.save_behavior_profile()
 
+    # a bot server saves it after every round it replied to as it is usually killed rather than stopped
+    def save_behavior_profile(self):
+        if self.behavior_profile:
+            self.behavior_profile.save(self.config['behavior_profile'])
+            with open(os.path.splitext(self.config['behavior_profile'])[0] + '.folded', 'w') as folded_file:
+                folded_file.write(self.behavior_profile.folded())
+
+    # returns the action of the named bot, searches stop deepening search_deadline seconds after start
+    def play(self, bot_name, state_file, start):
         if self.config['profile']:
             self.start_profiler()
+        if self.telemetry:
+            self.telemetry.start_turn(start)
 
-        game_state = load_state(self.state_file)
+        parse_start = time.time()
+        state = State.from_file(state_file)
+        parse_time = time.time() - parse_start
         bot = BotHaywired()
-        if self.bot:
-            bot = BOTS[self.bot]
-        action = bot.get_action(game_state)
+        if bot_name:
+            bot = BOTS[bot_name]
+        deadline = None
+        if self.config.get('search_deadline'):
+            deadline = start + self.config['search_deadline']
+        bot.behavior_profile = self.behavior_profile
+        behavior_start = time.time()
+        action = bot.get_state_action(state, deadline, self.config.get('search_max_depth'), self.parallel_search,
+                                      self.telemetry)
+
+        if self.telemetry:
+            self.telemetry.end_turn(round=state.round_number, bot=bot.name, action=action, parse=parse_time,
+                                    behavior=time.time() - behavior_start, depth=bot.search_depth)
 
-        write_move(action)
         if self.config['profile']:
             print self.stop_profiler()
-        print 'Bot: %s, Round: %d, Action:%s in %.3f seconds' % \
-              (bot.name, game_state['RoundNumber'], action, time.time() - start)
+        print 'Bot: %s, Round: %d, Action:%s, Search depth: %s in %.3f seconds' % \
+              (bot.name, state.round_number, action, bot.search_depth, time.time() - start)
+        return action
+
+    def run(self):
+        start = time.time()
+        self.setup()
+        action = self.play(self.bot, self.state_file, start)
+        write_move(action)
+        self.teardown()
 
 if __name__ == "__main__":
     Main(sys.argv[1:]).run()
@@ -0,0 +1,327 @@
+from ai.entelect import *
+from ai.domain import *
+from ai.bot import *
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# Headless matches between two bots, played in process without the harness
+#
+# The match is kept as a State seen by player 1 and advanced by the rules of the harness: both ships act, aliens
+# shoot, builds cost lives, missiles score kills on ships and buildings and the match ends when a player runs out of
+# lives, aliens reach a home row or the round limit is reached. Player 2 plays the state turned around as the harness
+# hands it out, so both bots always see themselves at the bottom of the map.
+
+# round 0 of a harness match
+MATCH_START_STATE = 'state.json'
+MATCH_INFO_FILE = 'matchinfo.json'
+
+# player 2 sees the map turned around, its moves to the left are moves to the right for player 1
+FLIPPED_ACTIONS = {MOVE_LEFT: MOVE_RIGHT, MOVE_RIGHT: MOVE_LEFT}
+BUILDINGS = {BUILD_ALIEN_FACTORY: AlienFactory, BUILD_MISSILE_CONTROLLER: MissileController}
+KILL_TYPES = frozenset([SHIP, ALIEN_FACTORY, MISSILE_CONTROLLER])
+
+module_logger = logging.getLogger('main')
+
+
+def other_player(player_number):
+    return ENEMY if player_number == YOU else YOU
+
+
+# the state as player 2 sees it, turned around with the players swapped
+def flip_state(state):
+    flipped = State()
+    flipped.player_number_real = ENEMY
+    flipped.round_number = state.round_number
+    flipped.round_limit = state.round_limit
+
+    for player_number in [YOU, ENEMY]:
+        source = state.players[other_player(player_number)]
+        player = Player()
+        player.player_number = player_number
+        player.kills = source.kills
+        player.lives = source.lives
+        player.respawn_timer = source.respawn_timer
+        player.missile_limit = source.missile_limit
+        player.wave_size = source.wave_size
+        player.aliens_delta_x = -source.aliens_delta_x
+        flipped.players[player_number] = player
+
+    for player_number in [YOU, ENEMY]:
+        source = state.players[other_player(player_number)]
+        entities = [source.ship, source.alien_factory, source.missile_controller]
+        for entity in entities + source.shields + source.bullets + source.missiles + source.aliens:
+            if entity:
+                x = PLAYING_FIELD_WIDTH - entity.x - entity.entity_behavior.width
+                entity.__class__(x, PLAYING_FIELD_HEIGHT - 1 - entity.y, player_number).add(flipped)
+
+    flipped.update_bbox(YOU)
+    flipped.update_bbox(ENEMY)
+    return flipped
+
+
+# the object engine only scores kills on aliens, missiles in a match also score kills on ships and buildings
+class MatchMissileBehavior(MissileBehavior):
+    def handle_collision(self, state, entity, other):
+        MissileBehavior.handle_collision(self, state, entity, other)
+        if other.entity_behavior.entity_type in KILL_TYPES and entity.player_number != other.player_number:
+            state.players[entity.player_number].kills += 1
+
+MATCH_MISSILE_BEHAVIORS = {
+    MISSILE_BEHAVIOR_PLAYER1: MatchMissileBehavior(1),
+    MISSILE_BEHAVIOR_PLAYER2: MatchMissileBehavior(2)
+}
+
+
+class Match:
+    # bots are Bot instances, one for each player, seed seeds the alien shots
+    def __init__(self, bots, game_state, seed=None, names=None, deadline=None, max_depth=None):
+        self.bots = bots
+        self.names = names or [bot.name for bot in bots]
+        self.state = State.from_game_state(game_state)
+        self.state.player_number_real = YOU
+        self.random = random.Random(seed)
+        # seconds a bot may search a round, None to search to a fixed depth
+        self.deadline = deadline
+        self.max_depth = max_depth
+        self.breached = {YOU: False, ENEMY: False}
+        self.winner = None
+        self.win_reason = None
+
+    # the state the bot of the player gets
+    def get_player_state(self, player_number):
+        if player_number == YOU:
+            return self.state.clone()
+        return flip_state(self.state)
+
+    def get_action(self, player_number):
+        state = self.get_player_state(player_number)
+        deadline = None
+        if self.deadline:
+            deadline = time.time() + self.deadline
+        action = self.bots[player_number - 1].get_state_action(state, deadline, self.max_depth)
+        if player_number == ENEMY:
+            action = FLIPPED_ACTIONS.get(action, action)
+        return action
+
+    # plays rounds until the match is over and returns the winner
+    def play(self):
+        while not self.winner:
+            self.play_round()
+        return self.winner
+
+    def play_round(self):
+        actions = {YOU: self.get_action(YOU), ENEMY: self.get_action(ENEMY)}
+        self.update(actions)
+        self.check_game_over()
+
+    # advances the state by one round in the order of the harness, actions are {player number: action} in the
+    # moves of player 1
+    def update(self, actions):
+        state = self.state
+        state.own()
+        state.available_actions = None
+        state.available_evade_actions = None
+        alien_factories = {}
+        for player_number, player in state.players.iteritems():
+            alien_factories[player_number] = player.alien_factory
+            for missile in player.missiles:
+                missile.entity_behavior = MATCH_MISSILE_BEHAVIORS.get(missile.entity_behavior,
+                                                                      missile.entity_behavior)
+
+        state.round_number += 1
+        if state.round_number == TIME_WAVE_SIZE_INCREASE:
+            state.players[YOU].wave_size += 1
+            state.players[ENEMY].wave_size += 1
+
+        # Update the alien commander to spawn new aliens and give aliens orders
+        state.update_aliens(YOU)
+        state.update_aliens(ENEMY)
+        for player_number, player in state.players.iteritems():
+            for alien in player.aliens:
+                if not 0 <= alien.y + alien.delta_y < PLAYING_FIELD_HEIGHT:
+                    self.breached[other_player(player_number)] = True
+        if any(self.breached.values()):
+            return
+        shooting_aliens = []
+        if state.round_number % 6 == 0:
+            shooting_aliens = [self.select_shooting_alien(YOU), self.select_shooting_alien(ENEMY)]
+
+        # Update missiles, moving them forward
+        for player_number, player in state.players.iteritems():
+            player.update_missiles(state)
+
+        # Update alien bullets, moving them forward
+        for player_number, player in state.players.iteritems():
+            player.update_bullets(state)
+
+        # Update aliens, executing their move & shoot orders
+        for player_number, player in state.players.iteritems():
+            player.update_aliens(state)
+        for alien in shooting_aliens:
+            if alien and alien in state.players[alien.player_number].aliens:
+                y = alien.y + (1 if alien.player_number == ENEMY else -1)
+                if State.in_bounds(alien.x, y):
+                    Bullet(alien.x, y, alien.player_number).add(state)
+
+        # Update ships, executing their orders
+        for player_number in [YOU, ENEMY]:
+            self.perform_action(player_number, actions[player_number])
+
+        # Advance respawn timer and respawn ships if necessary.
+        for player_number, player in state.players.iteritems():
+            player.respawn_ship(state)
+            if alien_factories[player_number] and not player.alien_factory:
+                player.wave_size -= 1
+
+    # the alien of the player that shoots at the opponent this round, a third of the time the front line alien
+    # closest to the ship and otherwise any other alien of the front two lines
+    def select_shooting_alien(self, player_number):
+        player = self.state.players[player_number]
+        if not player.aliens:
+            return None
+        forward = 1 if player_number == ENEMY else -1
+        front_y = player.alien_bbox.bottom if player_number == ENEMY else player.alien_bbox.top
+        front_line = [alien for alien in player.aliens if alien.y == front_y]
+        second_line = [alien for alien in player.aliens if alien.y == front_y - 2 * forward and
+                       self.state.get_entity_code(alien.x, alien.y + 2 * forward) != ALIEN_CODE]
+
+        target_x = PLAYING_FIELD_WIDTH / 2
+        ship = self.state.players[other_player(player_number)].ship
+        if ship:
+            target_x = ship.x
+        closest_alien = min(front_line, key=lambda alien: abs(alien.x + alien.delta_x - target_x))
+        trigger_happy = [alien for alien in front_line + second_line if alien is not closest_alien]
+        if not trigger_happy or self.random.randint(0, 2) < 1:
+            return closest_alien
+        return self.random.choice(trigger_happy)
+
+    def perform_action(self, player_number, action):
+        state = self.state
+        player = state.players[player_number]
+        ship = player.ship
+        if not ship:
+            return
+        forward = 1 if player_number == ENEMY else -1
+
+        if action == MOVE_LEFT or action == MOVE_RIGHT:
+            # a ship that would collide with something does not move
+            x = ship.x - 1 if action == MOVE_LEFT else ship.x + 1
+            edge_x = x if action == MOVE_LEFT else x + ship.entity_behavior.width - 1
+            if State.in_bounds(x, ship.y, ship.entity_behavior.width) and not state.get_entity(edge_x, ship.y):
+                state.move_entity(ship, x, ship.y)
+        elif action == SHOOT:
+            if len(player.missiles) < player.missile_limit:
+                missile = Missile(ship.x + 1, ship.y + forward, player_number)
+                missile.entity_behavior = MATCH_MISSILE_BEHAVIORS[missile.entity_behavior]
+                missile.add(state)
+        elif action in BUILDINGS:
+            # a player has one building of a kind, builds that do not fit fail without cost
+            if player.lives <= 0 or player.alien_factory and action == BUILD_ALIEN_FACTORY or \
+                    player.missile_controller and action == BUILD_MISSILE_CONTROLLER or \
+                    not state.check_open(ship.x, ship.y - forward, ship.entity_behavior.width):
+                return
+            player.lives -= 1
+            BUILDINGS[action](ship.x, ship.y - forward, player_number).add(state)
+            if action == BUILD_ALIEN_FACTORY:
+                player.wave_size += 1
+        elif action == BUILD_SHIELD:
+            if player.lives <= 0:
+                return
+            player.lives -= 1
+            # shields replace the aliens, bullets and missiles in the 3x3 area in front of the ship
+            for y in xrange(ship.y + forward, ship.y + 4 * forward, forward):
+                for x in xrange(ship.x, ship.x + ship.entity_behavior.width):
+                    if not State.in_bounds(x, y):
+                        continue
+                    entity = state.get_entity(x, y)
+                    if entity and entity.entity_behavior.entity_type not in [ALIEN, BULLET, MISSILE]:
+                        continue
+                    if entity:
+                        entity.destroy(state)
+                    Shield(x, y, player_number).add(state)
+
+    def has_lost(self, player_number):
+        player = self.state.players[player_number]
+        return self.breached[player_number] or not player.ship and player.lives < 0
+
+    # the kills decide when both players lose or the round limit is reached, player 1 wins a tie
+    def check_game_over(self):
+        lost = [player_number for player_number in [YOU, ENEMY] if self.has_lost(player_number)]
+        if len(lost) == 1:
+            self.winner = other_player(lost[0])
+            if self.breached[lost[0]]:
+                self.win_reason = 'Aliens of player %d reached the home row of player %d' % (self.winner, lost[0])
+            else:
+                self.win_reason = 'Player %d ran out of lives' % lost[0]
+        elif lost or self.state.round_number >= self.state.round_limit:
+            kills = self.state.players[YOU].kills, self.state.players[ENEMY].kills
+            self.winner = YOU if kills[0] >= kills[1] else ENEMY
+            reason = 'Both players lost' if lost else 'Round limit reached'
+            if kills[0] == kills[1]:
+                self.win_reason = '%s with equal kills, player 1 wins the tie' % reason
+            else:
+                self.win_reason = '%s, player %d has more kills' % (reason, self.winner)
+
+    # the match summary the harness writes to matchinfo.json
+    def match_info(self):
+        players = []
+        for player_number in [YOU, ENEMY]:
+            player = self.state.players[player_number]
+            players.append({
+                'PlayerNumber': player_number,
+                'PlayerName': self.names[player_number - 1],
+                'Kills': player.kills,
+                'Lives': player.lives,
+                'MissileLimit': player.missile_limit,
+                'AlienWaveSize': player.wave_size,
+                'RespawnTimer': player.respawn_timer
+            })
+        return {
+            'Players': players,
+            'Rounds': self.state.round_number,
+            'Winner': self.winner,
+            'WinReason': self.win_reason
+        }
+
+
+# plays a match between the named bots of ai.bot.BOTS and returns its match summary, the bots and the alien shots
+# draw from independent streams seeded from seed
+def play_match(bot_names, game_state, seed=None, deadline=None, max_depth=None):
+    rnd = random.Random(seed)
+    bots = [BOTS[bot_name].__class__(rnd.getrandbits(32)) for bot_name in bot_names]
+    match = Match(bots, game_state, rnd.getrandbits(32), bot_names, deadline, max_depth)
+    match.play()
+    return match.match_info()
+
+
+# numbered like the replay folders of the harness, after the ones already there
+def next_replay_directory(replays_directory):
+    numbers = [int(name) for name in os.listdir(replays_directory) if name.isdigit()] if \
+        os.path.isdir(replays_directory) else []
+    return os.path.join(replays_directory, '%04d' % (max(numbers + [0]) + 1))
+
+
+def write_match_info(match_info, directory):
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(os.path.join(directory, MATCH_INFO_FILE), 'w') as match_file:
+        match_file.write(json.dumps(match_info, indent=2))
+
+if __name__ == "__main__":
+    # usage: python -m ai.match player1 player2 [matches] [replays directory]
+    logging.basicConfig(level=logging.WARN)
+    player_names = sys.argv[1:3]
+    matches = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    replays = sys.argv[4] if len(sys.argv) > 4 else 'Replays'
+    start_game_state = load_state(MATCH_START_STATE)
+    for i in xrange(0, matches):
+        start = time.time()
+        info = play_match(player_names, start_game_state)
+        write_match_info(info, next_replay_directory(replays))
+        print 'Match %d: %s in %d rounds, kills %d/%d in %.1f seconds' % \
+              (i + 1, info['WinReason'], info['Rounds'], info['Players'][0]['Kills'], info['Players'][1]['Kills'],
+               time.time() - start)
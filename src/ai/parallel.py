@@ -0,0 +1,135 @@
+from ai.entelect import *
+from ai.strategy import *
+import logging
+import multiprocessing
+import random
+import signal
+import sys
+import time
+
+# Root parallel searches over a pool of worker processes
+#
+# The pool is forked once and reused for every search. The tree search sends the state after every root action to a
+# worker, which deepens its own search of that subtree until the deadline. Monte Carlo sends the same bitboard state
+# to every worker, each grows an independent tree and the root statistics are summed.
+
+# seconds to wait for workers after the deadline before searching in process instead
+PARALLEL_SEARCH_GRACE = 0.1
+
+
+def init_worker():
+    # the parent handles interrupts and terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+# returns the scores of the subtrees searched to every depth that completed before the deadline, depth 1 being the
+# state itself, and the number of nodes searched
+def search_subtree(args):
+    state, deadline, max_depth, include_tracers, loc, pruning = args
+    scores = []
+    nodes = 0
+    try:
+        for depth in xrange(1, max_depth + 1):
+            scores.append(TREE_SEARCH.search_score(state, depth, include_tracers, loc, pruning, 1)[0])
+            nodes += TREE_SEARCH.nodes
+            TREE_SEARCH.deadline = deadline
+    except SearchTimeout:
+        nodes += TREE_SEARCH.nodes
+    finally:
+        TREE_SEARCH.deadline = None
+    return scores, nodes
+
+
+# returns the {action: (visits, score)} root statistics of a tree grown until the deadline and its rollouts
+def search_monte_carlo(args):
+    state, deadline, loc, seed = args
+    search = MonteCarloTreeSearch(seed=seed)
+    root = search.grow(state, deadline, loc)
+    return dict((action, (node.visits, node.score)) for action, node in root.children.iteritems()), search.rollouts
+
+
+class ParallelSearch:
+    def __init__(self, processes=None, seed=None):
+        self.logger = logging.getLogger('search.ParallelSearch')
+        self.pool = multiprocessing.Pool(processes, init_worker)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.random = random.Random(seed)
+        self.depth_reached = 0
+        self.nodes = 0
+        self.rollouts = 0
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    # waits for every result until the deadline plus the grace period, None when a worker is late
+    def collect(self, results, deadline):
+        collected = []
+        try:
+            for result in results:
+                collected.append(result.get(max(0, deadline - time.time()) + PARALLEL_SEARCH_GRACE))
+        except multiprocessing.TimeoutError:
+            self.logger.warn('Workers missed the deadline by %.3f seconds', time.time() - deadline)
+            return None
+        return collected
+
+    # same action as TreeSearchBestAction.search_deepening, the deepest depth every root action completed is used
+    def search_deepening(self, state, deadline, max_depth, include_tracers=False, loc=None, pruning=False):
+        self.depth_reached = 0
+        self.nodes = 0
+
+        # like the tree search, give up when any root action loses the ship
+        children = []
+        for action in state.get_available_evade_actions():
+            new_state = state.clone()
+            new_state.update(action, add_bullet_tracers=True)
+            if not new_state.your_ship():
+                return None
+            children.append((action, new_state))
+        if not children:
+            return None
+
+        results = [self.pool.apply_async(search_subtree, ((new_state, deadline, max_depth, include_tracers, loc,
+                                                           pruning),))
+                   for action, new_state in children]
+        collected = self.collect(results, deadline)
+        if collected is None:
+            action = TREE_SEARCH.search_deepening(state, time.time(), max_depth, include_tracers, loc, pruning)
+            self.depth_reached = TREE_SEARCH.depth_reached
+            self.nodes = TREE_SEARCH.nodes
+            return action
+
+        self.depth_reached = min(len(scores) for scores, nodes in collected)
+        self.nodes = len(children) + sum(nodes for scores, nodes in collected)
+        best_action = None
+        best_score = -sys.maxint
+        for (action, new_state), (scores, nodes) in zip(children, collected):
+            if scores[self.depth_reached - 1] > best_score:
+                best_score = scores[self.depth_reached - 1]
+                best_action = action
+        self.logger.debug('Deepened parallel search to depth %s with %s nodes: %s', self.depth_reached, self.nodes,
+                          best_action)
+        return best_action
+
+    # same as MonteCarloTreeSearch.search with an independent tree in every worker
+    def search_monte_carlo(self, state, budget_ms=MCTS_BUDGET_MS, loc=None):
+        root_state = BitboardState.from_state(state)
+        if not root_state.your_ship():
+            return NOTHING
+
+        deadline = time.time() + budget_ms / 1000.0
+        results = [self.pool.apply_async(search_monte_carlo, ((root_state, deadline, loc,
+                                                               self.random.getrandbits(32)),))
+                   for i in xrange(0, self.processes)]
+        collected = self.collect(results, deadline)
+        if collected is None:
+            return MCTS_SEARCH.search(state, 0, loc)
+
+        stats = {}
+        self.rollouts = 0
+        for tree_stats, rollouts in collected:
+            self.rollouts += rollouts
+            for action, (visits, score) in tree_stats.iteritems():
+                total_visits, total_score = stats.get(action, (0, 0.0))
+                stats[action] = (total_visits + visits, total_score + score)
+        return MCTS_SEARCH.best_action(stats)
@@ -0,0 +1,280 @@
+from ai.entelect import *
+from ai.domain import *
+from collections import OrderedDict
+import Queue
+import mmap
+import struct
+import sys
+import threading
+
+# Binary replay archives, a whole harness match in one file
+#
+# The file starts with a header holding the round count and the player names, followed by one fixed size record a
+# round: the round number and limit, the stats of both players and the map as one byte a cell, the entity code in
+# the low nibble and the player number in the high nibble. Records are read straight from a memory map, so opening
+# an archive reads nothing but the header.
+
+REPLAY_MAGIC = 'E15R'
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct('<4sBH')
+REPLAY_ROUND = struct.Struct('<HH')
+# player number, real player number, kills, lives, respawn timer, missile limit, alien wave size, alien delta x,
+# shot energy, shot energy cost, ship command and the positions of the ship, alien factory and missile controller
+REPLAY_PLAYER = struct.Struct('<BBHbbBBbBBBbbbbbb')
+REPLAY_MAP_SIZE = MAP_WIDTH * MAP_HEIGHT
+REPLAY_RECORD_SIZE = REPLAY_ROUND.size + 2 * REPLAY_PLAYER.size + REPLAY_MAP_SIZE
+
+# rounds a ReplayRounds keeps decoded and how many rounds either side of the last one read it prefetches
+REPLAY_CACHE_SIZE = 32
+REPLAY_PREFETCH = 3
+
+REPLAY_COMMANDS = [None, NOTHING, MOVE_LEFT, MOVE_RIGHT, SHOOT, BUILD_ALIEN_FACTORY, BUILD_MISSILE_CONTROLLER,
+                   BUILD_SHIELD]
+ENTITY_TYPES = dict((code, entity_type) for entity_type, code in ENTITY_CODES.iteritems())
+WIDE_ENTITY_TYPES = frozenset([SHIP, ALIEN_FACTORY, MISSILE_CONTROLLER])
+
+
+def pack_position(entity):
+    if entity:
+        return entity['X'], entity['Y']
+    return -1, -1
+
+
+def pack_round(game_state):
+    record = [REPLAY_ROUND.pack(game_state['RoundNumber'], game_state['RoundLimit'])]
+    for p in game_state['Players']:
+        ship = p['Ship']
+        alien_manager = p['AlienManager']
+        record.append(REPLAY_PLAYER.pack(
+            p['PlayerNumber'], p['PlayerNumberReal'], p['Kills'], p['Lives'], p['RespawnTimer'], p['MissileLimit'],
+            p['AlienWaveSize'], alien_manager['DeltaX'], alien_manager['ShotEnergy'], alien_manager['ShotEnergyCost'],
+            REPLAY_COMMANDS.index(ship.get('Command') if ship else None),
+            *(pack_position(ship) + pack_position(p['AlienFactory']) + pack_position(p['MissileController']))))
+    # the cells of a ship or building all hold its position, so cells are stored by where they are in the map
+    cells = bytearray(REPLAY_MAP_SIZE)
+    for y, row in enumerate(game_state['Map']['Rows']):
+        for x, cell in enumerate(row):
+            if cell:
+                cells[MAP_WIDTH * y + x] = ENTITY_CODES[cell['Type']] | cell['PlayerNumber'] << 4
+    record.append(str(cells))
+    return ''.join(record)
+
+
+# packs the rounds of a harness replay directory, e.g. Replays/0001, into one archive
+def pack_replay(directory, path):
+    game_states = sorted(load_harness_replay_states(directory, 'dir'), key=lambda game_state: game_state['RoundNumber'])
+    with open(path, 'wb') as archive_file:
+        archive_file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, len(game_states)))
+        for p in game_states[0]['Players']:
+            name = p['PlayerName'].encode('utf-8')
+            archive_file.write(struct.pack('<B', len(name)) + name)
+        for game_state in game_states:
+            archive_file.write(pack_round(game_state))
+
+
+# rounds are numbered from 0 in the order of their round numbers, as in a harness replay directory
+class ReplayArchive:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as archive_file:
+            self.data = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rounds = REPLAY_HEADER.unpack_from(self.data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise Exception('Not a version %d replay archive %s' % (REPLAY_VERSION, path))
+        offset = REPLAY_HEADER.size
+        self.player_names = []
+        for i in xrange(0, 2):
+            length = ord(self.data[offset])
+            self.player_names.append(self.data[offset + 1:offset + 1 + length].decode('utf-8'))
+            offset += 1 + length
+        self.records_offset = offset
+
+    def __len__(self):
+        return self.rounds
+
+    def close(self):
+        self.data.close()
+
+    def record(self, round_number):
+        if not 0 <= round_number < self.rounds:
+            raise IndexError('Round %d not in replay archive %s' % (round_number, self.path))
+        return self.records_offset + round_number * REPLAY_RECORD_SIZE
+
+    # the map of a round as one entity code and player number a cell, row by row
+    def cells(self, round_number):
+        offset = self.record(round_number) + REPLAY_ROUND.size + 2 * REPLAY_PLAYER.size
+        return [(code & 0x0f, code >> 4) for code in bytearray(self.data[offset:offset + REPLAY_MAP_SIZE])]
+
+    # the game state of a round with the fields load_state returns that the bots and the ui read, entity ids, the
+    # ship command feedback and the alien waves are not kept and missiles are listed in map order
+    def game_state(self, round_number):
+        offset = self.record(round_number)
+        game_state_round, round_limit = REPLAY_ROUND.unpack_from(self.data, offset)
+        offset += REPLAY_ROUND.size
+
+        rows = []
+        for y in xrange(0, MAP_HEIGHT):
+            rows.append([None] * MAP_WIDTH)
+        missiles = {1: [], 2: []}
+        cell = None
+        for index, (code, player_number) in enumerate(self.cells(round_number)):
+            if not code:
+                continue
+            x = index % MAP_WIDTH
+            y = index / MAP_WIDTH
+            entity_type = ENTITY_TYPES[code]
+            if entity_type in WIDE_ENTITY_TYPES:
+                # the three cells of a ship or building share one cell at its position
+                if cell and cell['Type'] == entity_type and cell['PlayerNumber'] == player_number and \
+                        cell['Y'] == y and cell['X'] + 3 > x:
+                    rows[y][x] = cell
+                    continue
+                cell = self.building(entity_type, player_number, x, y)
+            else:
+                cell = {'X': x, 'Y': y, 'Width': 1, 'Height': 1, 'Alive': True, 'Type': entity_type,
+                        'PlayerNumber': player_number}
+            rows[y][x] = cell
+            if entity_type == MISSILE:
+                missiles[player_number].append(cell)
+
+        players = []
+        for i in xrange(0, 2):
+            (player_number, player_number_real, kills, lives, respawn_timer, missile_limit, wave_size, delta_x,
+             shot_energy, shot_energy_cost, command, ship_x, ship_y, alien_factory_x, alien_factory_y,
+             missile_controller_x, missile_controller_y) = REPLAY_PLAYER.unpack_from(self.data, offset)
+            offset += REPLAY_PLAYER.size
+
+            ship = self.building(SHIP, player_number, ship_x, ship_y)
+            if ship:
+                ship['Command'] = REPLAY_COMMANDS[command]
+            players.append({
+                'PlayerNumber': player_number,
+                'PlayerNumberReal': player_number_real,
+                'PlayerName': self.player_names[i],
+                'Kills': kills,
+                'Lives': lives,
+                'RespawnTimer': respawn_timer,
+                'MissileLimit': missile_limit,
+                'AlienWaveSize': wave_size,
+                'AlienManager': {'DeltaX': delta_x, 'ShotEnergy': shot_energy, 'ShotEnergyCost': shot_energy_cost},
+                'Ship': ship,
+                'AlienFactory': self.building(ALIEN_FACTORY, player_number, alien_factory_x, alien_factory_y),
+                'MissileController': self.building(MISSILE_CONTROLLER, player_number, missile_controller_x,
+                                                   missile_controller_y),
+                'Missiles': missiles[player_number]
+            })
+
+        return {
+            'RoundNumber': game_state_round,
+            'RoundLimit': round_limit,
+            'Map': {'Width': MAP_WIDTH, 'Height': MAP_HEIGHT, 'Rows': rows},
+            'Players': players,
+            '_state_file': '%s:%03d' % (self.path, round_number)
+        }
+
+    @staticmethod
+    def building(entity_type, player_number, x, y):
+        if x < 0:
+            return None
+        return {'X': x, 'Y': y, 'Width': 3, 'Height': 1, 'Alive': True, 'Type': entity_type,
+                'PlayerNumber': player_number}
+
+    def state(self, round_number):
+        return State.from_game_state(self.game_state(round_number))
+
+# the rounds of a replay, read when first used and prefetched around the last round read by a background thread
+#
+# filename is a round state file, e.g. Replays/0001/001/state.json, or a replay archive optionally followed by
+# :round, start_round is the round it names
+class ReplayRounds:
+    def __init__(self, filename, cache_size=REPLAY_CACHE_SIZE, prefetch=REPLAY_PREFETCH):
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.current = 0
+        self.archive = None
+        self.state_files = None
+
+        archive_path, separator, round_number = filename.rpartition(':')
+        if separator and archive_path.endswith('.replay'):
+            filename = archive_path
+        else:
+            round_number = None
+        if filename.endswith('.replay'):
+            self.archive = ReplayArchive(filename)
+            self.rounds = len(self.archive)
+            self.start_round = int(round_number or 0)
+        else:
+            directory = os.path.dirname(os.path.dirname(filename))
+            round_directories = sorted((name for name in os.listdir(directory) if name.isdigit() and
+                                        os.path.exists(os.path.join(directory, name, 'state.json'))), key=int)
+            self.state_files = [os.path.join(directory, name, 'state.json') for name in round_directories]
+            self.rounds = len(self.state_files)
+            self.start_round = int(os.path.basename(os.path.dirname(filename)))
+
+        self.requests = Queue.LifoQueue()
+        self.thread = threading.Thread(target=self.prefetch_rounds)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __len__(self):
+        return self.rounds
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+        if self.archive:
+            self.archive.close()
+
+    def __getitem__(self, round_number):
+        if not 0 <= round_number < self.rounds:
+            raise IndexError('Round %d not in replay' % round_number)
+        self.current = round_number
+        game_state = self.cached(round_number)
+        if game_state is None:
+            game_state = self.load(round_number)
+        for distance in reversed(xrange(1, self.prefetch + 1)):
+            for neighbour in (round_number - distance, round_number + distance):
+                if 0 <= neighbour < self.rounds:
+                    self.requests.put(neighbour)
+        return game_state
+
+    def cached(self, round_number):
+        with self.lock:
+            game_state = self.cache.pop(round_number, None)
+            if game_state is not None:
+                self.cache[round_number] = game_state
+            return game_state
+
+    def load(self, round_number):
+        if self.archive:
+            game_state = self.archive.game_state(round_number)
+        else:
+            game_state = load_state(self.state_files[round_number])
+            game_state['_state_file'] = self.state_files[round_number]
+        with self.lock:
+            self.cache[round_number] = game_state
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return game_state
+
+    # the most recent requests come first, rounds the reader has moved away from are skipped and a round that can
+    # not be read is left for the reader to fail on
+    def prefetch_rounds(self):
+        while True:
+            round_number = self.requests.get()
+            if round_number is None:
+                return
+            with self.lock:
+                wanted = abs(round_number - self.current) <= self.prefetch and round_number not in self.cache
+            if wanted:
+                try:
+                    self.load(round_number)
+                except (IOError, ValueError):
+                    pass
+
+if __name__ == "__main__":
+    # usage: python -m ai.replay Replays/0001 [Replays/0002 ...], writes Replays/0001.replay and so on
+    for replay_directory in sys.argv[1:]:
+        pack_replay(replay_directory, replay_directory.rstrip('/\\') + '.replay')
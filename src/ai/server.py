@@ -0,0 +1,118 @@
+from ai.client import create_server_key, read_server_key, server_address, server_key_file, server_marker
+from ai.main import Main
+from multiprocessing.connection import Client, Listener
+import logging
+import os
+import sys
+import threading
+import time
+
+# Long lived bot server, started by ai.client in the bot directory
+#
+# The configuration, logging and search workers are set up once and the bots, search heuristics and worker
+# processes live across rounds. Rounds are played one at a time in the order the clients connect. A server that finds
+# another one answering on its address exits, so a bot directory never has two. Clients authenticate with a secret
+# every server writes next to its address when it starts, see ai.client.create_server_key.
+
+# seconds without a round after which the server exits, so it does not outlive the match
+BOT_SERVER_IDLE_TIMEOUT = 30
+
+module_logger = logging.getLogger('main')
+
+
+class BotServer:
+    def __init__(self, address=None, idle_timeout=BOT_SERVER_IDLE_TIMEOUT):
+        self.address = address or server_address()
+        self.idle_timeout = idle_timeout
+        self.idle_timer = None
+        # the time the last round was played or the server started listening
+        self.last_round = None
+        self.authkey = None
+        self.main = Main([])
+
+    # the timer only wakes the server when the idle timeout is up, the server decides itself whether it was idle
+    # long enough, so a round accepted as the timer fires is still played, no idle_timeout keeps the server running
+    def start_idle_timer(self):
+        if self.idle_timeout:
+            remaining = max(0, self.last_round + self.idle_timeout - time.time())
+            self.idle_timer = threading.Timer(remaining, self.wake)
+            self.idle_timer.daemon = True
+            self.idle_timer.start()
+
+    def cancel_idle_timer(self):
+        if self.idle_timer:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+
+    def is_idle(self):
+        return bool(self.idle_timeout) and time.time() - self.last_round >= self.idle_timeout
+
+    # connects to the server so it stops waiting for a round
+    def wake(self):
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+
+    # whether another server answers on the address
+    def is_answered(self):
+        try:
+            Client(self.address, authkey=read_server_key(self.address)).close()
+            return True
+        except Exception:
+            return False
+
+    def remove_marker(self):
+        marker = server_marker(self.address)
+        if os.path.exists(marker):
+            os.remove(marker)
+
+    # a failed round never brings the server down, the client plays nothing when it gets no reply
+    def serve(self):
+        if self.is_answered():
+            module_logger.info('Bot server already listening on %s', self.address)
+            self.remove_marker()
+            return
+        # clients keep playing in process until the server is set up and listens
+        self.main.setup()
+        self.authkey = create_server_key(self.address)
+        # a unix socket left behind by a server that was killed
+        if not self.address.startswith('\\\\') and os.path.exists(self.address):
+            os.remove(self.address)
+        listener = Listener(self.address, authkey=self.authkey)
+        self.remove_marker()
+        module_logger.info('Bot server listening on %s', self.address)
+        self.last_round = time.time()
+        self.start_idle_timer()
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception:
+                # a client that failed to authenticate
+                module_logger.exception('Failed to accept a client')
+                continue
+            self.cancel_idle_timer()
+            try:
+                bot_name, state_file, start = connection.recv()
+                self.last_round = time.time()
+                connection.send(self.main.play(bot_name, state_file, start))
+                self.main.save_behavior_profile()
+            except EOFError:
+                # the idle timer or a starting server checking that this one answers
+                pass
+            except Exception:
+                module_logger.exception('Failed to play round')
+            finally:
+                connection.close()
+            if self.is_idle():
+                break
+            self.start_idle_timer()
+        module_logger.info('Bot server idle for %s seconds, stopping', self.idle_timeout)
+        listener.close()
+        os.remove(server_key_file(self.address))
+        self.main.teardown()
+
+if __name__ == "__main__":
+    # usage: python -m ai.server [address [idle seconds]]
+    BotServer(sys.argv[1] if len(sys.argv) > 1 else None,
+              float(sys.argv[2]) if len(sys.argv) > 2 else BOT_SERVER_IDLE_TIMEOUT).serve()
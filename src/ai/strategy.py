@@ -1,6 +1,21 @@
 from ai.entelect import *
+from ai.domain import SHIELD_CODE, Tracer
+from ai.bitboard import BitboardState, bit_position
+from ai.transposition import *
+import json
 import logging
+import math
+import random
 import sys
+import time
+
+# branch and bound the tree search, it returns the same actions with fewer nodes
+SEARCH_PRUNING = True
+
+MCTS_BUDGET_MS = 500
+MCTS_HORIZON = 8
+MCTS_EXPLORATION = 0.7
+MCTS_REWARD_SCALE = 1000.0
 
 
 #
@@ -135,6 +150,84 @@ class BlackboardManager(Decorator):
         return self.child.run(new_blackboard)
 
 
+# calls, successes and failures and the seconds of every node of instrumented behavior trees, added up over turns
+#
+# Nodes are kept by their path from the root, ';' separated class names with the child index of the node when a
+# sibling has the same class, so the nodes of a tree that is built again every turn add up. The seconds of a node
+# include its children, the self seconds do not and are the values of the flame graph stacks.
+class BehaviorProfile:
+    def __init__(self):
+        self.turns = 0
+        self.paths = {}
+        # the seconds of the children of the running nodes
+        self.child_seconds = []
+
+    # wraps the run of every node of the tree, once a turn before it runs
+    def instrument(self, node, label=None):
+        if label is None:
+            self.turns += 1
+            label = node.__class__.__name__
+        self.wrap(node, label)
+        children = list(node.children)
+        if isinstance(node, Decorator):
+            children.append(node.child)
+        names = [child.__class__.__name__ for child in children]
+        for i, child in enumerate(children):
+            child_label = names[i]
+            if names.count(child_label) > 1:
+                child_label = '%s#%d' % (child_label, i)
+            self.instrument(child, label + ';' + child_label)
+
+    def wrap(self, node, path):
+        run = node.run
+        profile = self
+
+        def profiled_run(*args):
+            profile.child_seconds.append(0.0)
+            start = time.time()
+            try:
+                result = run(*args)
+            finally:
+                seconds = time.time() - start
+                child_seconds = profile.child_seconds.pop()
+                if profile.child_seconds:
+                    profile.child_seconds[-1] += seconds
+            profile.add(path, [1, 1 if result else 0, 0 if result else 1, seconds, seconds - child_seconds])
+            return result
+        node.run = profiled_run
+
+    # stats are [calls, successes, failures, seconds, self seconds]
+    def add(self, path, stats):
+        if path in self.paths:
+            self.paths[path] = [total + value for total, value in zip(self.paths[path], stats)]
+        else:
+            self.paths[path] = list(stats)
+
+    # adds a profile saved with save, e.g. by the earlier turns of a bot that runs once a turn
+    def load(self, path):
+        with open(path, 'r') as profile_file:
+            profile = json.load(profile_file)
+        self.turns += profile['turns']
+        for node_path, stats in profile['paths'].iteritems():
+            self.add(str(node_path), stats)
+
+    def save(self, path):
+        with open(path, 'w') as profile_file:
+            json.dump({'turns': self.turns, 'paths': self.paths}, profile_file, sort_keys=True, indent=0)
+
+    # collapsed stacks of the self microseconds of every node, the input of flamegraph.pl and speedscope
+    def folded(self):
+        return ''.join('%s %d\n' % (path, int(round(stats[4] * 1000000)))
+                       for path, stats in sorted(self.paths.iteritems()))
+
+    def __repr__(self):
+        lines = ['Turns: %d' % self.turns, '%8s %8s %8s %10s %10s  %s' %
+                 ('calls', 'success', 'failure', 'seconds', 'self', 'node')]
+        for path, stats in sorted(self.paths.iteritems(), key=lambda item: -item[1][3]):
+            lines.append('%8d %8d %8d %10.3f %10.3f  %s' % (tuple(stats) + (path,)))
+        return '\n'.join(lines)
+
+
 # domain specific
 class HasAlienFactory(Task):
     def run(self, blackboard, flow):
@@ -171,7 +264,9 @@ class KillEnemyAlienFactory(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
+        timeline = state.timeline(True, state.round_number, True)
+        next_state = state
+        rounds = 0
 
         target = None
         while not target and self.limit > 0 and next_state.round_number < next_state.round_limit:
@@ -179,7 +274,8 @@ class KillEnemyAlienFactory(Task):
             if not af:
                 break
 
-            next_state.update(NOTHING, True, state.round_number, True)
+            rounds += 1
+            next_state = timeline.get(rounds)
             self.logger.debug('Next state\n%s', next_state)
             if len(next_state.tracer_alien_factory_hits) > 0:
                 target = next_state.tracer_alien_factory_hits[0]
@@ -416,13 +512,16 @@ class SetTracer(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
+        timeline = state.timeline(True, state.round_number, True)
+        next_state = state
+        rounds = 0
 
         target = None
         if self.target_alien:
             self.logger.debug('Searching for tracer to target alien %s', self.target_alien)
             while next_state.round_number < next_state.round_limit:
-                next_state.update(NOTHING, True, state.round_number, True)
+                rounds += 1
+                next_state = timeline.get(rounds)
                 # self.logger.debug('Next state\n%s', next_state)
                 alien_tracer = filter(lambda tr: tr.target == self.target_alien, next_state.tracer_hits)
                 if len(alien_tracer) > 0:
@@ -432,13 +531,16 @@ class SetTracer(Task):
             if not target:
                 self.logger.debug('No tracer to target alien found %s', self.target_alien)
         else:
-            for i in xrange(0, 12):
-                next_state.update(NOTHING, True, state.round_number, True)
-                self.logger.debug('Next state\n%s', next_state)
-                candidates = filter(lambda tr: False if tr.tracer_bullet_hit and tr.tracer_bullet_hit.shoot_odds == 1.0 else True, next_state.tracer_hits)
-                # candidates = filter(lambda tr: tr.alien.y >= next_state.enemy_alien_bbox().bottom - 3,candidates)
-                if len(candidates) > 0:
-                    target = candidates[0]
+            tracer_plans = blackboard.get('tracer_plans')
+            if tracer_plans:
+                target = tracer_plans.lookup(state, timeline)
+            if not target:
+                target, next_state = SetTracer.first_hit(timeline, 12)
+                if tracer_plans:
+                    if target:
+                        tracer_plans.store(state, target, next_state)
+                    else:
+                        tracer_plans.clear()
 
         self.logger.debug('Target tracer %s', target)
         if not target:
@@ -447,6 +549,59 @@ class SetTracer(Task):
         blackboard.set('tracer', target)
         return True
 
+    # the first tracer of the timeline to hit an alien within rounds without running into a bullet, with the frame it
+    # hits in, hits are only appended and hit tracers are destroyed, so the first candidate of a frame never changes
+    @staticmethod
+    def first_hit(timeline, rounds):
+        for i in xrange(0, rounds):
+            next_state = timeline.get(i + 1)
+            candidates = filter(lambda tr: False if tr.tracer_bullet_hit and tr.tracer_bullet_hit.shoot_odds == 1.0 else True, next_state.tracer_hits)
+            # candidates = filter(lambda tr: tr.alien.y >= next_state.enemy_alien_bbox().bottom - 3,candidates)
+            if len(candidates) > 0:
+                return candidates[0], next_state
+        return None, None
+
+
+# the tracer SetTracer chose, kept by the bot across rounds so it is only planned again when the state diverges
+class TracerPlans:
+    def __init__(self):
+        self.logger = logging.getLogger('strategy.TracerPlans')
+        self.plan = None
+        self.hits = 0
+        self.misses = 0
+
+    # tracer hit an alien in hit_state
+    def store(self, state, tracer, hit_state):
+        self.plan = (state.round_number, tracer.starting_x, tracer.starting_round, hit_state.round_number,
+                     tracer.target.x, tracer.target.y)
+
+    def clear(self):
+        self.plan = None
+
+    # the planned tracer when the ship can still fire it in time and it is still the first tracer of the timeline to
+    # hit, the same alien in the same round, timeline is the tracer timeline of state SetTracer searches
+    def lookup(self, state, timeline):
+        if not self.plan:
+            return None
+        planned_round, starting_x, starting_round, hit_round, target_x, target_y = self.plan
+        ship = state.your_ship()
+        tracer = None
+        if ship and planned_round <= state.round_number and \
+                abs(ship.x + 1 - starting_x) < starting_round - state.round_number:
+            tracer, hit_state = SetTracer.first_hit(timeline, hit_round - state.round_number)
+            if tracer and ((tracer.starting_x, tracer.starting_round, hit_state.round_number) !=
+                           (starting_x, starting_round, hit_round) or
+                           (tracer.target.x, tracer.target.y) != (target_x, target_y)):
+                tracer = None
+
+        if tracer:
+            self.hits += 1
+            self.logger.debug('Reusing tracer plan %s', tracer)
+        else:
+            self.misses += 1
+            self.plan = None
+        return tracer
+
 
 class KillTracer(Task):
     def __init__(self, tracer=None, high_risk_alien=False, wait=True, from_blackboard=False, *children):
@@ -508,11 +663,10 @@ class InDanger(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
+        timeline = state.timeline(True, state.round_number, True)
         for i in xrange(0, 4):  # predict if bullet or missile gonna kill me
-            if next_state.your_lives() < state.your_lives():
+            if timeline.get(i).your_lives() < state.your_lives():
                 return True
-            next_state.update(NOTHING, True, state.round_number, True)
 
         return False
 
@@ -530,7 +684,22 @@ class SearchBestAction(Task):
         loc = None
         if self.include_loc:
             loc = blackboard.get('loc')
-        action = TREE_SEARCH.search(state, self.max_depth, self.include_tracers, loc)
+        deadline = blackboard.get('deadline')
+        start = time.time()
+        if deadline:
+            # the parallel search splits the root actions over worker processes
+            search = blackboard.get('parallel_search') or TREE_SEARCH
+            max_depth = blackboard.get('max_depth') or self.max_depth
+            action = search.search_deepening(state, deadline, max_depth, self.include_tracers, loc, SEARCH_PRUNING)
+            depth = search.depth_reached
+            blackboard.set('search_depth', depth)
+        else:
+            search = TREE_SEARCH
+            action = search.search(state, self.max_depth, self.include_tracers, loc, SEARCH_PRUNING)
+            depth = self.max_depth
+        telemetry = blackboard.get('telemetry')
+        if telemetry:
+            telemetry.add_search(search.__class__.__name__, time.time() - start, search.nodes, depth)
         if action:
             blackboard.set('action', action)
             return True
@@ -545,8 +714,7 @@ class IsAlienTooClose(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
-        next_state.update(NOTHING)
+        next_state = state.timeline().get(1)
         # x  x  x         # -> delta_x = 1
         #                 #
         #    x  AAA       #
@@ -587,9 +755,12 @@ class SetHighRiskAliens(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
+        timeline = state.timeline()
+        next_state = state
+        rounds = 0
         while next_state.your_ship():
-            next_state.update(NOTHING)
+            rounds += 1
+            next_state = timeline.get(rounds)
             enemy_aliens = next_state.enemy_aliens()
             high_risk_aliens = filter(lambda a: a.y > PLAYING_FIELD_HEIGHT - self.dist, enemy_aliens)
             if len(high_risk_aliens) > 0:
@@ -604,9 +775,12 @@ class SetHighRiskExplodingAliens(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
+        timeline = state.timeline()
+        next_state = state
+        rounds = 0
         while len(next_state.enemy_exploding_aliens()) == len(state.enemy_exploding_aliens()):
-            next_state.update(NOTHING)
+            rounds += 1
+            next_state = timeline.get(rounds)
         enemy_aliens = next_state.enemy_exploding_aliens()
         # high_risk_aliens = sorted(enemy_aliens, key=lambda a: (-next_state.enemy_aliens_delta_x() * a.x, a.y))
         high_risk_aliens = enemy_aliens
@@ -620,9 +794,12 @@ class SetHighRiskSpawnAliens(Task):
     def run(self, blackboard, flow):
         Task.run(self, blackboard, flow)
         state = blackboard.get('state')
-        next_state = state.clone()
+        timeline = state.timeline()
+        next_state = state
+        rounds = 0
         while len(next_state.enemy_aliens()) == len(state.enemy_aliens()):
-            next_state.update(NOTHING)
+            rounds += 1
+            next_state = timeline.get(rounds)
         print next_state
         enemy_aliens = next_state.enemy_aliens()
         high_risk_aliens = sorted(enemy_aliens, key=lambda a: (-next_state.enemy_aliens_delta_x() * a.x, a.y))
@@ -636,9 +813,21 @@ strategies = [InDanger(), SearchBestAction(4), SearchBestAction(4, True), Search
               IsInvasionImminent(), IsAlienTooClose(), SetTracer(), IsMoveDangerous(),
               Sequence(SetAction(MOVE_LEFT), IsMoveDangerous())]
 
+class SearchTimeout(Exception):
+    pass
+
+
 class TreeSearchBestAction:
-    def __init__(self):
+    def __init__(self, transposition_table_size=TRANSPOSITION_TABLE_SIZE):
         self.logger = logging.getLogger('search.TreeSearchBestAction')
+        self.transposition_table = None
+        if transposition_table_size:
+            self.transposition_table = TranspositionTable(transposition_table_size)
+        self.history = {}
+        self.killers = {}
+        self.nodes = 0
+        self.deadline = None
+        self.depth_reached = 0
 
     @staticmethod
     def evaluate(state, include_tracers, loc):
@@ -660,13 +849,143 @@ class TreeSearchBestAction:
                 result -= abs(state.your_ship().x - loc)
         return result
 
-    def search(self, state, max_depth, include_tracers=False, loc=None):
+    # whether an entity covering columns x to x + width - 1 of row y and moving dy rows a round can collide with an
+    # alien at alien_x, alien_y within depth rounds, aliens move at most one column or one row a round
+    @staticmethod
+    def can_meet(alien_x, alien_y, x, width, y, dy, depth):
+        if alien_x < x - depth - 1 or alien_x > x + width + depth:
+            return False
+        if dy < 0:
+            return alien_y - 1 <= y <= alien_y + 2 * depth + 1
+        elif dy > 0:
+            return alien_y - depth - 1 <= y <= alien_y + 1
+        return alien_y - 1 <= y <= alien_y + depth + 1
+
+    # upper bound on the evaluation of any position reachable from state within depth rounds, lethal tracers are
+    # ignored, kills only come from missiles that can meet an enemy alien in time and the alien bbox can not shrink
+    # past the lowest alien nothing can reach
+    @staticmethod
+    def upper_bound(state, depth, loc):
+        result = TreeSearchBestAction.evaluate(state, False, loc)
+        you = state.players[YOU]
+        enemy = state.players[ENEMY]
+        can_meet = TreeSearchBestAction.can_meet
+
+        ship_x = PLAYING_FIELD_WIDTH / 2 - 1
+        ship_y = PLAYING_FIELD_HEIGHT - 2
+        can_shoot = True
+        if you.ship:
+            ship_x = you.ship.x
+            ship_y = you.ship.y
+            if loc:
+                result += min(depth, abs(you.ship.x - loc))
+        elif you.respawn_timer <= depth:
+            result += 1000
+        else:
+            can_shoot = False
+
+        destroyers = []
+        for entity in you.missiles + you.bullets:
+            destroyers.append((entity.x, 1, entity.y, -1))
+        for entity in you.aliens:
+            destroyers.append((entity.x - depth, 1 + 2 * depth, entity.y, -1))
+        for entity in enemy.missiles + enemy.bullets:
+            destroyers.append((entity.x, 1, entity.y, 1))
+        for player in (you, enemy):
+            for entity in (player.ship, player.alien_factory, player.missile_controller):
+                if entity:
+                    destroyers.append((entity.x - depth, entity.entity_behavior.width + 2 * depth, entity.y, 0))
+        if can_shoot:
+            destroyers.append((ship_x + 1 - depth, 1 + 2 * depth, ship_y - 1, -1))
+        shields = you.shields + enemy.shields
+
+        # aliens hitting a shield explode and take their neighbours with them
+        aliens = [(alien.x, alien.y) for alien in enemy.aliens]
+        exploding = [(alien_x, alien_y) for alien_x, alien_y in aliens
+                     if any(can_meet(alien_x, alien_y, shield.x, 1, shield.y, 0, depth) for shield in shields)]
+        lowest = -1
+        highest = PLAYING_FIELD_HEIGHT
+        for i, (alien_x, alien_y) in enumerate(aliens):
+            if any(can_meet(alien_x, alien_y, x, width, y, dy, depth) for x, width, y, dy in destroyers):
+                continue
+            if any(abs(alien_x - x) <= 2 and abs(alien_y - y) <= 2 for x, y in exploding):
+                continue
+            if any(j != i and abs(alien_x - x) <= 1 and abs(alien_y - y) <= 1 for j, (x, y) in enumerate(aliens)):
+                continue
+            lowest = max(lowest, alien_y)
+            highest = min(highest, alien_y)
+        result += max(0, state.enemy_alien_bbox().bottom - lowest)
+
+        # a new wave spawns at row 12 when the aliens are gone or reach row 14
+        if highest >= 14 - depth - 1:
+            aliens.extend((x, 12) for x in xrange(0, PLAYING_FIELD_WIDTH))
+
+        for missile in you.missiles:
+            if any(can_meet(alien_x, alien_y, missile.x, 1, missile.y, -1, depth) for alien_x, alien_y in aliens):
+                result += 3
+            else:
+                result += 1
+        if can_shoot and any(can_meet(alien_x, alien_y, ship_x + 1 - depth, 1 + 2 * depth, ship_y - 1, -1, depth)
+                             for alien_x, alien_y in aliens):
+            result += 2 * depth
+        return result
+
+    def search(self, state, max_depth, include_tracers=False, loc=None, pruning=False):
+        return self.search_score(state, max_depth, include_tracers, loc, pruning)[1]
+
+    # (score, action) of state searched from current_depth to max_depth, a root parallel search scores every root
+    # action in a worker by searching its resulting state from depth 1
+    def search_score(self, state, max_depth, include_tracers=False, loc=None, pruning=False, current_depth=0):
         self.logger.debug('Starting state %s\n%s', self.evaluate(state, include_tracers, loc), state)
-        return self.search_recurse(state, state.round_number, max_depth, include_tracers, 0, [], loc)[1]
+        if self.transposition_table:
+            self.transposition_table.new_search()
+        self.nodes = 0
+        if pruning:
+            for action in self.history.keys():
+                self.history[action] /= 2
+            result = self.search_bounded(state, max_depth, include_tracers, current_depth, -sys.maxint - 1, loc)
+        else:
+            result = self.search_recurse(state, state.round_number, max_depth, include_tracers, current_depth, [],
+                                         loc)
+        self.logger.debug('Searched %s nodes', self.nodes)
+        if self.transposition_table:
+            self.logger.debug('Transposition table %s', self.transposition_table.stats())
+        return result
+
+    # searches one round deeper at a time until max_depth or the deadline, returning the action of the deepest
+    # search that completed, the first round is always searched, nodes holds the nodes of every depth searched
+    def search_deepening(self, state, deadline, max_depth, include_tracers=False, loc=None, pruning=False):
+        self.depth_reached = 0
+        best_action = None
+        nodes = 0
+        try:
+            for depth in xrange(1, max_depth + 1):
+                best_action = self.search(state, depth, include_tracers, loc, pruning)
+                nodes += self.nodes
+                self.depth_reached = depth
+                self.deadline = deadline
+        except SearchTimeout:
+            nodes += self.nodes
+            self.logger.debug('Deadline passed searching depth %s', self.depth_reached + 1)
+        finally:
+            self.deadline = None
+            self.nodes = nodes
+        self.logger.debug('Deepened search to depth %s: %s', self.depth_reached, best_action)
+        return best_action
 
     def search_recurse(self, state, starting_round, max_depth, include_tracers, current_depth, actions, loc):
         if state.your_lives() < 0 or current_depth == max_depth:
             return self.evaluate(state, include_tracers, loc), None
+        if self.deadline and time.time() > self.deadline:
+            raise SearchTimeout()
+
+        # positions reached through different move orders are only searched once
+        key = None
+        if self.transposition_table:
+            key = zobrist_key(state)
+            entry = self.transposition_table.lookup(key, max_depth - current_depth)
+            if entry:
+                return entry
 
         best_action = None
         best_score = -sys.maxint
@@ -674,6 +993,7 @@ class TreeSearchBestAction:
         for i, action in enumerate(state.get_available_evade_actions()):
             new_state = state.clone()
             new_state.update(action, add_bullet_tracers=True)
+            self.nodes += 1
             actions.append(action)
 
             self.logger.debug('\n%s %s\n%s', self.evaluate(new_state, include_tracers, loc),
@@ -683,7 +1003,8 @@ class TreeSearchBestAction:
             actions.pop()
 
             if not new_state.your_ship():
-                return best_score, None
+                best_action = None
+                break
 
             if current_score > best_score:
                 best_score = current_score
@@ -691,7 +1012,195 @@ class TreeSearchBestAction:
 
         self.logger.debug('Best tree search action: depth=%s score=%s action=%s',
                           current_depth + 1, best_score, best_action)
+        if key is not None:
+            self.transposition_table.store(key, max_depth - current_depth, best_score, best_action)
+        return best_score, best_action
+
+    # branch and bound version of search_recurse returning the same score and action whenever the score beats
+    # alpha, otherwise any score not above alpha, ties go to the action search_recurse would have tried first
+    def search_bounded(self, state, max_depth, include_tracers, current_depth, alpha, loc):
+        if state.your_lives() < 0 or current_depth == max_depth:
+            return self.evaluate(state, include_tracers, loc), None
+        if self.deadline and time.time() > self.deadline:
+            raise SearchTimeout()
+
+        depth = max_depth - current_depth
+        key = None
+        if self.transposition_table:
+            key = zobrist_key(state)
+            entry = self.transposition_table.lookup(key, depth, alpha)
+            if entry:
+                return entry
+
+        if current_depth > 0:
+            bound = self.upper_bound(state, depth, loc)
+            if bound <= alpha:
+                return bound, None
+
+        # search_recurse gives up on the remaining actions after one that loses the ship
+        children = []
+        ship_lost = False
+        for i, action in enumerate(state.get_available_evade_actions()):
+            new_state = state.clone()
+            new_state.update(action, add_bullet_tracers=True)
+            self.nodes += 1
+            if not new_state.your_ship():
+                ship_lost = True
+                break
+            children.append((i, action, new_state))
+
+        killer = self.killers.get(current_depth)
+        children.sort(key=lambda child: (child[1] != killer, -self.history.get(child[1], 0)))
+
+        best_index = None
+        best_action = None
+        best_score = -sys.maxint
+        for i, action, new_state in children:
+            child_alpha = alpha
+            if best_index is not None:
+                child_alpha = max(alpha, best_score if i > best_index else best_score - 1)
+            current_score, current_action = self.search_bounded(new_state, max_depth, include_tracers,
+                                                                current_depth + 1, child_alpha, loc)
+            if current_score > best_score or (current_score == best_score and i < best_index):
+                best_index = i
+                best_score = current_score
+                best_action = action
+
+        if best_action and best_score > alpha:
+            self.killers[current_depth] = best_action
+            self.history[best_action] = self.history.get(best_action, 0) + (1 << depth)
+        if ship_lost:
+            best_action = None
+        if key is not None:
+            self.transposition_table.store(key, depth, best_score, best_action, best_score > alpha)
         return best_score, best_action
 
 TREE_SEARCH = TreeSearchBestAction()
-SEARCH = {'tree': TREE_SEARCH}
+
+
+class MonteCarloNode:
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.score = 0.0
+
+
+# open loop Monte Carlo tree search over the bitboard engine, every iteration replays the actions from the root
+# drawing the enemy alien that shoots with its shoot odds, so chance nodes are sampled rather than stored
+class MonteCarloTreeSearch:
+    def __init__(self, horizon=MCTS_HORIZON, exploration=MCTS_EXPLORATION, seed=None):
+        self.logger = logging.getLogger('search.MonteCarloTreeSearch')
+        self.horizon = horizon
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        # every iteration draws from its own stream, seeded from self.random, so an iteration only depends on its seed
+        self.rollout_random = random.Random()
+        self.rollouts = 0
+
+    # same terms as TreeSearchBestAction.evaluate without tracers
+    @staticmethod
+    def evaluate(state, loc):
+        you = state.players[YOU]
+        result = you.lives * 5 + you.kills * 2
+        result -= state.players[ENEMY].alien_bbox()[2]
+        if you.missile_controller:
+            result += 10
+        if you.alien_factory:
+            result += 10
+        result -= bin(you.missiles).count('1')
+        if you.ship:
+            result += 1000
+            if loc:
+                result -= abs(bit_position(you.ship & -you.ship)[0] - loc)
+        return result
+
+    # a seed reseeds the search and a number of rollouts replaces the time budget, together they make a search
+    # repeatable
+    def search(self, state, budget_ms=MCTS_BUDGET_MS, loc=None, seed=None, rollouts=None):
+        root_state = BitboardState.from_state(state)
+        if not root_state.your_ship():
+            return NOTHING
+
+        root = self.grow(root_state, time.time() + budget_ms / 1000.0, loc, seed, rollouts)
+        return self.best_action(dict((action, (node.visits, node.score))
+                                     for action, node in root.children.iteritems()))
+
+    # runs iterations from root_state until the deadline, a time.time() value, or until the number of rollouts when
+    # given, and returns the root node
+    def grow(self, root_state, deadline, loc=None, seed=None, rollouts=None):
+        if seed is not None:
+            self.random.seed(seed)
+        root = MonteCarloNode()
+        base = self.evaluate(root_state, loc)
+        self.rollouts = 0
+        while True:
+            self.iterate(root, root_state, base, loc, self.random.getrandbits(32))
+            self.rollouts += 1
+            if rollouts and self.rollouts >= rollouts or not rollouts and time.time() >= deadline:
+                break
+        return root
+
+    # picks from {action: (visits, score)} root statistics, which may be merged from several trees
+    def best_action(self, stats):
+        # losing the ship dominates the rewards, so the mean rather than the visit count separates safe actions
+        action, (visits, score) = max(stats.iteritems(), key=lambda stat: stat[1][1] / stat[1][0])
+        self.logger.debug('Best Monte Carlo action: rollouts=%s visits=%s score=%.3f action=%s', self.rollouts,
+                          visits, score / visits, action)
+        return action
+
+    def iterate(self, root, root_state, base, loc, seed):
+        rnd = self.rollout_random
+        rnd.seed(seed)
+        state = root_state.clone()
+        node = root
+        path = [root]
+        depth = 0
+        while depth < self.horizon and state.your_ship():
+            actions = state.get_move_actions()
+            untried = [action for action in actions if action not in node.children]
+            if untried:
+                action = rnd.choice(untried)
+                node.children[action] = MonteCarloNode()
+            else:
+                action = self.select(node, actions)
+            node = node.children[action]
+            path.append(node)
+            state.update(action, rnd)
+            depth += 1
+            if untried:
+                break
+
+        # random rollout until the horizon or until the ship is lost
+        while depth < self.horizon and state.your_ship():
+            state.update(rnd.choice(state.get_move_actions()), rnd)
+            depth += 1
+
+        reward = (self.evaluate(state, loc) - base) / MCTS_REWARD_SCALE
+        for node in path:
+            node.visits += 1
+            node.score += reward
+
+    # UCB1
+    def select(self, node, actions):
+        log_visits = math.log(node.visits)
+        best_action = None
+        best_value = None
+        for action in actions:
+            child = node.children[action]
+            value = child.score / child.visits + self.exploration * math.sqrt(log_visits / child.visits)
+            if best_value is None or value > best_value:
+                best_action = action
+                best_value = value
+        return best_action
+
+MCTS_SEARCH = MonteCarloTreeSearch()
+SEARCH = {'tree': TREE_SEARCH, 'mcts': MCTS_SEARCH}
+
+if __name__ == "__main__":
+    # usage: python -m ai.strategy behavior_profile.json [stacks.folded]
+    behavior_profile = BehaviorProfile()
+    behavior_profile.load(sys.argv[1])
+    print behavior_profile
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w') as folded_file:
+            folded_file.write(behavior_profile.folded())
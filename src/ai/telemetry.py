@@ -0,0 +1,126 @@
+import ai.domain
+import json
+import os
+import sys
+import time
+try:
+    import resource
+except ImportError:
+    # unix only, records have no peak memory on windows
+    resource = None
+
+# Per turn telemetry of the bot, written as one JSON record a line
+#
+# A record holds the round, the action, the seconds since the turn started, the seconds spent parsing the state and
+# in the behavior tree of the bot, every search with its seconds, nodes and depth, the number of State.clone and
+# State.update calls and the peak memory of the process in kilobytes. Calls in search worker processes are not
+# counted.
+
+TELEMETRY_FILE = 'telemetry.jsonl'
+# the harness kills a bot that takes longer than this
+HARNESS_TIMEOUT = 2.0
+TELEMETRY_PERCENTILES = [50, 95, 99]
+# turns slower than this part of the harness timeout are listed by the summary
+TELEMETRY_WARNING = 0.75
+
+
+def peak_memory():
+    if not resource:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Telemetry:
+    def __init__(self, path=TELEMETRY_FILE):
+        self.path = path
+        self.start = None
+        self.record = None
+        self.start_counts = (ai.domain.state_clones, ai.domain.state_updates)
+
+    # start is the time.time() the turn started
+    def start_turn(self, start):
+        self.start = start
+        self.record = {'searches': []}
+        self.start_counts = (ai.domain.state_clones, ai.domain.state_updates)
+
+    # the State.clone and State.update calls of the process since the turn started
+    def counts(self):
+        clones, updates = self.start_counts
+        return {'clones': ai.domain.state_clones - clones, 'updates': ai.domain.state_updates - updates}
+
+    def add_search(self, name, seconds, nodes, depth):
+        self.record['searches'].append({'search': name, 'seconds': seconds, 'nodes': nodes, 'depth': depth})
+
+    # completes the record of the turn with fields and appends it to the telemetry file
+    def end_turn(self, **fields):
+        record = self.record
+        record.update(fields)
+        record.update(self.counts())
+        record['nodes'] = sum(search['nodes'] for search in record['searches'])
+        record['peak_memory'] = peak_memory()
+        record['seconds'] = time.time() - self.start
+        with open(self.path, 'a') as telemetry_file:
+            telemetry_file.write(json.dumps(record, sort_keys=True) + '\n')
+        return record
+
+
+# the records of telemetry files, directories are searched for telemetry files, each record gets the file it is from
+def load_telemetry(paths):
+    records = []
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, directories, names in os.walk(path)
+                           for name in names if name.endswith('.jsonl'))
+        for telemetry_path in files:
+            with open(telemetry_path, 'r') as telemetry_file:
+                for line in telemetry_file:
+                    if line.strip():
+                        record = json.loads(line)
+                        record['file'] = telemetry_path
+                        records.append(record)
+    return records
+
+
+# nearest rank percentile of sorted values
+def percentile(values, p):
+    if not values:
+        return None
+    return values[max(0, int(-(-len(values) * p // 100)) - 1)]
+
+
+# {name: [percentiles..., max]} of the turn seconds, the parse, behavior tree and search seconds of the records
+def summarize(records):
+    series = {
+        'turn': [record['seconds'] for record in records],
+        'parse': [record['parse'] for record in records if 'parse' in record],
+        'behavior': [record['behavior'] for record in records if 'behavior' in record],
+        'search': [search['seconds'] for record in records for search in record['searches']]
+    }
+    summary = {}
+    for name, values in series.iteritems():
+        values = sorted(values)
+        if values:
+            summary[name] = [percentile(values, p) for p in TELEMETRY_PERCENTILES] + [values[-1]]
+    return summary
+
+
+def print_summary(records, warning=TELEMETRY_WARNING):
+    print 'Turns: %d' % len(records)
+    print '%-8s %s' % ('', ' '.join('%8s' % ('p%d' % p) for p in TELEMETRY_PERCENTILES + [100]))
+    summary = summarize(records)
+    for name in ['turn', 'parse', 'behavior', 'search']:
+        if name in summary:
+            print '%-8s %s' % (name, ' '.join('%7.3fs' % seconds for seconds in summary[name]))
+
+    slow = sorted((record for record in records if record['seconds'] >= warning * HARNESS_TIMEOUT),
+                  key=lambda record: -record['seconds'])
+    print 'Turns over %.0f%% of the %.1f second harness timeout: %d' % (100 * warning, HARNESS_TIMEOUT, len(slow))
+    for record in slow:
+        print '%7.3fs round %s, depth %s, %s nodes, %s clones, %s updates, %s' % \
+              (record['seconds'], record.get('round'), record.get('depth'), record.get('nodes'),
+               record.get('clones'), record.get('updates'), record['file'])
+
+if __name__ == "__main__":
+    # usage: python -m ai.telemetry telemetry.jsonl|directory [...]
+    print_summary(load_telemetry(sys.argv[1:] or [TELEMETRY_FILE]))
@@ -0,0 +1,177 @@
+from ai.entelect import *
+from ai.match import *
+import csv
+import math
+import multiprocessing
+import os
+import random
+import signal
+import sqlite3
+import sys
+import time
+
+# Tournaments of headless matches over a pool of worker processes
+#
+# Every pairing of bots plays a number of matches, each with its own seed drawn from the tournament seed so a
+# tournament can be played again match for match. Workers write the matchinfo.json of their matches to their own
+# directory next to the results, and the results are written as the matches finish, one row a match with the running
+# summary of its pairing.
+
+# z score of the confidence interval of the win rate
+TOURNAMENT_CONFIDENCE_Z = 1.96
+TOURNAMENT_MATCH_FIELDS = ['player1', 'player2', 'seed', 'rounds', 'winner', 'kills1', 'kills2', 'win_reason']
+TOURNAMENT_SUMMARY_FIELDS = ['player1', 'player2', 'matches', 'wins1', 'win_rate', 'win_rate_low', 'win_rate_high',
+                             'mean_kills1', 'mean_kills2', 'mean_rounds', 'rounds_stddev']
+
+# set in every worker by init_worker
+worker_game_state = None
+worker_directory = None
+
+
+def init_worker(game_state, directory):
+    global worker_game_state, worker_directory
+    # the parent handles interrupts and terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_game_state = game_state
+    worker_directory = os.path.join(directory, 'worker%d' % os.getpid())
+
+
+def play_tournament_match(args):
+    bot_names, seed = args
+    match_info = play_match(bot_names, worker_game_state, seed)
+    write_match_info(match_info, next_replay_directory(worker_directory))
+    return bot_names, seed, match_info
+
+
+# the running summary of the matches of one pairing
+class PairingStats:
+    def __init__(self, bot_names):
+        self.bot_names = bot_names
+        self.matches = 0
+        self.wins = 0
+        self.kills = [0, 0]
+        self.rounds = 0
+        self.rounds_squared = 0
+
+    def add(self, match_info):
+        self.matches += 1
+        if match_info['Winner'] == YOU:
+            self.wins += 1
+        for i, player in enumerate(match_info['Players']):
+            self.kills[i] += player['Kills']
+        self.rounds += match_info['Rounds']
+        self.rounds_squared += match_info['Rounds'] ** 2
+
+    # Wilson score interval of the win rate of player 1
+    def win_rate_interval(self):
+        z = TOURNAMENT_CONFIDENCE_Z
+        n = float(self.matches)
+        p = self.wins / n
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return center - spread, center + spread
+
+    def summary(self):
+        n = float(self.matches)
+        low, high = self.win_rate_interval()
+        rounds = self.rounds / n
+        rounds_stddev = math.sqrt(max(0, self.rounds_squared / n - rounds * rounds))
+        return [self.bot_names[0], self.bot_names[1], self.matches, self.wins, self.wins / n, low, high,
+                self.kills[0] / n, self.kills[1] / n, rounds, rounds_stddev]
+
+
+def match_row(bot_names, seed, match_info):
+    return [bot_names[0], bot_names[1], seed, match_info['Rounds'], match_info['Winner'],
+            match_info['Players'][0]['Kills'], match_info['Players'][1]['Kills'], match_info['WinReason']]
+
+
+# appends a row a match followed by the summary of its pairing
+class CsvResults:
+    def __init__(self, path):
+        new_file = not os.path.exists(path)
+        self.results_file = open(path, 'ab')
+        self.writer = csv.writer(self.results_file)
+        if new_file:
+            self.writer.writerow(TOURNAMENT_MATCH_FIELDS + TOURNAMENT_SUMMARY_FIELDS[2:])
+
+    def add(self, bot_names, seed, match_info, stats):
+        self.writer.writerow(match_row(bot_names, seed, match_info) + stats.summary()[2:])
+        self.results_file.flush()
+
+    def close(self):
+        self.results_file.close()
+
+
+# keeps a matches table and a summary table with one row a pairing
+class SqliteResults:
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('create table if not exists matches (%s)' % ', '.join(TOURNAMENT_MATCH_FIELDS))
+        self.connection.execute('create table if not exists summary (%s, primary key (player1, player2))' %
+                                ', '.join(TOURNAMENT_SUMMARY_FIELDS))
+        self.connection.commit()
+
+    def add(self, bot_names, seed, match_info, stats):
+        self.connection.execute('insert into matches values (%s)' % ', '.join('?' * len(TOURNAMENT_MATCH_FIELDS)),
+                                match_row(bot_names, seed, match_info))
+        self.connection.execute('insert or replace into summary values (%s)' %
+                                ', '.join('?' * len(TOURNAMENT_SUMMARY_FIELDS)), stats.summary())
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def open_results(path):
+    if os.path.splitext(path)[1] in ['.db', '.sqlite']:
+        return SqliteResults(path)
+    return CsvResults(path)
+
+
+class Tournament:
+    # pairings are (player 1, player 2) bot names of ai.bot.BOTS, each plays matches matches
+    def __init__(self, pairings, matches, seed=None, processes=None, game_state=None):
+        self.pairings = [tuple(pairing) for pairing in pairings]
+        self.matches = matches
+        self.seed = seed
+        self.processes = processes
+        self.game_state = game_state or load_state(MATCH_START_STATE)
+        self.stats = dict((pairing, PairingStats(pairing)) for pairing in self.pairings)
+
+    # the seed of every match, the same for every tournament with the same seed and the nth match of every pairing
+    # gets the same seed
+    def schedule(self):
+        rnd = random.Random(self.seed)
+        seeds = [rnd.getrandbits(32) for i in xrange(0, self.matches)]
+        return [(pairing, seed) for seed in seeds for pairing in self.pairings]
+
+    # plays every match and adds it to results as it finishes, match information is kept in directory
+    def play(self, results, directory):
+        pool = multiprocessing.Pool(self.processes, init_worker, (self.game_state, directory))
+        try:
+            for bot_names, seed, match_info in pool.imap_unordered(play_tournament_match, self.schedule()):
+                stats = self.stats[bot_names]
+                stats.add(match_info)
+                results.add(bot_names, seed, match_info, stats)
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+        return [self.stats[pairing].summary() for pairing in self.pairings]
+
+if __name__ == "__main__":
+    # usage: python -m ai.tournament results.csv|results.db matches seed player1:player2 [player1:player2 ...]
+    results_path = sys.argv[1]
+    start = time.time()
+    tournament = Tournament([pairing.split(':') for pairing in sys.argv[4:]], int(sys.argv[2]), int(sys.argv[3]))
+    tournament_results = open_results(results_path)
+    try:
+        summaries = tournament.play(tournament_results, os.path.splitext(results_path)[0] + '.matches')
+    finally:
+        tournament_results.close()
+    for summary in summaries:
+        print '%s vs %s: %d matches, player 1 wins %.1f%% (%.1f%%-%.1f%%), kills %.1f/%.1f, rounds %.1f' % \
+              tuple(summary[0:3] + [100 * rate for rate in summary[4:7]] + summary[7:10])
+    print 'Played in %.1f seconds' % (time.time() - start)
@@ -0,0 +1,108 @@
+from ai.entelect import *
+import random
+
+# Zobrist hashing and a bounded transposition table for the tree search
+#
+# A key is the xor of one random number per (entity type, player, cell) for every ship, missile, bullet, alien,
+# tracer, tracer bullet and shield still on the playing field, mixed with a hash of the round number and the player
+# counters the evaluation reads.
+
+ZOBRIST_SEED = 2015
+TRANSPOSITION_TABLE_SIZE = 1 << 16
+
+
+def build_zobrist_table(seed):
+    rnd = random.Random(seed)
+    table = []
+    for code in xrange(0, max(ENTITY_CODES.values()) + 1):
+        table.append([[rnd.getrandbits(64) for i in xrange(0, PLAYING_FIELD_WIDTH * PLAYING_FIELD_HEIGHT)]
+                      for player_number in xrange(0, 3)])
+    return table
+ZOBRIST_TABLE = build_zobrist_table(ZOBRIST_SEED)
+
+
+def zobrist_entities(key, cells, entities):
+    for entity in entities:
+        key ^= cells[PLAYING_FIELD_WIDTH * entity.y + entity.x]
+    return key
+
+
+def zobrist_key(state):
+    counters = [state.round_number]
+    key = 0
+    for player_number, player in state.players.iteritems():
+        counters.extend([player.lives, player.kills, player.respawn_timer, player.missile_limit,
+                         player.aliens_delta_x, player.alien_factory is not None,
+                         player.missile_controller is not None])
+        if player.ship:
+            counters.append(player.ship.is_hit_by_lethal_tracer())
+            key = zobrist_entities(key, ZOBRIST_TABLE[ENTITY_CODES[SHIP]][player_number], [player.ship])
+        key = zobrist_entities(key, ZOBRIST_TABLE[ENTITY_CODES[MISSILE]][player_number], player.missiles)
+        key = zobrist_entities(key, ZOBRIST_TABLE[ENTITY_CODES[BULLET]][player_number], player.bullets)
+        key = zobrist_entities(key, ZOBRIST_TABLE[ENTITY_CODES[ALIEN]][player_number], player.aliens)
+    # destroyed shields stay in the shields of their player but are gone from the playing field
+    cells = state.playing_field.cells
+    for player_number, player in state.players.iteritems():
+        shield_cells = ZOBRIST_TABLE[ENTITY_CODES[SHIELD]][player_number]
+        for shield in player.shields:
+            index = PLAYING_FIELD_WIDTH * shield.y + shield.x
+            if cells[index] is shield:
+                key ^= shield_cells[index]
+    for tracer in state.tracers:
+        key ^= ZOBRIST_TABLE[ENTITY_CODES[TRACER]][tracer.player_number][PLAYING_FIELD_WIDTH * tracer.y + tracer.x]
+    for tracer_bullet in state.tracer_bullets:
+        key ^= ZOBRIST_TABLE[ENTITY_CODES[TRACER_BULLET]][tracer_bullet.player_number][
+            PLAYING_FIELD_WIDTH * tracer_bullet.y + tracer_bullet.x]
+    return key ^ hash(tuple(counters))
+
+
+# two entries per bucket, one kept for the deepest search and one always replaced, entries of previous searches
+# are ignored so the table never has to be cleared
+class TranspositionTable:
+    def __init__(self, size=TRANSPOSITION_TABLE_SIZE):
+        self.mask = size - 1
+        self.depth_preferred = [None] * size
+        self.always_replace = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    # returns the (score, action) stored for a position searched to exactly depth, or None, an entry that only
+    # bounds the score from above is returned when it does not beat alpha
+    def lookup(self, key, depth, alpha=None):
+        index = key & self.mask
+        for entry in (self.depth_preferred[index], self.always_replace[index]):
+            if entry and entry[0] == key and entry[1] == self.generation and entry[2] == depth:
+                if entry[5] or (alpha is not None and entry[3] <= alpha):
+                    self.hits += 1
+                    return entry[3], entry[4]
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, action, exact=True):
+        index = key & self.mask
+        entry = (key, self.generation, depth, score, action, exact)
+        existing = self.depth_preferred[index]
+        if not existing or existing[1] != self.generation or depth >= existing[2]:
+            self.depth_preferred[index] = entry
+        else:
+            self.always_replace[index] = entry
+        self.stores += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
@@ -0,0 +1,196 @@
+from ai.entelect import *
+from ai.domain import *
+from ai.replay import ReplayArchive
+from ai.strategy import MCTS_SEARCH, SEARCH_PRUNING, TREE_SEARCH
+from ai.bot import BotHaywired
+import gc
+import json
+import logging
+import platform
+import sys
+import time
+
+# Benchmarks of the simulation and search hot paths over a corpus of positions
+#
+# The corpus is the bundled states and rounds sampled evenly from harness replay directories or replay archives.
+# Every benchmark runs over the whole corpus a few times and keeps its best run, rates are per second and latencies
+# in seconds. Results are compared with a JSON baseline and a benchmark that got worse by more than the threshold is
+# flagged as a regression.
+#
+# usage: python -m perf.bench [--save] [--threshold 0.2] baseline.json [Replays/0001 Replays/0002.replay ...]
+
+BENCH_BASELINE = 'bench_baseline.json'
+BENCH_STATES = ['state.json', 'state_end.json']
+# rounds sampled from every replay
+BENCH_REPLAY_SAMPLES = 8
+# runs of every benchmark, the best is kept
+BENCH_REPEAT = 5
+# a benchmark repeats the corpus until it ran at least this long
+BENCH_MIN_SECONDS = 0.2
+# relative change flagged as a regression, runs on a busy machine differ by about 15%
+BENCH_THRESHOLD = 0.2
+BENCH_SEARCH_DEPTH = 3
+BENCH_MCTS_ROLLOUTS = 50
+
+
+# the game states of the bundled states and of BENCH_REPLAY_SAMPLES rounds of every replay
+def load_corpus(replays=None, samples=BENCH_REPLAY_SAMPLES):
+    resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../'
+    corpus = [load_state(resources_dir + name) for name in BENCH_STATES]
+    for replay in replays or []:
+        if replay.endswith('.replay'):
+            archive = ReplayArchive(replay)
+            rounds = len(archive)
+            corpus.extend(archive.game_state(i * rounds / samples) for i in xrange(0, min(samples, rounds)))
+            archive.close()
+        else:
+            game_states = sorted(load_harness_replay_states(replay, 'dir'),
+                                 key=lambda game_state: game_state['RoundNumber'])
+            rounds = len(game_states)
+            corpus.extend(game_states[i * rounds / samples] for i in xrange(0, min(samples, rounds)))
+    return corpus
+
+
+# runs work over the corpus until it ran BENCH_MIN_SECONDS, work returns the number of operations it did and the
+# seconds they took, the best operations a second of BENCH_REPEAT runs is returned, like timeit without garbage
+# collection
+def best_rate(work, corpus):
+    best = 0
+    gc.disable()
+    try:
+        for i in xrange(0, BENCH_REPEAT):
+            operations = 0
+            seconds = 0
+            while seconds < BENCH_MIN_SECONDS:
+                for item in corpus:
+                    item_operations, item_seconds = work(item)
+                    operations += item_operations
+                    seconds += item_seconds
+            best = max(best, operations / seconds)
+    finally:
+        gc.enable()
+    return best
+
+
+def clone_work(state):
+    start = time.time()
+    for i in xrange(0, 100):
+        state.clone()
+    return 100, time.time() - start
+
+
+def update_work(state):
+    states = [state.clone() for i in xrange(0, 20)]
+    start = time.time()
+    for next_state in states:
+        next_state.update(NOTHING)
+    return len(states), time.time() - start
+
+
+def from_game_state_work(game_state):
+    start = time.time()
+    for i in xrange(0, 20):
+        State.from_game_state(game_state)
+    return 20, time.time() - start
+
+
+def tree_search_work(state):
+    start = time.time()
+    TREE_SEARCH.search(state, BENCH_SEARCH_DEPTH, True, None, SEARCH_PRUNING)
+    return TREE_SEARCH.nodes, time.time() - start
+
+
+def mcts_work(state):
+    start = time.time()
+    MCTS_SEARCH.search(state, loc=None, seed=1, rollouts=BENCH_MCTS_ROLLOUTS)
+    return MCTS_SEARCH.rollouts, time.time() - start
+
+
+# the mean seconds of the actions of a new bot for every position, its searches run to a fixed depth
+def get_action_latency(corpus):
+    best = None
+    for i in xrange(0, BENCH_REPEAT):
+        start = time.time()
+        for game_state in corpus:
+            BotHaywired().get_action(game_state)
+        seconds = (time.time() - start) / len(corpus)
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+# {name: value} of every benchmark
+def run_benchmarks(corpus):
+    states = [State.from_game_state(game_state) for game_state in corpus]
+    ship_states = [state for state in states if state.your_ship()]
+    return {
+        'clone/s': best_rate(clone_work, states),
+        'update/s': best_rate(update_work, states),
+        'from_game_state/s': best_rate(from_game_state_work, corpus),
+        'tree_search_nodes/s': best_rate(tree_search_work, ship_states),
+        'mcts_rollouts/s': best_rate(mcts_work, ship_states),
+        'get_action_seconds': get_action_latency(corpus)
+    }
+
+
+# rates are worse when they drop, latencies when they rise
+def lower_is_better(name):
+    return name.endswith('_seconds')
+
+
+# [(name, baseline, result, change)] of the benchmarks that got worse by more than threshold, change is the relative
+# change of the result
+def regressions(results, baseline, threshold=BENCH_THRESHOLD):
+    found = []
+    for name, result in sorted(results.iteritems()):
+        if name not in baseline:
+            continue
+        change = result / baseline[name] - 1
+        if lower_is_better(name) and change > threshold or not lower_is_better(name) and change < -threshold:
+            found.append((name, baseline[name], result, change))
+    return found
+
+
+def load_baseline(path):
+    with open(path, 'r') as baseline_file:
+        return json.load(baseline_file)['results']
+
+
+def save_baseline(path, results, corpus_size):
+    with open(path, 'w') as baseline_file:
+        json.dump({'results': results, 'corpus': corpus_size, 'python': platform.python_version(),
+                   'machine': platform.machine()}, baseline_file, sort_keys=True, indent=4)
+
+
+def main(argv):
+    save = '--save' in argv
+    threshold = BENCH_THRESHOLD
+    args = []
+    argv = iter(argv)
+    for arg in argv:
+        if arg == '--threshold':
+            threshold = float(next(argv))
+        elif arg != '--save':
+            args.append(arg)
+    baseline_path = args[0] if args else BENCH_BASELINE
+
+    corpus = load_corpus(args[1:])
+    results = run_benchmarks(corpus)
+    baseline = load_baseline(baseline_path) if os.path.exists(baseline_path) else {}
+    print 'Corpus: %d positions' % len(corpus)
+    for name, result in sorted(results.iteritems()):
+        if name in baseline:
+            print '%-20s %14.6f %+7.1f%%' % (name, result, 100 * (result / baseline[name] - 1))
+        else:
+            print '%-20s %14.6f' % (name, result)
+
+    found = regressions(results, baseline, threshold)
+    for name, baseline_result, result, change in found:
+        print 'Regression: %s %.6f -> %.6f (%+.1f%%)' % (name, baseline_result, result, 100 * change)
+    if save or not baseline:
+        save_baseline(baseline_path, results, len(corpus))
+        print 'Saved baseline %s' % baseline_path
+    return 1 if found else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARN)
+    sys.exit(main(sys.argv[1:]))
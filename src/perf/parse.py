@@ -0,0 +1,15 @@
+from ai.entelect import *
+from ai.domain import *
+import timeit
+
+# compares reading a state with State.from_file against load_state and State.from_game_state
+
+resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../'
+repeat = 500
+for name in ['state.json', 'state_end.json']:
+    path = resources_dir + name
+    load_time = timeit.timeit('State.from_game_state(load_state(path))', number=repeat,
+                              setup='from __main__ import State, load_state, path')
+    file_time = timeit.timeit('State.from_file(path)', number=repeat, setup='from __main__ import State, path')
+    print '%s: ~%.06fs/load_state+from_game_state, ~%.06fs/from_file, %.1fx' % \
+          (name, load_time / repeat, file_time / repeat, load_time / file_time)
@@ -24,10 +24,11 @@ state = State.from_game_state(game_state)
 # time = timeit.timeit('tree_search.search(state, 6)', number=repeat, setup='from __main__ import state, tree_search')
 # print '~%.06fs/tree_search' % (time/repeat)
 
+# a fixed number of rollouts from a fixed seed does the same work every run
 mcts = MCTS_SEARCH
 repeat = 10
-time = timeit.timeit('mcts.search(state)', number=repeat, setup='from __main__ import state, mcts')
-print '~%.06fs/mcts' % (time/repeat)
+time = timeit.timeit('mcts.search(state, seed=1, rollouts=200)', number=repeat, setup='from __main__ import state, mcts')
+print '~%.06fs/mcts, %d rollouts' % (time/repeat, mcts.rollouts)
 
 
 # repeat = 200
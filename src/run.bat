@@ -1 +1 @@
-python -m ai.main haywired %1
+python -m ai.client haywired %1
@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import tempfile
+from ai.entelect import *
+from ai.domain import *
+from ai.strategy import *
+from ai.bot import *
+
+
+class Succeed(Task):
+    def run(self, blackboard, flow):
+        Task.run(self, blackboard, flow)
+        return True
+
+
+class Fail(Task):
+    def run(self, blackboard, flow):
+        Task.run(self, blackboard, flow)
+        return False
+
+
+class BehaviorProfileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_tree(self, profile):
+        behavior = Selector(
+            Sequence(Fail(), Succeed()),
+            Sequence(Succeed(), Inverter(Fail()))
+        )
+        profile.instrument(behavior)
+        flow = []
+        result = behavior.run(Blackboard(), flow)
+        return result, flow
+
+    def test_counts(self):
+        profile = BehaviorProfile()
+        for i in xrange(0, 3):
+            result, flow = self.run_tree(profile)
+            self.assertTrue(result)
+            self.assertEqual(7, len(flow))
+        self.assertEqual(3, profile.turns)
+        self.assertEqual([3, 3, 0], profile.paths['Selector'][0:3])
+        self.assertEqual([3, 0, 3], profile.paths['Selector;Sequence#0'][0:3])
+        self.assertEqual([3, 0, 3], profile.paths['Selector;Sequence#0;Fail'][0:3])
+        self.assertEqual([3, 3, 0], profile.paths['Selector;Sequence#1;Inverter'][0:3])
+        self.assertEqual([3, 0, 3], profile.paths['Selector;Sequence#1;Inverter;Fail'][0:3])
+        # the first sequence fails before its second child runs
+        self.assertNotIn('Selector;Sequence#0;Succeed', profile.paths)
+
+    def test_self_seconds(self):
+        profile = BehaviorProfile()
+        self.run_tree(profile)
+        total = sum(stats[4] for stats in profile.paths.itervalues())
+        self.assertAlmostEqual(profile.paths['Selector'][3], total)
+        for stats in profile.paths.itervalues():
+            self.assertLessEqual(stats[4], stats[3])
+
+    def test_save_load(self):
+        profile = BehaviorProfile()
+        self.run_tree(profile)
+        path = os.path.join(self.directory, 'behavior_profile.json')
+        profile.save(path)
+        loaded = BehaviorProfile()
+        loaded.load(path)
+        self.run_tree(loaded)
+        self.assertEqual(2, loaded.turns)
+        self.assertEqual(2, loaded.paths['Selector'][0])
+
+    def test_folded(self):
+        profile = BehaviorProfile()
+        self.run_tree(profile)
+        lines = profile.folded().splitlines()
+        self.assertEqual(len(profile.paths), len(lines))
+        stack, microseconds = lines[0].rsplit(' ', 1)
+        self.assertEqual('Selector', stack)
+        self.assertGreaterEqual(int(microseconds), 0)
+
+    def test_bot(self):
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        bot = BotHaywired()
+        action = bot.get_state_action(state.clone(), max_depth=2)
+        bot.behavior_profile = BehaviorProfile()
+        self.assertEqual(action, bot.get_state_action(state.clone(), max_depth=2))
+        self.assertEqual(1, bot.behavior_profile.turns)
+        self.assertEqual(1, bot.behavior_profile.paths['Selector'][0])
+        self.assertTrue(any(path.endswith('InDanger') for path in bot.behavior_profile.paths))
@@ -0,0 +1,32 @@
+import unittest
+import os
+import shutil
+import tempfile
+from perf.bench import *
+
+
+class BenchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_corpus(self):
+        corpus = load_corpus()
+        self.assertEqual(len(BENCH_STATES), len(corpus))
+        self.assertTrue(all('Players' in game_state for game_state in corpus))
+
+    def test_regressions(self):
+        baseline = {'clone/s': 1000.0, 'update/s': 1000.0, 'get_action_seconds': 0.1, 'removed/s': 1.0}
+        results = {'clone/s': 700.0, 'update/s': 900.0, 'get_action_seconds': 0.15, 'new/s': 1.0}
+        self.assertEqual(['clone/s', 'get_action_seconds'],
+                         [name for name, baseline_result, result, change in regressions(results, baseline, 0.2)])
+        # faster is never a regression
+        self.assertEqual([], regressions({'clone/s': 2000.0, 'get_action_seconds': 0.01}, baseline, 0.2))
+
+    def test_baseline(self):
+        path = os.path.join(self.directory, 'baseline.json')
+        results = {'clone/s': 1000.0, 'get_action_seconds': 0.1}
+        save_baseline(path, results, 2)
+        self.assertEqual(results, load_baseline(path))
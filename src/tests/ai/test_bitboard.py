@@ -0,0 +1,83 @@
+import unittest
+import os
+import random
+from ai.entelect import *
+from ai.domain import *
+from ai.bitboard import *
+
+# set to a harness replay directory, e.g. Replays/0001, to also check parity on every round of a match
+REPLAY_DIR = os.environ.get('ENTELECT_REPLAY_DIR')
+
+
+class BitboardParityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    # the object engine keeps missiles and bullets that left the playing field in its lists
+    def remove_out_of_bounds(self, state):
+        for player in state.players.values():
+            player.missiles = [e for e in player.missiles if state.get_entity(e.x, e.y) is e]
+            player.bullets = [e for e in player.bullets if state.get_entity(e.x, e.y) is e]
+
+    def player_stats(self, state):
+        return [(p.kills, p.lives, p.respawn_timer, p.missile_limit, p.wave_size, p.aliens_delta_x)
+                for p in (state.players[YOU], state.players[ENEMY])]
+
+    def assert_parity(self, game_state, rounds=10, seeds=3):
+        for seed in xrange(0, seeds):
+            rnd = random.Random(seed)
+            state = State.from_game_state(game_state)
+            bitboard_state = BitboardState.from_state(state)
+            self.assertEqual(repr(state), repr(bitboard_state))
+            for i in xrange(0, rounds):
+                action = rnd.choice(state.get_available_actions())
+                state.update(action)
+                bitboard_state.update(action)
+                self.remove_out_of_bounds(state)
+                self.assertEqual(repr(state), repr(bitboard_state))
+                self.assertEqual(self.player_stats(state), self.player_stats(bitboard_state))
+                self.assertEqual(state.get_available_evade_actions(), bitboard_state.get_available_evade_actions())
+
+    def test_state(self):
+        self.assert_parity(load_state(self.resources_dir + 'state.json'))
+
+    def test_state_end(self):
+        self.assert_parity(load_state(self.resources_dir + '../../state_end.json'), 20)
+
+    def test_replay(self):
+        if not REPLAY_DIR:
+            self.skipTest('ENTELECT_REPLAY_DIR not set')
+        for game_state in load_harness_replay_states(REPLAY_DIR, 'dir'):
+            self.assert_parity(game_state)
+
+    def test_clone_is_independent(self):
+        bitboard_state = BitboardState.from_game_state(load_state(self.resources_dir + 'state.json'))
+        expected = repr(bitboard_state)
+        bitboard_state.clone().update(MOVE_LEFT)
+        self.assertEqual(expected, repr(bitboard_state))
+
+
+class AlienShootOddsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    def test_same_odds(self):
+        for path in ['state.json', '../../state_end.json']:
+            state = State.from_game_state(load_state(self.resources_dir + path))
+            bitboard_state = BitboardState.from_state(state)
+            state.update_aliens(YOU)
+            state.update_aliens(ENEMY)
+            state.set_alien_shoot_odds()
+            bitboard_state.update_alien_commander(YOU)
+            bitboard_state.update_alien_commander(ENEMY)
+            expected = sorted(((alien.x, alien.y), round(alien.shoot_odds, 6))
+                              for alien in state.players[ENEMY].aliens if alien.shoot_odds > 0)
+            self.assertEqual(expected, sorted((bit_position(bit), round(odds, 6))
+                                              for bit, odds in bitboard_state.get_alien_shoot_odds()))
+
+    def test_alien_shoots(self):
+        bitboard_state = BitboardState.from_game_state(load_state(self.resources_dir + 'state.json'))
+        bitboard_state.round_number = 5
+        bullets = bitboard_state.players[ENEMY].bullets
+        bitboard_state.update(NOTHING, random.Random(1))
+        self.assertEqual(1, bin(bitboard_state.players[ENEMY].bullets).count('1') - bin(bullets).count('1'))
@@ -0,0 +1,316 @@
+import unittest
+import os
+import random
+import weakref
+import ai.domain
+from ai.entelect import *
+from ai.domain import *
+from ai.bot import BotRandom
+from ai.match import Match
+
+
+class CopyOnWriteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.states = [
+            State.from_game_state(load_state(self.resources_dir + 'state.json')),
+            State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        ]
+
+    def tearDown(self):
+        ai.domain.COPY_ON_WRITE = True
+
+    def simulate(self, state, copy_on_write):
+        ai.domain.COPY_ON_WRITE = copy_on_write
+        actions = [SHOOT, MOVE_LEFT, NOTHING, MOVE_RIGHT, MOVE_RIGHT, SHOOT, NOTHING, MOVE_LEFT]
+        trace = []
+        next_state = state.clone()
+        for i, action in enumerate(actions):
+            next_state.update(action, True, state.round_number, True)
+            trace.append((repr(next_state), next_state.your_kills(), len(next_state.tracer_hits)))
+            next_state = next_state.clone()
+        return trace
+
+    def test_clone_matches_deepcopy(self):
+        for state in self.states:
+            self.assertEqual(self.simulate(state, False), self.simulate(state, True))
+
+    def test_reads_share_entities(self):
+        state = self.states[1]
+        clone = state.clone()
+        self.assertEqual(state.your_ship().x, clone.your_ship().x)
+        self.assertEqual(repr(state), repr(clone))
+        self.assertIs(state.enemy_aliens(), clone.enemy_aliens())
+        self.assertIs(state.your_ship(), clone.your_ship())
+        clone.update(NOTHING)
+        self.assertIsNot(state.enemy_aliens(), clone.enemy_aliens())
+
+    def test_branches_do_not_leak(self):
+        state = self.states[1]
+        expected = repr(copy.deepcopy(state))
+        left = state.clone()
+        right = state.clone()
+        left.update(MOVE_LEFT)
+        right.update(MOVE_RIGHT)
+        self.assertEqual(expected, repr(state))
+        self.assertNotEqual(repr(left), repr(right))
+
+    def test_clones_are_not_kept(self):
+        state = self.states[1]
+        clone = weakref.ref(state.clone())
+        self.assertIsNone(clone())
+
+    def test_source_mutation_does_not_leak(self):
+        for state in [self.states[1].clone(), self.states[1]]:
+            clone = state.clone()
+            expected = repr(copy.deepcopy(state))
+            state.update(MOVE_LEFT, True, state.round_number, True)
+            self.assertEqual(expected, repr(clone))
+
+
+class PlayingFieldTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    def tearDown(self):
+        ai.domain.PLAYING_FIELD = 'objects'
+
+    def simulate(self, playing_field):
+        ai.domain.PLAYING_FIELD = playing_field
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        trace = []
+        for action in [MOVE_LEFT, SHOOT, NOTHING, MOVE_RIGHT, NOTHING, NOTHING]:
+            state = state.clone()
+            state.update(action, True, state.round_number, True)
+            trace.append((repr(state), state.get_available_evade_actions(), state.check_open(1, 22, 3)))
+        return trace
+
+    def test_codes_match_objects(self):
+        self.assertEqual(self.simulate('objects'), self.simulate('codes'))
+
+    def test_entity_code(self):
+        ai.domain.PLAYING_FIELD = 'codes'
+        state = State.from_game_state(load_state(self.resources_dir + 'state.json'))
+        ship = state.your_ship()
+        self.assertEqual(ENTITY_CODES[SHIP], state.get_entity_code(ship.x + 2, ship.y))
+        self.assertEqual(ENTITY_CODES[EMPTY], state.get_entity_code(ship.x + 3, ship.y))
+        self.assertEqual(ENTITY_CODES[EMPTY], state.get_entity_code(-1, ship.y))
+
+
+class FromJsonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.paths = [self.resources_dir + 'state.json', self.resources_dir + '../../state_end.json']
+
+    def entities(self, state):
+        entities = []
+        for player_number, player in sorted(state.players.iteritems()):
+            for entity in player.aliens + player.shields + player.bullets + player.missiles:
+                entities.append((entity.entity_behavior.entity_type, entity.x, entity.y, entity.player_number))
+        return entities
+
+    def assert_same_state(self, expected, state):
+        self.assertEqual(repr(expected), repr(state))
+        self.assertEqual(self.entities(expected), self.entities(state))
+        for player_number in [YOU, ENEMY]:
+            self.assertEqual(expected.players[player_number].lives, state.players[player_number].lives)
+            self.assertEqual(expected.players[player_number].kills, state.players[player_number].kills)
+
+    def test_from_file(self):
+        for path in self.paths:
+            self.assert_same_state(State.from_game_state(load_state(path)), State.from_file(path))
+
+    def test_other_layout(self):
+        for path in self.paths:
+            game_state = load_state(path)
+            self.assert_same_state(State.from_game_state(game_state), State.from_json(json.dumps(game_state)))
+
+
+class ShootingAlienTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+
+    def test_seeded(self):
+        rnd = random.Random(2)
+        shots = [self.state.select_shooting_alien(rnd) for i in xrange(0, 10)]
+        rnd.seed(2)
+        self.assertEqual(shots, [self.state.select_shooting_alien(rnd) for i in xrange(0, 10)])
+        self.assertTrue(all(alien in self.state.players[ENEMY].aliens for alien, odds in shots))
+
+
+class AlienPositionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    def assert_positions(self, player):
+        rows = [0] * PLAYING_FIELD_HEIGHT
+        columns = [0] * PLAYING_FIELD_WIDTH
+        for alien in player.aliens:
+            rows[alien.y] += 1
+            columns[alien.x] += 1
+        self.assertEqual(rows, player.alien_rows)
+        self.assertEqual(columns, player.alien_columns)
+        occupied_rows = [y for y, count in enumerate(rows) if count]
+        occupied_columns = [x for x, count in enumerate(columns) if count]
+        extent = [-1, -1, -1, -1]
+        if player.aliens:
+            extent = [occupied_rows[0], occupied_columns[-1], occupied_rows[-1], occupied_columns[0]]
+        self.assertEqual(extent, [player.alien_top, player.alien_right, player.alien_bottom, player.alien_left])
+
+    # aliens are added, moved and shot down over a few waves, some rounds with tracers that explode aliens
+    def test_positions_follow_aliens(self):
+        rnd = random.Random(3)
+        for name in ['state.json', '../../state_end.json']:
+            state = State.from_game_state(load_state(self.resources_dir + name))
+            for i in xrange(0, 60):
+                state = state.clone()
+                state.update(rnd.choice(state.get_available_evade_actions()), i % 2 == 0, state.round_number, True)
+                for player_number in [YOU, ENEMY]:
+                    self.assert_positions(state.players[player_number])
+
+    def test_bbox_holds_until_updated(self):
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        player = state.players[ENEMY]
+        bbox = player.alien_bbox
+        front_line = [alien for alien in player.aliens if player.at_front_line(alien)]
+        self.assertTrue(front_line)
+        self.assertTrue(all(alien.y == bbox.bottom for alien in front_line))
+        for alien in front_line:
+            alien.destroy(state)
+        self.assertIs(bbox, player.alien_bbox)
+        state.update_bbox(ENEMY)
+        self.assertLess(player.alien_bbox.bottom, bbox.bottom)
+
+
+class TracerBulletIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    def first_tracer_bullet(self, state, x, y):
+        for tracer_bullet in state.tracer_bullets:
+            if tracer_bullet.x == x and tracer_bullet.y == y:
+                return tracer_bullet
+        return None
+
+    def test_index_follows_tracer_bullets(self):
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        state.set_alien_shoot_odds()
+        tracer_bullets = 0
+        for i in xrange(0, 30):
+            # shoot odds are kept from round to round without bullet tracers, so aliens shoot every round
+            state = state.clone()
+            state.update(NOTHING)
+            tracer_bullets = max(tracer_bullets, len(state.tracer_bullets))
+            self.assertEqual(sorted(state.tracer_bullets, key=lambda tracer_bullet: tracer_bullet.id),
+                             sorted((tracer_bullet for column in state.tracer_bullet_columns.itervalues()
+                                     for tracer_bullet in column), key=lambda tracer_bullet: tracer_bullet.id))
+            self.assertTrue(all(0 <= tracer_bullet.y < PLAYING_FIELD_HEIGHT for tracer_bullet in state.tracer_bullets))
+            for x in xrange(0, PLAYING_FIELD_WIDTH):
+                for y in xrange(0, PLAYING_FIELD_HEIGHT):
+                    self.assertIs(self.first_tracer_bullet(state, x, y), state.get_tracer_bullet(x, y))
+        self.assertGreater(tracer_bullets, 0)
+
+
+class EntityListTestCase(unittest.TestCase):
+    def test_remove(self):
+        aliens = EntityList(Alien(x, 5, ENEMY) for x in xrange(0, 5))
+        alien = aliens[2]
+        clone = alien.__deepcopy__(None)
+        self.assertIn(clone, aliens)
+        aliens.remove(clone)
+        self.assertNotIn(alien, aliens)
+        self.assertEqual([0, 1, 3, 4], [a.x for a in aliens])
+        self.assertEqual([a.id for a in aliens], aliens.ids)
+        aliens.append(alien)
+        self.assertEqual([0, 1, 3, 4, 2], [a.x for a in aliens])
+        self.assertEqual([a.id for a in aliens], aliens.ids)
+
+    def test_clone(self):
+        aliens = EntityList(Alien(x, 5, ENEMY) for x in xrange(0, 3))
+        for clone in [clone_entities(aliens), copy.deepcopy(aliens)]:
+            self.assertIsInstance(clone, EntityList)
+            self.assertEqual(aliens.ids, clone.ids)
+            self.assertIsNot(aliens.ids, clone.ids)
+            self.assertFalse(any(a is b for a, b in zip(aliens, clone)))
+            clone.remove(clone[0])
+            self.assertEqual(3, len(aliens.ids))
+        # plain lists, e.g. filtered ones, clone too
+        self.assertEqual(aliens.ids, clone_entities(list(aliens)).ids)
+
+
+class TimelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+
+    def test_frames_match_updates(self):
+        timeline = self.state.timeline(True, self.state.round_number, True)
+        next_state = self.state
+        for i in xrange(1, 13):
+            next_state = next_state.clone()
+            next_state.update(NOTHING, True, self.state.round_number, True)
+            frame = timeline.get(i)
+            self.assertEqual(repr(next_state), repr(frame))
+            self.assertEqual(next_state.round_number, frame.round_number)
+            self.assertEqual([(tr.starting_x, tr.starting_round, bool(tr.tracer_bullet_hit))
+                              for tr in next_state.tracer_hits],
+                             [(tr.starting_x, tr.starting_round, bool(tr.tracer_bullet_hit))
+                              for tr in frame.tracer_hits])
+        self.assertIs(self.state, timeline.get(0))
+        self.assertEqual(13, len(timeline))
+
+    def test_shared_until_update(self):
+        timeline = self.state.timeline()
+        frame = timeline.get(2)
+        self.assertIs(timeline, self.state.timeline())
+        self.assertIs(frame, self.state.timeline().get(2))
+        self.assertIsNot(timeline, self.state.timeline(True, self.state.round_number, True))
+        self.assertIsNot(timeline, self.state.clone().timeline())
+        self.state.update(NOTHING)
+        self.assertIsNot(timeline, self.state.timeline())
+        self.assertEqual(repr(frame), repr(self.state.timeline().get(1)))
+
+    def test_tracer_clone_keeps_tracer_bullet_hit(self):
+        tracer = Tracer(5, 10, YOU, self.state.round_number, 5)
+        tracer.tracer_bullet_hit = TracerBullet(5, 9, ENEMY, 1.0)
+        self.assertIs(tracer.tracer_bullet_hit, tracer.__deepcopy__(None).tracer_bullet_hit)
+
+
+class EmptyNextRoundTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    def assert_matches_update(self, state):
+        ship = state.your_ship()
+        if not ship:
+            return 0
+        next_state = state.clone()
+        next_state.update(NOTHING)
+        settled = 0
+        for x in [ship.x - 1, ship.x + ship.entity_behavior.width]:
+            if 0 <= x < PLAYING_FIELD_WIDTH:
+                settled += state.is_cell_settled(x, ship.y)
+                self.assertEqual(not next_state.get_entity(x, ship.y), state.is_empty_next_round(x, ship.y),
+                                 'round %d x=%d\n%s' % (state.round_number, x, state))
+        return settled
+
+    def test_matches_update_over_match(self):
+        match = Match([BotRandom(), BotRandom()], load_state(self.resources_dir + 'state.json'), 7)
+        settled = 0
+        while not match.winner and match.state.round_number < 150:
+            for player_number in [YOU, ENEMY]:
+                state = match.get_player_state(player_number)
+                settled += self.assert_matches_update(state)
+                for action in [NOTHING, MOVE_LEFT, MOVE_RIGHT, SHOOT]:
+                    next_state = state.clone()
+                    next_state.update(action, add_bullet_tracers=True)
+                    settled += self.assert_matches_update(next_state)
+            match.play_round()
+        self.assertGreater(settled, 0)
+
+    def test_matches_update_with_tracers(self):
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        timeline = state.timeline(True, state.round_number, True)
+        for i in xrange(0, 12):
+            self.assert_matches_update(timeline.get(i))
@@ -0,0 +1,109 @@
+import unittest
+import os
+from ai.entelect import *
+from ai.domain import *
+from ai.bot import *
+from ai.match import *
+
+
+class MatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.game_state = load_state(self.resources_dir + 'state.json')
+
+    def new_match(self, seed=1):
+        return Match([BotRandom(), BotRandom()], self.game_state, seed)
+
+    def test_flip_twice(self):
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        self.assertEqual(repr(state), repr(flip_state(flip_state(state))))
+
+    def test_flip_players(self):
+        state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        flipped = flip_state(state)
+        self.assertEqual(ENEMY, flipped.player_number_real)
+        self.assertEqual(state.players[ENEMY].kills, flipped.your_kills())
+        self.assertEqual(state.players[ENEMY].lives, flipped.your_lives())
+        self.assertEqual(PLAYING_FIELD_HEIGHT - 2, flipped.your_ship().y)
+
+    def test_both_ships_act(self):
+        match = self.new_match()
+        ship_x = match.state.players[YOU].ship.x, match.state.players[ENEMY].ship.x
+        match.update({YOU: MOVE_LEFT, ENEMY: MOVE_RIGHT})
+        self.assertEqual((ship_x[0] - 1, ship_x[1] + 1),
+                         (match.state.players[YOU].ship.x, match.state.players[ENEMY].ship.x))
+
+    def test_shoot(self):
+        match = self.new_match()
+        match.update({YOU: SHOOT, ENEMY: SHOOT})
+        ship = match.state.players[ENEMY].ship
+        self.assertEqual(1, len(match.state.players[YOU].missiles))
+        self.assertEqual(MISSILE, match.state.get_entity(ship.x + 1, ship.y + 1).entity_behavior.entity_type)
+
+    def test_blocked_move(self):
+        match = self.new_match()
+        ship = match.state.players[YOU].ship
+        Bullet(ship.x + 3, ship.y, ENEMY).add(match.state)
+        match.perform_action(YOU, MOVE_RIGHT)
+        self.assertIs(ship, match.state.players[YOU].ship)
+        self.assertEqual(PLAYING_FIELD_WIDTH / 2 - 1, ship.x)
+
+    def test_build_costs_a_life(self):
+        match = self.new_match()
+        lives = match.state.players[YOU].lives
+        wave_size = match.state.players[YOU].wave_size
+        match.perform_action(YOU, BUILD_ALIEN_FACTORY)
+        self.assertIsNotNone(match.state.players[YOU].alien_factory)
+        self.assertEqual(lives - 1, match.state.players[YOU].lives)
+        self.assertEqual(wave_size + 1, match.state.players[YOU].wave_size)
+        # a second alien factory fails without cost
+        match.perform_action(YOU, BUILD_ALIEN_FACTORY)
+        self.assertEqual(lives - 1, match.state.players[YOU].lives)
+
+    def test_build_shield(self):
+        match = self.new_match()
+        ship = match.state.players[ENEMY].ship
+        shields = len(match.state.players[ENEMY].shields)
+        match.perform_action(ENEMY, BUILD_SHIELD)
+        self.assertEqual(shields + 9, len(match.state.players[ENEMY].shields))
+        for y in xrange(ship.y + 1, ship.y + 4):
+            self.assertEqual(SHIELD_CODE, match.state.get_entity_code(ship.x + 1, y))
+
+    def test_missile_kills_ship(self):
+        match = self.new_match()
+        ship = match.state.players[ENEMY].ship
+        match.state.players[YOU].missile_limit = 2
+        missile = Missile(ship.x + 1, ship.y + 1, YOU)
+        missile.add(match.state)
+        match.update({YOU: NOTHING, ENEMY: NOTHING})
+        self.assertIsNone(match.state.players[ENEMY].ship)
+        self.assertEqual(1, match.state.players[YOU].kills)
+
+    def test_alien_shots(self):
+        match = self.new_match()
+        while match.state.round_number < 6:
+            match.update({YOU: NOTHING, ENEMY: NOTHING})
+        self.assertEqual(1, len(match.state.players[YOU].bullets))
+        self.assertEqual(1, len(match.state.players[ENEMY].bullets))
+
+    def test_play(self):
+        match = self.new_match()
+        self.assertIn(match.play(), [YOU, ENEMY])
+        match_info = match.match_info()
+        self.assertEqual(match.state.round_number, match_info['Rounds'])
+        self.assertEqual(match.winner, match_info['Winner'])
+        self.assertEqual(['BotRandom', 'BotRandom'], [p['PlayerName'] for p in match_info['Players']])
+
+    def test_seeded_bots(self):
+        actions = []
+        for i in xrange(0, 2):
+            bot = BotVex(5)
+            state = State.from_game_state(self.game_state)
+            actions.append([bot.get_state_action(state.clone()) for j in xrange(0, 20)])
+        self.assertEqual(actions[0], actions[1])
+        self.assertEqual(play_match(['vex', 'random'], self.game_state, 5),
+                         play_match(['vex', 'random'], self.game_state, 5))
+
+    def test_same_seed(self):
+        self.assertEqual(play_match(['haywired', 'haywired'], self.game_state, 3, max_depth=2),
+                         play_match(['haywired', 'haywired'], self.game_state, 3, max_depth=2))
@@ -0,0 +1,46 @@
+import unittest
+import os
+import time
+from ai.entelect import *
+from ai.domain import *
+from ai.strategy import *
+from ai.parallel import *
+
+
+class ParallelSearchTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.parallel_search = ParallelSearch(2, 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parallel_search.close()
+
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.states = [
+            State.from_game_state(load_state(self.resources_dir + 'state.json')),
+            State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        ]
+
+    def test_same_action(self):
+        for state in self.states:
+            for include_tracers in [False, True]:
+                for pruning in [False, True]:
+                    expected = TreeSearchBestAction().search(state, 4, include_tracers, 8)
+                    self.assertEqual(expected, self.parallel_search.search_deepening(
+                        state, time.time() + 60, 4, include_tracers, 8, pruning))
+                    self.assertEqual(4, self.parallel_search.depth_reached)
+
+    def test_deadline(self):
+        start = time.time()
+        action = self.parallel_search.search_deepening(self.states[1], start + 0.3, 20, True, 8, True)
+        self.assertLess(time.time() - start, 0.3 + PARALLEL_SEARCH_GRACE)
+        self.assertGreaterEqual(self.parallel_search.depth_reached, 1)
+        self.assertLess(self.parallel_search.depth_reached, 20)
+        self.assertIn(action, self.states[1].get_available_evade_actions())
+
+    def test_monte_carlo(self):
+        action = self.parallel_search.search_monte_carlo(self.states[1], 100, 8)
+        self.assertIn(action, [NOTHING, SHOOT, MOVE_LEFT, MOVE_RIGHT])
+        self.assertGreater(self.parallel_search.rollouts, 20)
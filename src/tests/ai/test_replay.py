@@ -0,0 +1,109 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from ai.entelect import *
+from ai.domain import *
+from ai.replay import *
+
+
+class ReplayArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.directory = tempfile.mkdtemp()
+        self.paths = [self.resources_dir + 'state.json', self.resources_dir + '../../state_end.json']
+        for i, path in enumerate(self.paths):
+            os.mkdir(os.path.join(self.directory, str(i).zfill(3)))
+            shutil.copy(path, os.path.join(self.directory, str(i).zfill(3), 'state.json'))
+        self.archive_path = os.path.join(self.directory, 'replay.replay')
+        pack_replay(self.directory, self.archive_path)
+        self.archive = ReplayArchive(self.archive_path)
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.directory)
+
+    def test_states(self):
+        self.assertEqual(2, len(self.archive))
+        for i, path in enumerate(self.paths):
+            expected = State.from_game_state(load_state(path))
+            state = self.archive.state(i)
+            self.assertEqual(repr(expected), repr(state))
+            self.assertEqual(expected.round_number, state.round_number)
+            for player_number in [YOU, ENEMY]:
+                self.assertEqual(expected.players[player_number].kills, state.players[player_number].kills)
+                self.assertEqual(expected.players[player_number].lives, state.players[player_number].lives)
+                self.assertEqual(expected.players[player_number].respawn_timer,
+                                 state.players[player_number].respawn_timer)
+
+    def test_game_state(self):
+        for i, path in enumerate(self.paths):
+            expected = load_state(path)
+            game_state = self.archive.game_state(i)
+            for expected_row, row in zip(expected['Map']['Rows'], game_state['Map']['Rows']):
+                self.assertEqual([cell and (cell['Type'], cell['PlayerNumber'], cell['X'], cell['Y'], cell['Width'])
+                                  for cell in expected_row],
+                                 [cell and (cell['Type'], cell['PlayerNumber'], cell['X'], cell['Y'], cell['Width'])
+                                  for cell in row])
+            for expected_player, player in zip(expected['Players'], game_state['Players']):
+                self.assertEqual(expected_player['Ship']['Command'], player['Ship']['Command'])
+
+    def test_player_names(self):
+        self.assertEqual([p['PlayerName'] for p in load_state(self.paths[0])['Players']], self.archive.player_names)
+
+    def test_out_of_range(self):
+        self.assertRaises(IndexError, self.archive.game_state, 2)
+
+
+class ReplayRoundsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.directory = tempfile.mkdtemp()
+        for i in xrange(0, 6):
+            os.mkdir(os.path.join(self.directory, str(i).zfill(3)))
+            shutil.copy(self.resources_dir + 'state.json', os.path.join(self.directory, str(i).zfill(3), 'state.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def wait_for(self, rounds, round_number):
+        for i in xrange(0, 100):
+            if rounds.cached(round_number):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_state_file(self):
+        rounds = ReplayRounds(os.path.join(self.directory, '002', 'state.json'))
+        self.assertEqual(6, len(rounds))
+        self.assertEqual(2, rounds.start_round)
+        self.assertEqual(0, len(rounds.cache))
+        self.assertEqual(os.path.join(self.directory, '002', 'state.json'), rounds[2]['_state_file'])
+        self.assertRaises(IndexError, rounds.__getitem__, 6)
+        rounds.close()
+
+    def test_prefetch(self):
+        rounds = ReplayRounds(os.path.join(self.directory, '000', 'state.json'), 8, 2)
+        rounds[2]
+        for round_number in [0, 1, 3, 4]:
+            self.assertTrue(self.wait_for(rounds, round_number))
+        self.assertNotIn(5, rounds.cache)
+        rounds.close()
+
+    def test_cache_size(self):
+        rounds = ReplayRounds(os.path.join(self.directory, '000', 'state.json'), 2, 0)
+        for round_number in xrange(0, 6):
+            rounds[round_number]
+        self.assertEqual([4, 5], rounds.cache.keys())
+        rounds.close()
+
+    def test_archive(self):
+        archive_path = os.path.join(self.directory, 'replay.replay')
+        pack_replay(self.directory, archive_path)
+        rounds = ReplayRounds(archive_path + ':3')
+        self.assertEqual(6, len(rounds))
+        self.assertEqual(3, rounds.start_round)
+        self.assertEqual(repr(State.from_game_state(load_state(self.resources_dir + 'state.json'))),
+                         repr(State.from_game_state(rounds[3])))
+        rounds.close()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import time
+from ai.entelect import *
+from ai.domain import *
+from ai.strategy import *
+
+
+class PruningTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.states = [
+            State.from_game_state(load_state(self.resources_dir + 'state.json')),
+            State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+        ]
+
+    def test_same_action(self):
+        for state in self.states:
+            for include_tracers in [False, True]:
+                for loc in [None, 3, 8]:
+                    expected = TreeSearchBestAction(0).search(state, 4, include_tracers, loc)
+                    self.assertEqual(expected, TreeSearchBestAction(0).search(state, 4, include_tracers, loc, True))
+                    self.assertEqual(expected, TreeSearchBestAction().search(state, 4, include_tracers, loc, True))
+
+    def test_fewer_nodes(self):
+        search = TreeSearchBestAction(0)
+        search.search(self.states[1], 4, True, 8)
+        nodes = search.nodes
+        search.search(self.states[1], 4, True, 8, True)
+        self.assertLess(search.nodes, nodes)
+
+    def test_upper_bound(self):
+        for state in self.states:
+            for depth in [1, 2, 3]:
+                children = [state]
+                for i in xrange(0, 2):
+                    next_children = []
+                    for child in children:
+                        for action in child.get_available_evade_actions():
+                            next_state = child.clone()
+                            next_state.update(action, add_bullet_tracers=True)
+                            next_children.append(next_state)
+                    children = next_children
+                    for child in children:
+                        score = TreeSearchBestAction(0).search_recurse(child, 0, depth, False, 0, [], 8)[0]
+                        self.assertLessEqual(score, TreeSearchBestAction.upper_bound(child, depth, 8))
+
+
+class DeepeningTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+
+    def test_completes_max_depth(self):
+        search = TreeSearchBestAction()
+        action = search.search_deepening(self.state, time.time() + 60, 3, True, 8, True)
+        self.assertEqual(3, search.depth_reached)
+        self.assertEqual(TreeSearchBestAction().search(self.state, 3, True, 8), action)
+
+    def test_deadline(self):
+        search = TreeSearchBestAction()
+        start = time.time()
+        action = search.search_deepening(self.state, start + 0.2, 20, True, 8, True)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertLess(search.depth_reached, 20)
+        self.assertEqual(TreeSearchBestAction().search(self.state, search.depth_reached, True, 8), action)
+
+    def test_first_depth_after_deadline(self):
+        search = TreeSearchBestAction()
+        action = search.search_deepening(self.state, time.time() - 1, 4, True, 8, True)
+        self.assertEqual(1, search.depth_reached)
+        self.assertEqual(TreeSearchBestAction().search(self.state, 1, True, 8), action)
+
+
+class MonteCarloTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+
+    def test_search(self):
+        search = MonteCarloTreeSearch(seed=1)
+        start = time.time()
+        action = search.search(self.state, 100, 8)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertIn(action, [NOTHING, SHOOT, MOVE_LEFT, MOVE_RIGHT])
+        self.assertGreater(search.rollouts, 10)
+
+    def test_repeatable(self):
+        search = MonteCarloTreeSearch()
+        root_state = BitboardState.from_state(self.state)
+        stats = []
+        for i in xrange(0, 2):
+            root = search.grow(root_state, 0, 8, 3, 50)
+            stats.append(dict((action, (node.visits, node.score)) for action, node in root.children.iteritems()))
+        self.assertEqual(50, search.rollouts)
+        self.assertEqual(stats[0], stats[1])
+
+    def test_registered(self):
+        self.assertIs(MCTS_SEARCH, SEARCH['mcts'])
@@ -0,0 +1,95 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client
+from ai.entelect import *
+from ai.domain import *
+from ai.client import *
+from ai.server import *
+
+
+class BotServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.address = server_address(tempfile.mkdtemp())
+        self.server = BotServer(self.address, None)
+        thread = threading.Thread(target=self.server.serve)
+        thread.daemon = True
+        thread.start()
+
+    def play(self, state_file):
+        for i in xrange(0, 50):
+            try:
+                connection = Client(self.address, authkey=read_server_key(self.address))
+                break
+            except Exception:
+                time.sleep(0.1)
+        connection.send(('haywired', state_file, time.time()))
+        action = connection.recv()
+        connection.close()
+        return action
+
+    def test_rounds(self):
+        for path in ['state.json', '../../state_end.json', 'state.json']:
+            state = State.from_game_state(load_state(self.resources_dir + path))
+            self.assertIn(self.play(self.resources_dir + path), state.get_available_actions())
+
+    def test_second_server(self):
+        state = State.from_game_state(load_state(self.resources_dir + 'state.json'))
+        self.play(self.resources_dir + 'state.json')
+        marker = server_marker(self.address)
+        open(marker, 'w').close()
+        # returns at once instead of taking over the address
+        BotServer(self.address, None).serve()
+        self.assertFalse(os.path.exists(marker))
+        self.assertIn(self.play(self.resources_dir + 'state.json'), state.get_available_actions())
+
+
+    def test_wrong_key(self):
+        state = State.from_game_state(load_state(self.resources_dir + 'state.json'))
+        self.play(self.resources_dir + 'state.json')
+        self.assertRaises(Exception, Client, self.address, authkey='entelect')
+        self.assertIn(self.play(self.resources_dir + 'state.json'), state.get_available_actions())
+
+
+class BotServerIdleTestCase(unittest.TestCase):
+    def test_idle_timeout(self):
+        resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        address = server_address(tempfile.mkdtemp())
+        server = BotServer(address, 1)
+        thread = threading.Thread(target=server.serve)
+        thread.daemon = True
+        thread.start()
+        for i in xrange(0, 50):
+            if read_server_key(address):
+                break
+            time.sleep(0.1)
+        self.assertEqual(0600, os.stat(server_key_file(address)).st_mode & 0777)
+        # a round resets the timeout
+        time.sleep(0.6)
+        connection = Client(address, authkey=read_server_key(address))
+        connection.send(('haywired', resources_dir + 'state.json', time.time()))
+        connection.recv()
+        connection.close()
+        time.sleep(0.6)
+        self.assertTrue(thread.is_alive())
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+
+class ServerAddressTestCase(unittest.TestCase):
+    def test_server_address(self):
+        self.assertEqual(server_address('a'), server_address('a'))
+        self.assertNotEqual(server_address('a'), server_address('b'))
+
+    def test_claim_server_marker(self):
+        marker = server_marker(server_address(tempfile.mkdtemp()))
+        self.assertTrue(claim_server_marker(marker))
+        self.assertFalse(claim_server_marker(marker))
+        # left by a server that died while starting
+        stale = time.time() - BOT_SERVER_START_TIMEOUT - 1
+        os.utime(marker, (stale, stale))
+        self.assertTrue(claim_server_marker(marker))
+        os.remove(marker)
@@ -0,0 +1,92 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import time
+from ai.entelect import *
+from ai.domain import *
+from ai.strategy import *
+from ai.telemetry import *
+
+
+class TelemetryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + 'state.json'))
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'telemetry.jsonl')
+        self.telemetry = Telemetry(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_counts(self):
+        self.telemetry.start_turn(time.time())
+        state = self.state.clone()
+        state.update(NOTHING)
+        state.update(NOTHING)
+        self.assertEqual({'clones': 1, 'updates': 2}, self.telemetry.counts())
+        self.telemetry.start_turn(time.time())
+        self.assertEqual({'clones': 0, 'updates': 0}, self.telemetry.counts())
+
+    def test_two_telemetries(self):
+        other = Telemetry(os.path.join(self.directory, 'other.jsonl'))
+        self.telemetry.start_turn(time.time())
+        self.state.clone().update(NOTHING)
+        other.start_turn(time.time())
+        self.state.clone().update(NOTHING)
+        self.assertEqual({'clones': 2, 'updates': 2}, self.telemetry.counts())
+        self.assertEqual({'clones': 1, 'updates': 1}, other.counts())
+
+    def test_end_turn(self):
+        self.telemetry.start_turn(time.time())
+        self.telemetry.add_search('TreeSearchBestAction', 0.5, 100, 3)
+        self.telemetry.add_search('TreeSearchBestAction', 0.5, 20, 2)
+        self.state.clone()
+        self.telemetry.end_turn(round=4, action=SHOOT, parse=0.25)
+        with open(self.path, 'r') as telemetry_file:
+            records = [json.loads(line) for line in telemetry_file]
+        self.assertEqual(1, len(records))
+        self.assertEqual(4, records[0]['round'])
+        self.assertEqual(SHOOT, records[0]['action'])
+        self.assertEqual(0.25, records[0]['parse'])
+        self.assertEqual(120, records[0]['nodes'])
+        self.assertEqual(1, records[0]['clones'])
+        self.assertEqual(2, len(records[0]['searches']))
+
+    def test_load_directory(self):
+        for i in xrange(0, 3):
+            self.telemetry.start_turn(time.time())
+            self.telemetry.end_turn(round=i)
+        os.mkdir(os.path.join(self.directory, 'match'))
+        shutil.copy(self.path, os.path.join(self.directory, 'match', 'bot.jsonl'))
+        records = load_telemetry([self.directory])
+        self.assertEqual(6, len(records))
+        self.assertEqual([0, 1, 2], [record['round'] for record in records if record['file'] == self.path])
+
+    def test_percentile(self):
+        values = range(1, 101)
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(1, percentile([1], 95))
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize(self):
+        records = [{'seconds': seconds, 'searches': [{'seconds': seconds / 2}]} for seconds in [1.0, 0.5, 2.0]]
+        summary = summarize(records)
+        self.assertEqual([1.0, 2.0, 2.0, 2.0], summary['turn'])
+        self.assertEqual([0.5, 1.0, 1.0, 1.0], summary['search'])
+        self.assertNotIn('parse', summary)
+
+    def test_search_best_action(self):
+        blackboard = Blackboard()
+        blackboard.set('state', self.state)
+        blackboard.set('telemetry', self.telemetry)
+        self.telemetry.start_turn(time.time())
+        SearchBestAction(2, False, False).run(blackboard, [])
+        search = self.telemetry.record['searches'][0]
+        self.assertEqual('TreeSearchBestAction', search['search'])
+        self.assertEqual(2, search['depth'])
+        self.assertEqual(TREE_SEARCH.nodes, search['nodes'])
+        self.assertGreater(self.telemetry.counts()['clones'], 0)
@@ -0,0 +1,82 @@
+import unittest
+import csv
+import os
+import shutil
+import sqlite3
+import tempfile
+from ai.entelect import *
+from ai.tournament import *
+
+
+class TournamentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.game_state = load_state(self.resources_dir + 'state.json')
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def match_info(self, winner, kills1=0, kills2=0, rounds=100):
+        return {'Players': [{'Kills': kills1}, {'Kills': kills2}], 'Rounds': rounds, 'Winner': winner,
+                'WinReason': 'Round limit reached'}
+
+    def test_pairing_stats(self):
+        stats = PairingStats(('haywired', 'random'))
+        stats.add(self.match_info(YOU, 10, 2, 100))
+        stats.add(self.match_info(ENEMY, 20, 4, 200))
+        summary = dict(zip(TOURNAMENT_SUMMARY_FIELDS, stats.summary()))
+        self.assertEqual(2, summary['matches'])
+        self.assertEqual(0.5, summary['win_rate'])
+        self.assertTrue(0 < summary['win_rate_low'] < 0.5 < summary['win_rate_high'] < 1)
+        self.assertEqual(15, summary['mean_kills1'])
+        self.assertEqual(150, summary['mean_rounds'])
+        self.assertEqual(50, summary['rounds_stddev'])
+
+    def test_schedule(self):
+        tournament = Tournament([('random', 'random'), ('vex', 'random')], 3, 7, game_state=self.game_state)
+        schedule = tournament.schedule()
+        self.assertEqual(6, len(schedule))
+        self.assertEqual(schedule, Tournament([('random', 'random'), ('vex', 'random')], 3, 7,
+                                              game_state=self.game_state).schedule())
+        # every pairing plays the same seeds
+        self.assertEqual([seed for pairing, seed in schedule if pairing == ('random', 'random')],
+                         [seed for pairing, seed in schedule if pairing == ('vex', 'random')])
+
+    def test_csv_results(self):
+        path = os.path.join(self.directory, 'results.csv')
+        results = open_results(path)
+        stats = PairingStats(('random', 'random'))
+        for winner in [YOU, ENEMY]:
+            stats.add(self.match_info(winner))
+            results.add(('random', 'random'), 1, self.match_info(winner), stats)
+        results.close()
+        with open(path, 'rb') as results_file:
+            rows = list(csv.reader(results_file))
+        self.assertEqual(TOURNAMENT_MATCH_FIELDS + TOURNAMENT_SUMMARY_FIELDS[2:], rows[0])
+        self.assertEqual(['2', '1', '0.5'], rows[2][8:11])
+
+    def test_sqlite_results(self):
+        path = os.path.join(self.directory, 'results.db')
+        results = open_results(path)
+        stats = PairingStats(('random', 'random'))
+        for winner in [YOU, ENEMY, YOU]:
+            stats.add(self.match_info(winner))
+            results.add(('random', 'random'), 1, self.match_info(winner), stats)
+        results.close()
+        connection = sqlite3.connect(path)
+        self.assertEqual(3, connection.execute('select count(*) from matches').fetchone()[0])
+        self.assertEqual([(3, 2)], connection.execute('select matches, wins1 from summary').fetchall())
+        connection.close()
+
+    def test_play(self):
+        tournament = Tournament([('random', 'random')], 3, 1, 2, self.game_state)
+        path = os.path.join(self.directory, 'results.csv')
+        results = open_results(path)
+        summaries = tournament.play(results, os.path.join(self.directory, 'matches'))
+        results.close()
+        self.assertEqual(3, summaries[0][2])
+        match_infos = [os.path.join(root, name) for root, directories, names in
+                       os.walk(os.path.join(self.directory, 'matches')) for name in names]
+        self.assertEqual(3, len(match_infos))
+        self.assertTrue(all(path.endswith(MATCH_INFO_FILE) for path in match_infos))
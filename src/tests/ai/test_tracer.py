@@ -0,0 +1,41 @@
+import unittest
+import os
+from ai.entelect import *
+from ai.domain import *
+from ai.strategy import *
+
+
+class TracerPlansTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+
+    def set_tracer(self, state, tracer_plans=None):
+        blackboard = Blackboard()
+        blackboard.set('state', state)
+        blackboard.set('tracer_plans', tracer_plans)
+        SetTracer().run(blackboard, [])
+        return blackboard.get('tracer')
+
+    def test_same_tracer(self):
+        tracer = self.set_tracer(self.state)
+        self.assertIsNotNone(tracer)
+        self.assertEqual(tracer, self.set_tracer(self.state, TracerPlans()))
+
+    def test_reuse(self):
+        tracer_plans = TracerPlans()
+        tracer = self.set_tracer(self.state, tracer_plans)
+        # the ship moves towards the starting position like KillTracer does
+        next_state = self.state.clone()
+        next_state.update(MOVE_RIGHT)
+        self.assertEqual(tracer, self.set_tracer(next_state, tracer_plans))
+        self.assertEqual(1, tracer_plans.hits)
+
+    def test_expired(self):
+        tracer_plans = TracerPlans()
+        tracer = self.set_tracer(self.state, tracer_plans)
+        next_state = self.state.clone()
+        while next_state.round_number < tracer.starting_round:
+            next_state.update(NOTHING)
+        self.assertIsNone(tracer_plans.lookup(next_state, next_state.timeline(True, next_state.round_number, True)))
+        self.assertIsNone(tracer_plans.plan)
@@ -0,0 +1,82 @@
+import unittest
+import os
+from ai.entelect import *
+from ai.domain import *
+from ai.strategy import *
+from ai.transposition import *
+
+
+class ZobristKeyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+        self.state = State.from_game_state(load_state(self.resources_dir + '../../state_end.json'))
+
+    def play(self, actions):
+        state = self.state
+        for action in actions:
+            state = state.clone()
+            state.update(action, add_bullet_tracers=True)
+        return state
+
+    def test_transposed_moves(self):
+        self.assertEqual(zobrist_key(self.play([MOVE_LEFT, MOVE_RIGHT])),
+                         zobrist_key(self.play([MOVE_RIGHT, MOVE_LEFT])))
+        self.assertEqual(zobrist_key(self.play([MOVE_LEFT, MOVE_RIGHT])),
+                         zobrist_key(self.play([NOTHING, NOTHING])))
+
+    def test_different_positions(self):
+        self.assertNotEqual(zobrist_key(self.play([MOVE_LEFT, NOTHING])),
+                            zobrist_key(self.play([NOTHING, NOTHING])))
+        self.assertNotEqual(zobrist_key(self.play([SHOOT, NOTHING])),
+                            zobrist_key(self.play([NOTHING, SHOOT])))
+        self.assertNotEqual(zobrist_key(self.play([NOTHING])), zobrist_key(self.play([NOTHING, NOTHING])))
+
+    def test_destroyed_shield(self):
+        state = self.play([NOTHING])
+        key = zobrist_key(state)
+        shield = state.players[YOU].shields[0]
+        shield.destroy(state)
+        self.assertNotEqual(key, zobrist_key(state))
+
+
+class TranspositionTableTestCase(unittest.TestCase):
+    def test_lookup(self):
+        table = TranspositionTable(16)
+        table.new_search()
+        table.store(5, 2, 100, MOVE_LEFT)
+        self.assertEqual((100, MOVE_LEFT), table.lookup(5, 2))
+        self.assertIsNone(table.lookup(5, 3))
+        self.assertIsNone(table.lookup(21, 2))
+        self.assertEqual({'hits': 1, 'misses': 2, 'stores': 1, 'hit_rate': 1 / 3.0}, table.stats())
+
+    def test_replacement(self):
+        table = TranspositionTable(16)
+        table.new_search()
+        table.store(5, 3, 300, MOVE_LEFT)
+        table.store(21, 1, 100, NOTHING)
+        table.store(37, 2, 200, SHOOT)
+        self.assertEqual((300, MOVE_LEFT), table.lookup(5, 3))
+        self.assertIsNone(table.lookup(21, 1))
+        self.assertEqual((200, SHOOT), table.lookup(37, 2))
+        table.store(53, 4, 400, MOVE_RIGHT)
+        self.assertEqual((400, MOVE_RIGHT), table.lookup(53, 4))
+        self.assertIsNone(table.lookup(5, 3))
+
+    def test_new_search(self):
+        table = TranspositionTable(16)
+        table.new_search()
+        table.store(5, 2, 100, MOVE_LEFT)
+        table.new_search()
+        self.assertIsNone(table.lookup(5, 2))
+
+
+class TreeSearchTranspositionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resources_dir = os.path.dirname(os.path.realpath(__file__)) + '/../resources/'
+
+    def test_same_action(self):
+        for path in ['state.json', '../../state_end.json']:
+            state = State.from_game_state(load_state(self.resources_dir + path))
+            for include_tracers in [False, True]:
+                self.assertEqual(TreeSearchBestAction(0).search(state, 4, include_tracers, 8),
+                                 TreeSearchBestAction().search(state, 4, include_tracers, 8))
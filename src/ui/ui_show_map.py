@@ -4,6 +4,7 @@ from ai.entelect import *
 from ai.strategy import *
 from ai.domain import *
 from ai.bot import *
+from ai.replay import ReplayRounds
 import logging
 import logging.config
 
@@ -12,6 +13,8 @@ import logging.config
 
 # scale up the renderer
 RENDER_SCALE_FACTOR = 32
+# milliseconds between rounds when playing a replay
+AUTOPLAY_INTERVAL = 100
 
 # GUI application
 class Application(Frame):
@@ -19,6 +22,7 @@ class Application(Frame):
     game_state = None
     game_states = None
     round_number = 0
+    autoplay = None
 
     windows = {}
 
@@ -31,6 +35,8 @@ class Application(Frame):
         master.wm_title('Entelect 2015 UI Toolkit')
         master.iconbitmap('resources/invader.ico')
         self.labels['RoundNumber'] = StringVar()
+        self.labels['Autoplay'] = StringVar()
+        self.labels['Autoplay'].set('Play')
         self.create_widgets()
         self.create_menu()
         self.windows['game_info'] = KeyValueWindow(master, 'Game Information', lambda: self.game_state)
@@ -44,7 +50,8 @@ class Application(Frame):
 
     # file dialog to load game state file
     def open_state_file(self):
-        filename = tkFileDialog.askopenfilename(initialdir=REPLAY_DIR, filetypes=[("State files", "state.json")])
+        filename = tkFileDialog.askopenfilename(initialdir=REPLAY_DIR, filetypes=[("State files", "state.json"),
+                                                                                  ("Replay archives", "*.replay")])
         if filename:
             save_obj('ui_last_statefile', filename)
             self.load_state_file(filename)
@@ -78,12 +85,13 @@ class Application(Frame):
         result = strategy.run(blackboard, flow)
         print 'Result: %s, Flow: %s' % (result, ' '.join(str(f) for f in flow))
 
-    # file dialog to load game state file
+    # file dialog to load game state file, rounds are only read when shown
     def load_state_file(self, filename):
         self.game_state_file = filename
-        self.game_states = load_harness_replay_states(filename)
-        round_number = int(os.path.basename(os.path.dirname(filename)))
-        self.load_round(round_number)
+        if self.game_states:
+            self.game_states.close()
+        self.game_states = ReplayRounds(filename)
+        self.load_round(self.game_states.start_round)
 
     # loads a state based on round number
     def load_round(self, round_number):
@@ -97,15 +105,18 @@ class Application(Frame):
         self.labels['RoundNumber'].set('Round: %d/%d' % (self.game_state['RoundNumber'], self.game_state['RoundLimit']))
         self.redraw_canvas()
 
-    # redraw canvas
+    # redraw canvas, layers only redraw the cells that changed and are stacked in order
     def redraw_canvas(self):
         if not self.game_state:
             return
 
-        self.canvas.delete(ALL)
         for layer in self.layers:
             if layer.enabled.get():
                 layer.load_game_state(self.game_state)
+            else:
+                layer.clear(self.canvas)
+        for layer in self.layers:
+            self.canvas.tag_raise(layer.tag)
 
     # tries to load the previous state
     def load_prev_state(self):
@@ -123,6 +134,22 @@ class Application(Frame):
         round_number = self.game_state['RoundNumber']
         self.load_round(round_number + 1)
 
+    # plays the replay from the current round until the last round or until toggled again
+    def toggle_autoplay(self):
+        if self.autoplay:
+            self.after_cancel(self.autoplay)
+            self.autoplay = None
+        elif self.game_state:
+            self.autoplay = self.after(AUTOPLAY_INTERVAL, self.autoplay_step)
+        self.labels['Autoplay'].set('Pause' if self.autoplay else 'Play')
+
+    def autoplay_step(self):
+        self.autoplay = None
+        if self.round_number + 1 < len(self.game_states):
+            self.load_round(self.round_number + 1)
+            self.autoplay = self.after(AUTOPLAY_INTERVAL, self.autoplay_step)
+        self.labels['Autoplay'].set('Pause' if self.autoplay else 'Play')
+
     def reload_all_windows(self):
         if not self.game_state:
             return
@@ -145,9 +172,11 @@ class Application(Frame):
         nav_frame.grid(sticky=EW, row=1)
         Button(nav_frame, text='<', command=self.load_prev_state).grid(row=0, sticky=W)
         Button(nav_frame, text='>', command=self.load_next_state).grid(row=0, column=1, sticky=E)
-        Label(nav_frame, textvariable=self.labels['RoundNumber']).grid(row=0, column=2, sticky=W)
+        Button(nav_frame, textvariable=self.labels['Autoplay'], command=self.toggle_autoplay).grid(row=0, column=2)
+        Label(nav_frame, textvariable=self.labels['RoundNumber']).grid(row=0, column=3, sticky=W)
         self.master.bind('<Left>', lambda event: self.load_prev_state())
         self.master.bind('<Right>', lambda event: self.load_next_state())
+        self.master.bind('<space>', lambda event: self.toggle_autoplay())
         self.master.bind('<Control-r>', lambda event: self.reload_all_windows())
 
     def create_menu(self):
@@ -205,6 +234,7 @@ class Layer():
         self.enabled = BooleanVar(self.canvas)
         self.enabled.set(enabled)
         self.name = name
+        self.tag = 'layer_%s' % name
         self.width = MAP_WIDTH * RENDER_SCALE_FACTOR
         self.height = MAP_HEIGHT * RENDER_SCALE_FACTOR
 
@@ -217,97 +247,135 @@ class Layer():
     def render(self, canvas):
         return
 
+    # removes the items of the layer from the canvas
+    def clear(self, canvas):
+        canvas.delete(self.tag)
 
-# frame to render game cells
+
+# frame to render game cells, the canvas items of a cell are kept between rounds and only cells that changed since
+# the last render are rendered again
 class LayerCellBase(Layer):
+    items = None
+    rendered = None
+
+    def __init__(self, application, name, enabled=True):
+        Layer.__init__(self, application, name, enabled)
+        self.items = {}
+        self.rendered = {}
 
     # reload canvas with new game state
     def render(self, canvas):
         game_map = self.game_state['Map']
         for row_index, row in enumerate(game_map['Rows']):
             for column_index, cell in enumerate(row):
+                key = self.cell_key(cell)
+                if (row_index, column_index) in self.rendered and self.rendered[(row_index, column_index)] == key:
+                    continue
+                self.rendered[(row_index, column_index)] = key
                 self.render_cell(self.canvas, cell, column_index, row_index, column_index * RENDER_SCALE_FACTOR, row_index * RENDER_SCALE_FACTOR, column_index * RENDER_SCALE_FACTOR + RENDER_SCALE_FACTOR, row_index * RENDER_SCALE_FACTOR + RENDER_SCALE_FACTOR)
 
+    def clear(self, canvas):
+        Layer.clear(self, canvas)
+        self.items = {}
+        self.rendered = {}
+
+    # what the layer shows of a cell, cells are only rendered again when it changes
+    def cell_key(self, cell):
+        if not cell:
+            return None
+        return cell['Type'], cell['PlayerNumber']
+
+    # returns the canvas item of the cell, creating it with create_item(left, top, right, bottom) the first time
+    def cell_item(self, canvas, column_index, row_index, create_item, left, top, right, bottom):
+        item = self.items.get((row_index, column_index))
+        if item is None:
+            item = create_item(left, top, right, bottom)
+            canvas.addtag_withtag(self.tag, item)
+            self.items[(row_index, column_index)] = item
+        return item
+
     # base class to implement layer specific
     def render_cell(self, canvas, cell, column_index, row_index, left, top, right, bottom):
         return
 
 # frame to render game cells
 class LayerBase(LayerCellBase):
+    placeholder = None
 
     def __init__(self, application):
-        Layer.__init__(self, application, 'Base')
-        self.canvas.create_line(0, 0, self.width, self.height)
-        self.canvas.create_line(0, self.height, self.width, 0)
+        LayerCellBase.__init__(self, application, 'Base')
+        self.placeholder = [self.canvas.create_line(0, 0, self.width, self.height),
+                            self.canvas.create_line(0, self.height, self.width, 0)]
+
+    def render(self, canvas):
+        for item in self.placeholder:
+            canvas.delete(item)
+        self.placeholder = []
+        LayerCellBase.render(self, canvas)
+
+    def cell_key(self, cell):
+        if not cell:
+            return None
+        return cell['Type'] == WALL
 
     # reload canvas with new game state
     def render_cell(self, canvas, cell, column_index, row_index, left, top, right, bottom):
-        rect = canvas.create_rectangle(left, top, right, bottom, state=DISABLED)
+        rect = self.cell_item(canvas, column_index, row_index, lambda *bbox: canvas.create_rectangle(*bbox, state=DISABLED), left, top, right, bottom)
         if not cell:
             canvas.itemconfig(rect, fill='lightgrey')
-            return
-        if cell['Type'] == WALL:
+        elif cell['Type'] == WALL:
             canvas.itemconfig(rect, fill='grey')
+        else:
+            canvas.itemconfig(rect, fill='')
 
 
 # entities layer
 class LayerEntities(LayerCellBase):
-    entities = None
 
     def __init__(self, canvas):
-        Layer.__init__(self, canvas, 'Entities')
-        self.entities = []
-
-    def render(self, canvas):
-        LayerCellBase.render(self, canvas)
-
-    def delete_entities(self, canvas):
-        for entity in self.entities:
-            canvas.delete(entity)
-        self.entities = []
+        LayerCellBase.__init__(self, canvas, 'Entities')
 
     def cell_clicked(self, row, column):
         cell = self.game_state['Map']['Rows'][row][column]
         self.application.windows['cell_info'].show(cell)
         self.application.windows['cell_info'].get_value = lambda : self.game_state['Map']['Rows'][row][column]
 
-    def render_cell(self, canvas, cell, column_index, row_index, left, top, right, bottom):
-        if not cell:
-            return
-
-        player_number = cell['PlayerNumber']
-        if not player_number > 0:
-            return
+    def cell_key(self, cell):
+        if not cell or not cell['PlayerNumber'] > 0:
+            return None
+        return cell['PlayerNumber']
 
+    def create_rectangle(self, canvas, column_index, row_index, left, top, right, bottom):
         rect = canvas.create_rectangle(left, top, right, bottom, activewidth=2)
-        self.entities.append(rect)
         canvas.tag_bind(rect, '<ButtonPress-1>', lambda event, row=row_index, column=column_index: self.cell_clicked(row, column))
-        if cell['PlayerNumber'] == 1:
+        return rect
+
+    def render_cell(self, canvas, cell, column_index, row_index, left, top, right, bottom):
+        rect = self.cell_item(canvas, column_index, row_index, lambda *bbox: self.create_rectangle(canvas, column_index, row_index, *bbox), left, top, right, bottom)
+        player_number = self.cell_key(cell)
+        if not player_number:
+            canvas.itemconfig(rect, state=HIDDEN)
+            return
+
+        canvas.itemconfig(rect, state=NORMAL)
+        if player_number == 1:
             canvas.itemconfig(rect, fill='blue')
-        elif cell['PlayerNumber'] == 2:
+        elif player_number == 2:
             canvas.itemconfig(rect, fill='red')
 
 # frame to labels
 class LayerLabels(LayerCellBase):
-    labels = None
 
     def __init__(self, canvas):
-        Layer.__init__(self, canvas, 'Labels')
-        self.labels = []
-
-    def render(self, canvas):
-        LayerCellBase.render(self, canvas)
+        LayerCellBase.__init__(self, canvas, 'Labels')
 
-    def delete_labels(self, canvas):
-        for label in self.labels:
-            canvas.delete(label)
-        self.labels = []
+    def cell_key(self, cell):
+        return cell_to_symbol(cell)
 
     def render_cell(self, canvas, cell, column_index, row_index, left, top, right, bottom):
         symbol = cell_to_symbol(cell)
-        if not symbol == WALL_SYMBOL:
-            label = canvas.create_text(left + RENDER_SCALE_FACTOR / 2, top + RENDER_SCALE_FACTOR / 2, text=symbol, state=DISABLED)
-            self.labels.append(label)
+        label = self.cell_item(canvas, column_index, row_index, lambda left, top, right, bottom: canvas.create_text(left + RENDER_SCALE_FACTOR / 2, top + RENDER_SCALE_FACTOR / 2, state=DISABLED), left, top, right, bottom)
+        canvas.itemconfig(label, text='' if symbol == WALL_SYMBOL else symbol)
 
 logging.config.fileConfig('logging.conf')
 
@@ -1,18 +1,9 @@
-import json
-import os
 import subprocess
-import shutil
-
-while True:
-    shutil.rmtree('harness/Replays')
-    subprocess.call(['run_harness.bat', 'haywired', 'haywired'])
-
-    with open('harness/Replays/0001/matchinfo.json', "r") as match_file:
-        matchinfo = json.loads(match_file.read())
-
-    with open("stats.csv", "a") as myfile:
-        player1 = matchinfo['Players'][0]
-        player2 = matchinfo['Players'][1]
-
-        line = '%s,%s,%s,%s\n' % (matchinfo['Rounds'], matchinfo['Winner'], player1['Kills'], player2['Kills'])
-        myfile.write(line)
\ No newline at end of file
+import sys
+
+# plays haywired against itself in the headless tournament runner, results and the running win rate are appended to
+# stats_tournament.csv as the matches finish, see src/ai/tournament.py for other pairings and SQLite results
+matches = sys.argv[1] if len(sys.argv) > 1 else '1000'
+seed = sys.argv[2] if len(sys.argv) > 2 else '0'
+subprocess.call([sys.executable, '-m', 'ai.tournament', '../stats_tournament.csv', matches, seed,
+                 'haywired:haywired'], cwd='src')